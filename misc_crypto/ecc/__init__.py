@@ -1,6 +1,14 @@
 from .protocol import FieldElement, CurvePoint, IntOrFE, Backend, G1, G2
 from .backends.bls12_381 import BLS12381Backend
 from .backends.bn254 import BN254Backend
-from .backends.toy import F13, F337
+from .backends.toy import F13, F337, Goldilocks
 
-from .common import pairing_check, roots_of_unity
+from .common import (
+    pairing_check,
+    roots_of_unity,
+    multi_scalar_multiplication,
+    batch_multi_scalar_multiplication,
+    FixedBaseTable,
+    fixed_base_window,
+    fixed_base_table_points,
+)
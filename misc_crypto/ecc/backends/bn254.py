@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, List
 from misc_crypto.ecc.protocol import FieldElement, IntOrFE
 from py_ecc.optimized_bn128 import (
     field_modulus,
@@ -15,6 +15,11 @@ from py_ecc.optimized_bn128 import (
     curve_order,
     FQ12,
     final_exponentiate,
+    normalize,
+    is_on_curve,
+    b,
+    b2,
+    FQ2,
     Z1,
 )
 
@@ -47,6 +52,49 @@ class WrappedCurvePoint:
     def is_inf(self) -> bool:
         return is_inf(self.py_ecc_object)
 
+    def to_bytes(self) -> bytes:
+        """
+        Affine coordinates in big endian, all zeros for the point at infinity
+        """
+        length = (field_modulus.bit_length() + 7) // 8
+        if self.is_inf():
+            degree = len(getattr(self.py_ecc_object[0], "coeffs", (0,)))
+            return bytes(2 * degree * length)
+        coordinates: List[int] = []
+        for element in normalize(self.py_ecc_object):
+            coordinates.extend(
+                element.coeffs if hasattr(element, "coeffs") else (element.n,)
+            )
+        return b"".join(int(c).to_bytes(length, "big") for c in coordinates)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "WrappedCurvePoint":
+        """
+        Inverse of to_bytes, G1 or G2 is told apart by the length
+        """
+        length = (field_modulus.bit_length() + 7) // 8
+        values = [
+            int.from_bytes(data[i : i + length], "big")
+            for i in range(0, len(data), length)
+        ]
+        # FQ for G1, FQ2 for G2
+        field_type: Any
+        curve_b: Any
+        coordinates: List[Any]
+        if len(values) == 2:
+            field_type, curve_b, coordinates = FQ, b, [FQ(v) for v in values]
+        elif len(values) == 4:
+            field_type, curve_b = FQ2, b2
+            coordinates = [FQ2(values[:2]), FQ2(values[2:])]
+        else:
+            raise ValueError(f"Unexpected length of point: {len(data)} bytes")
+        if not any(values):
+            return cls((field_type.one(), field_type.one(), field_type.zero()))
+        point = (coordinates[0], coordinates[1], field_type.one())
+        if not is_on_curve(point, curve_b):
+            raise ValueError("Point is not on the curve")
+        return cls(point)
+
 
 class G1(WrappedCurvePoint):
     ...
@@ -7,3 +7,7 @@ class F13(FQ):
 
 class F337(FQ):
     field_modulus = 337
+
+
+class Goldilocks(FQ):
+    field_modulus = 2 ** 64 - 2 ** 32 + 1
@@ -1,5 +1,13 @@
-from .protocol import G1, G2, Backend, FieldElement
-from typing import Tuple
+from concurrent.futures import ProcessPoolExecutor
+from .protocol import G1, G2, Backend, FieldElement, IntOrFE, P
+from typing import Tuple, Sequence, List, Optional, Generic
+
+# Below this many points, the bucket bookkeeping costs more than it saves
+PIPPENGER_THRESHOLD = 8
+
+MAX_FIXED_BASE_WINDOW = 16
+# Memory budget of a fixed-base table, in points
+MAX_FIXED_BASE_TABLE_POINTS = 2 ** 14
 
 
 def pairing_check(backend: Backend, a1: G1, a2: G2, b1: G1, b2: G2) -> bool:
@@ -15,3 +23,194 @@ def roots_of_unity(backend: Backend, order: int) -> Tuple[FieldElement, ...]:
     a = backend.Fr(5)
     p_minus_1 = a.field_modulus - 1
     return tuple(a ** ((i * p_minus_1) // order) for i in range(order))
+
+
+def multi_scalar_multiplication(points: Sequence[P], scalars: Sequence[IntOrFE]) -> P:
+    """
+    sum(scalar_i * point_i) with Pippenger's bucket method: for each window of bits,
+    add the points into a bucket per digit, then sum the buckets weighted by their digit.
+    """
+    if len(points) != len(scalars):
+        raise ValueError("Expect as many scalars as points")
+    if len(points) == 0:
+        raise ValueError("Expect at least one point")
+    zero = points[0].multiply(0)
+    ints = [int(s) for s in scalars]
+    if len(points) < PIPPENGER_THRESHOLD:
+        result = zero
+        for point, scalar in zip(points, ints):
+            result = result.add(point.multiply(scalar))
+        return result
+
+    window = max(2, len(points).bit_length() - 2)
+    mask = (1 << window) - 1
+    bits = max(s.bit_length() for s in ints)
+    result = zero
+    for shift in reversed(range(0, bits, window)):
+        for _ in range(window):
+            result = result.double()
+        window_sum = _bucket_sum(points, ints, shift, mask, zero)
+        result = result.add(window_sum)
+    return result
+
+
+def _bucket_sum(
+    points: Sequence[P],
+    scalars: Sequence[int],
+    shift: int,
+    mask: int,
+    zero: P,
+) -> P:
+    buckets: List[Optional[P]] = [None] * (mask + 1)
+    for point, scalar in zip(points, scalars):
+        digit = (scalar >> shift) & mask
+        if digit:
+            bucket = buckets[digit]
+            buckets[digit] = point if bucket is None else bucket.add(point)
+    return _sum_buckets(buckets, zero)
+
+
+def _sum_buckets(buckets: Sequence[Optional[P]], zero: P) -> P:
+    # sum(digit * bucket) as a sum of running sums
+    running = zero
+    window_sum = zero
+    for bucket in reversed(buckets[1:]):
+        if bucket is not None:
+            running = running.add(bucket)
+        window_sum = window_sum.add(running)
+    return window_sum
+
+
+def batch_multi_scalar_multiplication(
+    points: Sequence[P],
+    scalar_lists: Sequence[Sequence[IntOrFE]],
+    processes: int = 1,
+) -> List[P]:
+    """
+    [multi_scalar_multiplication(points, scalars) for scalars in scalar_lists], where
+    a list shorter than points stands for its zero padding. Each window goes over the
+    points once, dropping point i in the buckets of every msm, and with processes > 1
+    the windows are split over a process pool.
+    """
+    if len(scalar_lists) == 0:
+        return []
+    ints = [[int(s) for s in scalars] for scalars in scalar_lists]
+    length = max(len(scalars) for scalars in ints)
+    if length > len(points):
+        raise ValueError(f"Expect at most {len(points)} scalars, got {length}")
+    if len(points) == 0:
+        raise ValueError("Expect at least one point")
+    zero = points[0].multiply(0)
+    if length == 0:
+        return [zero] * len(ints)
+    points = points[:length]
+    if length < PIPPENGER_THRESHOLD:
+        return [
+            multi_scalar_multiplication(points[: len(s)], s) if s else zero
+            for s in ints
+        ]
+
+    window = max(2, length.bit_length() - 2)
+    bits = max(s.bit_length() for scalars in ints for s in scalars)
+    shifts = list(range(0, bits, window))
+    if processes > 1 and len(shifts) > 1:
+        chunk = -(-len(shifts) // processes)
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [
+                pool.submit(
+                    _window_sums, points, ints, shifts[i : i + chunk], window, zero
+                )
+                for i in range(0, len(shifts), chunk)
+            ]
+            window_sums = [sums for future in futures for sums in future.result()]
+    else:
+        window_sums = _window_sums(points, ints, shifts, window, zero)
+
+    results = [zero] * len(ints)
+    for sums in reversed(window_sums):
+        for k, window_sum in enumerate(sums):
+            result = results[k]
+            for _ in range(window):
+                result = result.double()
+            results[k] = result.add(window_sum)
+    return results
+
+
+def _window_sums(
+    points: Sequence[P],
+    ints: Sequence[Sequence[int]],
+    shifts: Sequence[int],
+    window: int,
+    zero: P,
+) -> List[List[P]]:
+    """
+    For each shift, the window sum of every msm
+    """
+    mask = (1 << window) - 1
+    window_sums = []
+    for shift in shifts:
+        buckets: List[List[Optional[P]]] = [[None] * (mask + 1) for _ in ints]
+        for i, point in enumerate(points):
+            for scalars, msm_buckets in zip(ints, buckets):
+                digit = (scalars[i] >> shift) & mask if i < len(scalars) else 0
+                if digit:
+                    bucket = msm_buckets[digit]
+                    msm_buckets[digit] = point if bucket is None else bucket.add(point)
+        window_sums.append([_sum_buckets(b, zero) for b in buckets])
+    return window_sums
+
+
+def fixed_base_table_points(bits: int, window: int) -> int:
+    return -(-bits // window) * ((1 << window) - 1)
+
+
+def fixed_base_window(
+    count: int, bits: int, max_points: int = MAX_FIXED_BASE_TABLE_POINTS
+) -> int:
+    """
+    The window minimizing the additions to build the table plus `count` multiplications,
+    among the windows whose table has at most max_points points
+    """
+
+    def cost(window: int) -> int:
+        rows = -(-bits // window)
+        return rows * ((1 << window) - 1) + count * rows
+
+    windows = [
+        window
+        for window in range(2, MAX_FIXED_BASE_WINDOW + 1)
+        if fixed_base_table_points(bits, window) <= max_points
+    ]
+    return min([1] + windows, key=cost)
+
+
+class FixedBaseTable(Generic[P]):
+    """
+    The multiples digit * 2^(window * i) * base for each window i and each digit,
+    so multiplying the base by a scalar is one addition per window and no doubling.
+    """
+
+    def __init__(self, base: P, bits: int, window: int) -> None:
+        self.window = window
+        self.zero = base.multiply(0)
+        self.rows: List[List[P]] = []
+        row_base = base
+        for _ in range(-(-bits // window)):
+            row = [row_base]
+            for _ in range((1 << window) - 2):
+                row.append(row[-1].add(row_base))
+            self.rows.append(row)
+            row_base = row[-1].add(row_base)
+
+    def multiply(self, scalar: IntOrFE) -> P:
+        n = int(scalar)
+        mask = (1 << self.window) - 1
+        result = self.zero
+        for row in self.rows:
+            digit = n & mask
+            if digit:
+                result = result.add(row[digit - 1])
+            n >>= self.window
+        if n:
+            raise ValueError("The scalar has more bits than the table")
+        return result
@@ -9,6 +9,9 @@ IntOrFE = Union[int, T]
 class FieldElement(Protocol):
     field_modulus: int
 
+    def __init__(self, val: int) -> None:
+        ...
+
     def __add__(self: T, other: IntOrFE) -> T:
         ...
 
@@ -21,6 +24,12 @@ class FieldElement(Protocol):
     def __div__(self: T, other: IntOrFE) -> T:
         ...
 
+    def __truediv__(self: T, other: IntOrFE) -> T:
+        ...
+
+    def __rtruediv__(self: T, other: IntOrFE) -> T:
+        ...
+
     def __rmul__(self: T, other: IntOrFE) -> T:
         ...
 
@@ -52,17 +61,20 @@ class FQ12(FieldElement):
     ...
 
 
+P = TypeVar("P", bound="CurvePoint")
+
+
 class CurvePoint(Protocol):
-    def neg(self) -> "CurvePoint":
+    def neg(self: P) -> P:
         ...
 
-    def double(self) -> "CurvePoint":
+    def double(self: P) -> P:
         ...
 
-    def add(self, other: "CurvePoint") -> "CurvePoint":
+    def add(self: P, other: P) -> P:
         ...
 
-    def multiply(self, n: IntOrFE) -> "CurvePoint":
+    def multiply(self: P, n: IntOrFE) -> P:
         ...
 
     def eq(self, other: "CurvePoint") -> bool:
@@ -71,6 +83,13 @@ class CurvePoint(Protocol):
     def is_inf(self) -> bool:
         ...
 
+    def to_bytes(self) -> bytes:
+        ...
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CurvePoint":
+        ...
+
 
 class G1(CurvePoint):
     ...
@@ -81,9 +100,14 @@ class G2(CurvePoint):
 
 
 class Backend(Protocol):
+    __name__: str
     curve_order: int
     field_modulus: int
 
+    # Backends key caches of roots of unity
+    def __hash__(self) -> int:
+        ...
+
     @classmethod
     def Fq(cls, n: int) -> "FieldElement":
         ...
@@ -1,7 +1,33 @@
-from .field import G1, G2, multiply, FieldElement, pairing_check, neg, Fr, add, Z1
-from typing import Sequence, Tuple
-from .polynomial import Polynomial
-from dataclasses import dataclass
+from .field import (
+    G1,
+    G2,
+    multiply,
+    FieldElement,
+    pairing_check,
+    neg,
+    Fr,
+    add,
+    Z1,
+    curve_order,
+)
+import os
+from typing import Sequence, Tuple, Dict, Union, Optional, List
+from .polynomial import Polynomial, EvaluationDomain
+from misc_crypto.ecc import (
+    BN254Backend,
+    multi_scalar_multiplication,
+    batch_multi_scalar_multiplication,
+    FixedBaseTable,
+    fixed_base_window,
+)
+from misc_crypto.ecc.backends.bn254 import WrappedCurvePoint
+from misc_crypto.polynomial import operations, commitments, mapped_srs
+from misc_crypto.polynomial.fft import inverse_group_fft
+from dataclasses import dataclass, field
+
+
+# Below this many coefficients, the process pool costs more than it saves
+PARALLEL_COMMIT_THRESHOLD = 2 ** 10
 
 
 class Commitment:
@@ -13,15 +39,21 @@ class SRS:
     powers_of_g1: Tuple["G1", ...]
     g2: G2
     g2_to_secret: G2
+    # domain size -> commitments of the Lagrange basis, filled by lagrange_srs
+    lagrange_bases: Dict[int, Tuple["G1", ...]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
 
 
 def srs_setup(d: int, secret: int) -> SRS:
+    bits = curve_order.bit_length()
+    table = FixedBaseTable(WrappedCurvePoint(G1), bits, fixed_base_window(d, bits))
     powers_of_g1 = [G1]
     power_of_x = 1
     for _ in range(d - 1):
-        power_of_x *= secret
-        powers_of_g1.append(multiply(G1, power_of_x))
-    g2_to_secret = multiply(G2, secret)
+        power_of_x = power_of_x * secret % curve_order
+        powers_of_g1.append(table.multiply(power_of_x).py_ecc_object)
+    g2_to_secret = multiply(G2, secret % curve_order)
     return SRS(powers_of_g1=powers_of_g1, g2=G2, g2_to_secret=g2_to_secret)
 
 
@@ -42,19 +74,135 @@ def commit(f: Polynomial, srs: SRS) -> "G1":
     return result
 
 
+def commit_many(
+    polys: Sequence[Polynomial], srs: SRS, processes: Optional[int] = None
+) -> List["G1"]:
+    """
+    [commit(f, srs) for f in polys], sharing the pass over the powers of G1 in each
+    bucket window. processes=None uses every cpu above PARALLEL_COMMIT_THRESHOLD
+    coefficients, processes=1 stays in this process.
+    """
+    if len(polys) == 0:
+        return []
+    length = max(len(f.coefficients) for f in polys)
+    if length > len(srs.powers_of_g1):
+        raise ValueError(
+            "The degree of polynomial is too high, "
+            f"got {length} coefficients and {len(srs.powers_of_g1)} powers of G1"
+        )
+    if processes is None:
+        processes = (os.cpu_count() or 1) if length >= PARALLEL_COMMIT_THRESHOLD else 1
+    points = [WrappedCurvePoint(p) for p in srs.powers_of_g1[: max(length, 1)]]
+    commitments = batch_multi_scalar_multiplication(
+        points, [f.coefficients for f in polys], processes
+    )
+    return [c.py_ecc_object for c in commitments]
+
+
+def lagrange_srs(srs: SRS, evaluation_domain: EvaluationDomain) -> Tuple["G1", ...]:
+    """
+    [L_i(secret)] for the Lagrange basis over the domain, the inverse fft of
+    srs.powers_of_g1 over G1. Computed once per domain size and kept on the srs.
+    """
+    n = len(evaluation_domain.domain)
+    basis = srs.lagrange_bases.get(n)
+    if basis is None:
+        if len(srs.powers_of_g1) < n:
+            raise ValueError(
+                f"Expect at least {n} powers of G1, got {len(srs.powers_of_g1)}"
+            )
+        points = [WrappedCurvePoint(p) for p in srs.powers_of_g1[:n]]
+        basis = tuple(
+            p.py_ecc_object for p in inverse_group_fft(points, evaluation_domain.domain)
+        )
+        srs.lagrange_bases[n] = basis
+    return basis
+
+
+def commit_evaluations(
+    evaluations: Sequence[FieldElement], lagrange_srs: Sequence["G1"]
+) -> "G1":
+    """
+    Commit to the polynomial with these evaluations over the domain,
+    same as commit(domain.inverse_fft(evaluations), srs)
+    """
+    if len(evaluations) != len(lagrange_srs):
+        raise ValueError(
+            f"Expect {len(lagrange_srs)} evaluations, got {len(evaluations)}"
+        )
+    points = [WrappedCurvePoint(p) for p in lagrange_srs]
+    return multi_scalar_multiplication(points, evaluations).py_ecc_object
+
+
+def _to_kzg_srs(srs: SRS) -> commitments.SRS:
+    powers = [WrappedCurvePoint(p) for p in srs.powers_of_g1]
+    return commitments.SRS(
+        toxic=None,
+        G1=powers[0],
+        G2=WrappedCurvePoint(srs.g2),
+        G1s=powers[1:],
+        G2s=[WrappedCurvePoint(srs.g2_to_secret)],
+        lagrange_bases={
+            n: [WrappedCurvePoint(p) for p in basis]
+            for n, basis in srs.lagrange_bases.items()
+        },
+    )
+
+
+def serialize_srs(srs: SRS) -> bytes:
+    """
+    Same format as misc_crypto.polynomial.commitments.serialize_srs
+    """
+    return commitments.serialize_srs(_to_kzg_srs(srs))
+
+
+def deserialize_srs(data: bytes) -> SRS:
+    kzg_srs = commitments.deserialize_srs(BN254Backend, data)
+    if len(kzg_srs.G2s) < 1:
+        raise ValueError("Expect the secret on G2")
+    return SRS(
+        powers_of_g1=tuple(p.py_ecc_object for p in [kzg_srs.G1] + list(kzg_srs.G1s)),
+        g2=kzg_srs.G2.py_ecc_object,
+        g2_to_secret=kzg_srs.G2s[0].py_ecc_object,
+        lagrange_bases={
+            n: tuple(p.py_ecc_object for p in basis)
+            for n, basis in kzg_srs.lagrange_bases.items()
+        },
+    )
+
+
+def write_mapped_srs(path: Union[str, os.PathLike], srs: SRS) -> None:
+    mapped_srs.write_mapped_srs(path, BN254Backend, _to_kzg_srs(srs))
+
+
+def open_mapped_srs(path: Union[str, os.PathLike]) -> SRS:
+    """
+    The powers of G1 and the Lagrange bases stay in the file, decoded on demand
+    """
+    mapped = mapped_srs.MappedSRS(path, raw=True)
+    if mapped.backend is not BN254Backend or len(mapped.G2s) < 1:
+        raise ValueError("Expect a BN254 srs with the secret on G2")
+    return SRS(
+        powers_of_g1=mapped.G1_powers,
+        g2=mapped.G2,
+        g2_to_secret=mapped.G2s[0],
+        lagrange_bases=mapped.lagrange_bases,
+    )
+
+
 def create_witness_same_z(
     polynomials: Sequence[Polynomial],
     gamma: FieldElement,
     z: FieldElement,
     srs: SRS,
 ) -> "G1":
-    h = Polynomial(Fr.zero())
+    h = [Fr.zero()]
     power_of_gamma = 1
     for p in polynomials:
         power_of_gamma *= gamma
-        h += (p - p.evaluate(z)) * power_of_gamma
-    h /= Polynomial(-z, Fr.one())
-    return commit(h, srs)
+        operations.axpy(h, power_of_gamma, p.coefficients)
+        h[0] -= power_of_gamma * p.evaluate(z)
+    return commit(Polynomial(*h) / Polynomial(-z, Fr.one()), srs)
 
 
 def verify_evaluation_same_z(
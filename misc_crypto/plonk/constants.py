@@ -1,2 +1,4 @@
 K1 = 7
 K2 = 13
+# The multiplicative generator of Fr, so no power of 2 roots of unity coset hits H
+COSET_SHIFT = 5
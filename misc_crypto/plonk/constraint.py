@@ -17,6 +17,8 @@ class ProverInput:
     public_inputs: Sequence[FieldElement]
     public_input_evaluations: Sequence[FieldElement]
     permutation: Sequence[int]
+    # The gates of the public inputs, in the order of public_inputs
+    public_input_positions: Sequence[int] = ()
 
     def number_of_gates(self):
         return len(self.witnesses.a)
@@ -390,8 +392,11 @@ class Circuit:
         public_inputs = [v.input_value for v in self.public_inputs]
 
         public_input_evaluations = []
+        public_input_positions = []
 
-        for gate in self.gates:
+        for i, gate in enumerate(self.gates):
+            if isinstance(gate, PublicInputGate):
+                public_input_positions.append(i)
             public_input_evaluations.append(
                 gate.calculate_output() if isinstance(gate, PublicInputGate) else 0
             )
@@ -405,6 +410,7 @@ class Circuit:
             public_inputs=public_inputs,
             public_input_evaluations=public_input_evaluations,
             permutation=permutation,
+            public_input_positions=public_input_positions,
         )
 
         return prover_input
@@ -2,13 +2,16 @@
 Fast Fourier Transform:
 See https://vitalik.ca/general/2019/05/12/fft.html for motivation
 """
-from typing import Sequence
+from typing import Sequence, Optional
 from .field import FieldElement, Fr
 from .utils import is_power_of_2
+from misc_crypto.polynomial.parallel_fft import should_use_parallel, four_step_fft
 
 
 def fft(
-    coefficients: Sequence[FieldElement], domain: Sequence[FieldElement]
+    coefficients: Sequence[FieldElement],
+    domain: Sequence[FieldElement],
+    parallel: Optional[bool] = None,
 ) -> Sequence[FieldElement]:
     len_coeff, len_domain = len(coefficients), len(domain)
 
@@ -22,6 +25,9 @@ def fft(
                 f"the length of domain ({len_domain})"
             )
         )
+    if should_use_parallel(domain, parallel):
+        return four_step_fft(coefficients, domain)
+
     padded_coefficients = tuple(coefficients) + (Fr(0),) * (len_domain - len_coeff)
 
     return _fft(padded_coefficients, domain)
@@ -32,8 +38,8 @@ def _fft(
 ) -> Sequence[FieldElement]:
     if len(coefficients) == 1:
         return coefficients
-    evens = fft(coefficients[::2], domain[::2])
-    odds = fft(coefficients[1::2], domain[::2])
+    evens = fft(coefficients[::2], domain[::2], parallel=False)
+    odds = fft(coefficients[1::2], domain[::2], parallel=False)
     left_output = []
     right_output = []
     for even, odd, x in zip(evens, odds, domain):
@@ -44,8 +50,10 @@ def _fft(
 
 
 def inverse_fft(
-    evaluations: Sequence[FieldElement], domain: Sequence[FieldElement]
+    evaluations: Sequence[FieldElement],
+    domain: Sequence[FieldElement],
+    parallel: Optional[bool] = None,
 ) -> Sequence[FieldElement]:
-    values = fft(evaluations, domain)
+    values = fft(evaluations, domain, parallel)
     len_values = len(values)
     return [v / len_values for v in [values[0]] + values[1:][::-1]]
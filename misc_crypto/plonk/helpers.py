@@ -4,20 +4,33 @@ from .polynomial import (
     EvaluationDomain,
 )
 import hashlib
-from py_ecc.bls.point_compression import compress_G1
+from py_ecc.optimized_bn128 import normalize, is_inf
 from .field import FQ, FieldElement, Fr
 from .constraint import ProverInput
 from .constants import K1, K2
-from typing import Sequence
+from .utils import next_power_of_2
+from typing import Sequence, Tuple, List
+from misc_crypto.polynomial import operations
+from misc_crypto.polynomial.sparse import SparsePolynomial
 
 
-def custom_hash(*args) -> bytes:
+def encode_G1(point) -> bytes:
+    """
+    The affine coordinates of a BN254 point, all zeros for infinity
+    """
+    if is_inf(point):
+        return bytes(64)
+    x, y = normalize(point)
+    return x.n.to_bytes(32, "big") + y.n.to_bytes(32, "big")
+
+
+def custom_hash(*args) -> Fr:
     m = hashlib.sha256()
     for arg in args:
         if isinstance(arg, tuple) and len(arg) == 3:
-            m.update(compress_G1(arg).to_bytes(48, "big", signed=False))
+            m.update(encode_G1(arg))
         elif isinstance(arg, int):
-            m.update(arg.to_bytes(8, "big", signed=False))
+            m.update(Fr(arg).n.to_bytes(32, "big", signed=False))
         elif isinstance(arg, FQ):
             m.update(arg.n.to_bytes(32, "big", signed=False))
         else:
@@ -27,9 +40,21 @@ def custom_hash(*args) -> bytes:
     return hash_in_Fr
 
 
-def compute_permutation_challenges(commit_a, commit_b, commit_c, public_inputs):
-    beta = custom_hash(commit_a, commit_b, commit_c, *public_inputs)
-    gamma = custom_hash(commit_a, commit_b, commit_c, *public_inputs, beta)
+def preprocessed_digest(n: int, circuit_commitments) -> Fr:
+    """
+    Seeds the transcript with the circuit: n and the commitments of
+    qm, ql, qr, qo, qc, S_sigma_1, S_sigma_2, S_sigma_3
+    """
+    return custom_hash(n, *circuit_commitments)
+
+
+def compute_permutation_challenges(
+    preprocessed, commit_a, commit_b, commit_c, public_inputs
+):
+    beta = custom_hash(preprocessed, commit_a, commit_b, commit_c, *public_inputs)
+    gamma = custom_hash(
+        preprocessed, commit_a, commit_b, commit_c, *public_inputs, beta
+    )
     return beta, gamma
 
 
@@ -37,7 +62,27 @@ def vanishing_polynomial(n: int):
     """
     Z_H(X) := X^n - 1
     """
-    return Polynomial(*([-1] + [0] * (n - 1) + [1]))
+    return SparsePolynomial.vanishing(n, Fr.one())
+
+
+def sigma_evaluations(
+    prover_input: ProverInput, eval_domain: EvaluationDomain
+) -> Tuple[List[FieldElement], List[FieldElement], List[FieldElement]]:
+    """
+    S_sigma_j(w^i): the wire at position i of column j is copied from position
+    permutation[i + (j - 1) * n], labelled w^k, K1 * w^k, or K2 * w^k by its column
+    """
+    labels = (
+        list(eval_domain.domain)
+        + [K1 * d for d in eval_domain.domain]
+        + [K2 * d for d in eval_domain.domain]
+    )
+    sigma_1, sigma_2, sigma_3 = prover_input.split_permutations()
+    return (
+        [labels[p] for p in sigma_1],
+        [labels[p] for p in sigma_2],
+        [labels[p] for p in sigma_3],
+    )
 
 
 def get_permutation_part(
@@ -47,7 +92,7 @@ def get_permutation_part(
     eval_domain: EvaluationDomain,
 ) -> Sequence[FieldElement]:
     a, b, c = prover_input.split_witnesses()
-    sigma_1, sigma_2, sigma_3 = prover_input.split_permutations()
+    sigma_1, sigma_2, sigma_3 = sigma_evaluations(prover_input, eval_domain)
     s_id_1 = [d for d in eval_domain.domain]
     s_id_2 = [K1 * d for d in eval_domain.domain]
     s_id_3 = [K2 * d for d in eval_domain.domain]
@@ -63,6 +108,18 @@ def get_permutation_part(
     return products
 
 
+def circuit_polynomials(
+    prover_input: ProverInput, eval_domain: EvaluationDomain
+) -> Tuple[Polynomial, ...]:
+    """
+    qm, ql, qr, qo, qc, S_sigma_1, S_sigma_2, S_sigma_3, fixed by the circuit
+    """
+    columns = list(prover_input.flatten_selectors()) + list(
+        sigma_evaluations(prover_input, eval_domain)
+    )
+    return tuple(eval_domain.inverse_fft([Fr(v) for v in column]) for column in columns)
+
+
 def compute_satisfiability_polynomial(
     a_evals, b_evals, c_evals, prover_input: ProverInput
 ) -> Polynomial:
@@ -77,56 +134,60 @@ def compute_satisfiability_polynomial(
     return results
 
 
-def compute_t2_evalutaion(
-    a_evals,
-    b_evals,
-    c_evals,
-    z_evals,
-    alpha,
-    beta,
-    gamma,
-    evalutaion_domain: EvaluationDomain,
-):
-    results = []
-    alpha_square = alpha * alpha
-
-    for a, b, c, z, d in zip(
-        a_evals, b_evals, c_evals, z_evals, evalutaion_domain.domain
-    ):
-        aa = a + d * beta + gamma
-        bb = b + d * beta * K1 + gamma
-        cc = c + d * beta * K2 + gamma
+def quotient_domain_factor(n: int) -> int:
+    """
+    t(X) has degree up to 3n + 5 with the blinding, so it is determined by its
+    evaluations on factor * n points. That is 4n points unless the circuit is tiny.
+    """
+    return max(4, next_power_of_2(-(-(3 * n + 6) // n)))
 
-        results.append(aa * bb * cc * z * alpha_square)
-    return results
 
+def compute_quotient_evaluations(
+    n: int,
+    points: Sequence[FieldElement],
+    wires: Sequence[Sequence[FieldElement]],
+    z_evals: Sequence[FieldElement],
+    circuit_evals: Sequence[Sequence[FieldElement]],
+    pi_evals: Sequence[FieldElement],
+    alpha: FieldElement,
+    beta: FieldElement,
+    gamma: FieldElement,
+) -> List[FieldElement]:
+    """
+    t(x) for every x of a coset of the factor * n roots of unity, point-wise.
 
-def compute_t3_evaluation(
-    a_evals,
-    b_evals,
-    c_evals,
-    z_coset_evals,
-    alpha,
-    beta,
-    gamma,
-    n,
-    sigma1,
-    sigma2,
-    sigma3,
-):
-    results = []
+    x^n takes only `factor` distinct values on the coset, so 1 / Z_H(x) is a few
+    constants, and L1(x) = Z_H(x) / (n * (x - 1)) needs a single batch inversion.
+    z(wx) is z at the point `factor` places further.
+    """
+    factor = len(points) // n
+    vanishing = [points[j] ** n - 1 for j in range(factor)]
+    inverse_vanishing = operations.batch_inverse(vanishing)
+    inverse_x_minus_1 = operations.batch_inverse([(x - 1) * n for x in points])
+    qm, ql, qr, qo, qc, sigma_1, sigma_2, sigma_3 = circuit_evals
+    a, b, c = wires
     alpha_square = alpha * alpha
-
-    for i in range(4 * n):
-        if i < n:
-            aa = a_evals[i] + sigma1[i] * beta + gamma
-            bb = b_evals[i] + sigma2[i] * beta + gamma
-            cc = c_evals[i] + sigma3[i] * beta + gamma
-        else:
-            aa = a_evals[i] + gamma
-            bb = b_evals[i] + gamma
-            cc = c_evals[i] + gamma
-        results.append(aa * bb * cc * z_coset_evals[i] * alpha_square)
+    results = []
+    for i, x in enumerate(points):
+        gate = a[i] * b[i] * qm[i] + a[i] * ql[i] + b[i] * qr[i] + c[i] * qo[i]
+        gate += qc[i] + pi_evals[i]
+        permutation = (
+            (a[i] + beta * x + gamma)
+            * (b[i] + beta * K1 * x + gamma)
+            * (c[i] + beta * K2 * x + gamma)
+            * z_evals[i]
+        )
+        permutation -= (
+            (a[i] + beta * sigma_1[i] + gamma)
+            * (b[i] + beta * sigma_2[i] + gamma)
+            * (c[i] + beta * sigma_3[i] + gamma)
+            * z_evals[(i + factor) % len(points)]
+        )
+        first = (z_evals[i] - 1) * vanishing[i % factor] * inverse_x_minus_1[i]
+        results.append(
+            (gate + alpha * permutation + alpha_square * first)
+            * inverse_vanishing[i % factor]
+        )
     return results
 
 
@@ -1,24 +1,183 @@
-from typing import Sequence, Union
+from typing import Sequence, Union, Optional, List
 from .field import FieldElement, roots_of_unity
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import cached_property
 from .fft import fft, inverse_fft
-from .utils import next_power_of_2
+from .utils import next_power_of_2, is_power_of_2
+from misc_crypto.polynomial import operations
+from misc_crypto.polynomial.fft import truncated_fft, truncated_domain
+from misc_crypto.polynomial.sparse import SparsePolynomial
 
 
 @dataclass
 class EvaluationDomain:
     domain: Sequence[FieldElement]
+    # Use the four-step fft over worker processes, None means automatic by size
+    parallel: Optional[bool] = field(default=None, compare=False)
 
     @classmethod
-    def from_roots_of_unity(cls, order: int):
+    def from_roots_of_unity(cls, order: int, parallel: Optional[bool] = None):
         power_of_2_order = next_power_of_2(order)
         domain = roots_of_unity(power_of_2_order)
-        return cls(domain)
+        return cls(domain, parallel)
 
     def inverse_fft(self, evaluations: Sequence[FieldElement]) -> "Polynomial":
-        coefficients = inverse_fft(evaluations, self.domain)
+        coefficients = inverse_fft(evaluations, self.domain, self.parallel)
         return Polynomial(*coefficients)
 
+    def coset_fft(
+        self, polynomial: "Polynomial", shift: FieldElement
+    ) -> Sequence[FieldElement]:
+        """
+        The evaluations of the polynomial over shift * domain
+        """
+        scaled = []
+        power = 1
+        for c in polynomial.coefficients:
+            scaled.append(c * power)
+            power *= shift
+        return fft(scaled, self.domain, self.parallel)
+
+    def coset_inverse_fft(
+        self, evaluations: Sequence[FieldElement], shift: FieldElement
+    ) -> "Polynomial":
+        coefficients = inverse_fft(evaluations, self.domain, self.parallel)
+        inverse_shift = 1 / shift
+        power = 1
+        scaled = []
+        for c in coefficients:
+            scaled.append(c * power)
+            power *= inverse_shift
+        return Polynomial(*scaled)
+
+    @cached_property
+    def barycentric_weights(self) -> Sequence[FieldElement]:
+        return operations.barycentric_weights(self.domain)
+
+    def _extended_generator(self, factor: int) -> FieldElement:
+        generator = roots_of_unity(len(self.domain) * factor)[1]
+        if generator ** factor != self.domain[1]:
+            raise ValueError("Only domains from roots_of_unity can be extended")
+        return generator
+
+    def extended(
+        self, factor: int, coset: Optional[FieldElement] = None
+    ) -> "EvaluationDomain":
+        """
+        The points of the domain `factor` times bigger, shifted by `coset`
+        If factor is not a power of 2, they are the first factor * n points of the
+        next power of 2 domain in bit-reversed order, see truncated_domain.
+        """
+        if not is_power_of_2(factor):
+            full_domain = self.extended(next_power_of_2(factor), coset).domain
+            length = len(self.domain) * factor
+            return EvaluationDomain(
+                tuple(truncated_domain(full_domain, length)), self.parallel
+            )
+        generator = self._extended_generator(factor)
+        point = 1 if coset is None else coset
+        domain = []
+        for _ in range(len(self.domain) * factor):
+            domain.append(point)
+            point *= generator
+        return EvaluationDomain(tuple(domain), self.parallel)
+
+    def extend(
+        self,
+        evaluations: Sequence[FieldElement],
+        factor: int,
+        coset: Optional[Union[FieldElement, Sequence[FieldElement]]] = None,
+    ):
+        """
+        Low degree extension: from the evaluations on this domain to the evaluations
+        on `self.extended(factor, coset)`.
+        Pass a sequence of cosets to get one extension for each of them, they all
+        share a single inverse fft.
+        """
+        return self.extend_columns([evaluations], factor, coset)[0]
+
+    def extend_columns(
+        self,
+        columns: Sequence[Sequence[FieldElement]],
+        factor: int,
+        coset: Optional[Union[FieldElement, Sequence[FieldElement]]] = None,
+    ):
+        """
+        Low degree extension of several columns at once.
+
+        The point m = i * factor + j of the extended domain is (h * g^j) * w^i,
+        where g is the generator of the extended domain and w = g^factor.
+        So instead of a padded fft of size factor * n, we run `factor` ffts of size n
+        on the coefficients scaled by (h * g^j)^k.
+        The scalings only depend on the domain, so we compute them once for all columns.
+        """
+        if not is_power_of_2(factor):
+            return self._truncated_extend_columns(columns, factor, coset)
+        n = len(self.domain)
+        generator = self._extended_generator(factor)
+        is_many_cosets, shifts = self._parse_cosets(coset)
+
+        scalings = []
+        for shift in shifts:
+            scalings_for_shift = []
+            sub_shift = shift
+            for _ in range(factor):
+                powers = []
+                power = 1
+                for _ in range(n):
+                    powers.append(power)
+                    power *= sub_shift
+                scalings_for_shift.append(powers)
+                sub_shift *= generator
+            scalings.append(scalings_for_shift)
+
+        results = []
+        for evaluations in columns:
+            coefficients = inverse_fft(evaluations, self.domain, self.parallel)
+            extensions = []
+            for scalings_for_shift in scalings:
+                sub_evaluations = [
+                    fft(
+                        [c * p for c, p in zip(coefficients, powers)],
+                        self.domain,
+                        self.parallel,
+                    )
+                    for powers in scalings_for_shift
+                ]
+                extensions.append(
+                    [sub_evaluations[j][i] for i in range(n) for j in range(factor)]
+                )
+            results.append(extensions if is_many_cosets else extensions[0])
+        return results
+
+    def _truncated_extend_columns(self, columns, factor: int, coset):
+        """
+        Evaluate only the first factor * n points of the bigger domain
+        with the truncated fft, instead of all of them
+        """
+        length = len(self.domain) * factor
+        full_domain = self.extended(next_power_of_2(factor)).domain
+        is_many_cosets, shifts = self._parse_cosets(coset)
+        results = []
+        for evaluations in columns:
+            coefficients = inverse_fft(evaluations, self.domain, self.parallel)
+            extensions = []
+            for shift in shifts:
+                scaled = []
+                power = 1
+                for c in coefficients:
+                    scaled.append(c * power)
+                    power *= shift
+                extensions.append(truncated_fft(scaled, full_domain, length))
+            results.append(extensions if is_many_cosets else extensions[0])
+        return results
+
+    @staticmethod
+    def _parse_cosets(coset):
+        is_many_cosets = isinstance(coset, (list, tuple))
+        shifts = coset if is_many_cosets else [1 if coset is None else coset]
+        return is_many_cosets, shifts
+
 
 class Polynomial:
     """
@@ -73,8 +232,10 @@ class Polynomial:
         return result
 
     def remove_leading_zeros(self) -> None:
-        while len(self.coefficients) > 0 and self.coefficients[-1] == 0:
-            self.coefficients = self.coefficients[:-1]
+        end = len(self.coefficients)
+        while end > 0 and self.coefficients[end - 1] == 0:
+            end -= 1
+        self.coefficients = self.coefficients[:end]
 
     @property
     def degree(self) -> int:
@@ -108,29 +269,51 @@ class Polynomial:
             raise Exception("Unreachable")
 
     def __mul__(self, other: Union["Polynomial", FieldElement]) -> "Polynomial":
-        if isinstance(other, Polynomial):
+        if isinstance(other, SparsePolynomial):
+            return Polynomial(*other.multiply_dense(self.coefficients))
+        elif isinstance(other, EvaluationForm):
+            # Let EvaluationForm.__r*__ keep the evaluation form
+            return NotImplemented
+        elif isinstance(other, Polynomial):
             return self.multiply_polynomial(other)
         elif getattr(other, "__mul__", None) is not None:
             return self.multiply_constant(other)
         else:
             raise TypeError("invalid multiplication")
 
+    def __rmul__(self, other) -> "Polynomial":
+        return self.__mul__(other)
+
     def __add__(self, other):
-        if isinstance(other, Polynomial):
+        if isinstance(other, SparsePolynomial):
+            return self.add_polynomial(Polynomial(*other.to_dense()))
+        elif isinstance(other, EvaluationForm):
+            return NotImplemented
+        elif isinstance(other, Polynomial):
             return self.add_polynomial(other)
         elif getattr(other, "__add__", None) is not None:
             return self.add_scalar(other)
         else:
             raise TypeError("invalid addition")
 
+    def __radd__(self, other) -> "Polynomial":
+        return self.__add__(other)
+
     def __sub__(self, other):
-        if isinstance(other, Polynomial):
+        if isinstance(other, SparsePolynomial):
+            return self.add_polynomial(Polynomial(*(-other).to_dense()))
+        elif isinstance(other, EvaluationForm):
+            return NotImplemented
+        elif isinstance(other, Polynomial):
             return self.add_polynomial(-other)
         elif getattr(other, "__sub__", None) is not None:
             return self.add_scalar(-other)
         else:
             raise TypeError("invalid subtraction")
 
+    def __rsub__(self, other) -> "Polynomial":
+        return (-self).__add__(other)
+
     def __neg__(self):
         return Polynomial(*[-c for c in self.coefficients])
 
@@ -138,11 +321,10 @@ class Polynomial:
         return Polynomial(*(c * other for c in self.coefficients))
 
     def multiply_polynomial(self, other: "Polynomial") -> "Polynomial":
-        result = Polynomial()
+        result: List[FieldElement] = []
         for i, self_c in enumerate(self.coefficients):
-            coeff = (0,) * i + tuple(self_c * other_c for other_c in other.coefficients)
-            result = result.add_polynomial(Polynomial(*coeff))
-        return result
+            operations.axpy(result, self_c, other.coefficients, i)
+        return Polynomial(*result)
 
     def __eq__(self, other: "Polynomial") -> bool:
         return self.coefficients == other.coefficients
@@ -154,30 +336,41 @@ class Polynomial:
     def is_zero(self) -> bool:
         return len(self.coefficients) == 0 or self.coefficients[0] == 0
 
-    def __truediv__(self, other: "Polynomial") -> "Polynomial":
+    def __truediv__(self, other: Union["Polynomial", SparsePolynomial]) -> "Polynomial":
+        if isinstance(other, SparsePolynomial):
+            quotient, remainder = other.divide_dense(self.coefficients)
+            if any(r != 0 for r in remainder):
+                raise ValueError("Remainder is not zero:", Polynomial(*remainder))
+            return Polynomial(*quotient)
+
         if other.is_zero:
             raise ZeroDivisionError
 
         if self.degree < other.degree:
             raise ValueError("other has higher degree:", self, other)
 
-        quotient = Polynomial(0)
-        remainder = self
-        for _ in range(self.degree - other.degree + 1):
-            quotient_coefficient = remainder.coefficients[-1] / other.coefficients[-1]
-            multiplier = Polynomial(quotient_coefficient).shift(
-                remainder.degree - other.degree
-            )
-            quotient += multiplier
-            remainder -= multiplier * other
+        remainder = list(self.coefficients)
+        divisor = other.coefficients
+        quotient = [0] * (self.degree - other.degree + 1)
+        for i in reversed(range(len(quotient))):
+            quotient_coefficient = remainder[i + other.degree - 1] / divisor[-1]
+            quotient[i] = quotient_coefficient
+            operations.axpy(remainder, -quotient_coefficient, divisor, i)
+
+        if any(r != 0 for r in remainder):
+            raise ValueError("Remainder is not zero:", Polynomial(*remainder))
 
-        if not remainder.is_zero:
-            raise ValueError("Remainder is not zero:", remainder)
+        return Polynomial(*quotient)
 
-        return quotient
+    def __rtruediv__(self, other: SparsePolynomial) -> "Polynomial":
+        if isinstance(other, SparsePolynomial):
+            return Polynomial(*other.to_dense()) / self
+        return NotImplemented
 
     def fft(self, evaluation_domain: EvaluationDomain) -> Sequence[FieldElement]:
-        evaluations = fft(self.coefficients, evaluation_domain.domain)
+        evaluations = fft(
+            self.coefficients, evaluation_domain.domain, evaluation_domain.parallel
+        )
         return evaluations
 
     def coset_fft(self, evaluation_domain: EvaluationDomain) -> Sequence[FieldElement]:
@@ -192,10 +385,127 @@ class Polynomial:
         for c in self.coefficients:
             _coeff.append(c * power)
             power *= d
-        evaluations = fft(_coeff, evaluation_domain.domain)
+        evaluations = fft(_coeff, evaluation_domain.domain, evaluation_domain.parallel)
         return evaluations
 
 
+class EvaluationForm:
+    """
+    LagrangeForm: the evaluations of a polynomial over an EvaluationDomain
+
+    Add, sub, and mul are element-wise and need no fft.
+    The product is only meaningful while its degree fits in the domain.
+    """
+
+    evaluations: Sequence[FieldElement]
+    domain: EvaluationDomain
+
+    def __init__(
+        self, evaluations: Sequence[FieldElement], domain: EvaluationDomain
+    ) -> None:
+        if len(evaluations) != len(domain.domain):
+            raise ValueError(
+                f"Expect {len(domain.domain)} evaluations, got {len(evaluations)}"
+            )
+        self.evaluations = tuple(evaluations)
+        self.domain = domain
+        self._polynomial = None
+
+    @classmethod
+    def from_polynomial(
+        cls,
+        p: Union[Polynomial, Sequence[FieldElement]],
+        domain: EvaluationDomain,
+    ) -> "EvaluationForm":
+        """
+        Accept a Polynomial or a list of coefficients as in misc_crypto.polynomial.operations
+        """
+        polynomial = p if isinstance(p, Polynomial) else Polynomial(*p)
+        evaluation_form = cls(polynomial.fft(domain), domain)
+        evaluation_form._polynomial = polynomial
+        return evaluation_form
+
+    def __repr__(self):
+        return f"EvaluationForm<{list(self.evaluations)}>"
+
+    def _check_domain(self, other: "EvaluationForm") -> None:
+        if self.domain.domain != other.domain.domain:
+            raise ValueError("EvaluationForms are over different domains")
+
+    def __add__(self, other) -> "EvaluationForm":
+        if isinstance(other, EvaluationForm):
+            self._check_domain(other)
+            evaluations = [a + b for a, b in zip(self.evaluations, other.evaluations)]
+        elif isinstance(other, Polynomial):
+            return self + EvaluationForm.from_polynomial(other, self.domain)
+        else:
+            evaluations = [a + other for a in self.evaluations]
+        return EvaluationForm(evaluations, self.domain)
+
+    def __radd__(self, other) -> "EvaluationForm":
+        return self + other
+
+    def __neg__(self) -> "EvaluationForm":
+        return EvaluationForm([-a for a in self.evaluations], self.domain)
+
+    def __sub__(self, other) -> "EvaluationForm":
+        return self + (-other)
+
+    def __rsub__(self, other) -> "EvaluationForm":
+        return (-self) + other
+
+    def __mul__(self, other) -> "EvaluationForm":
+        if isinstance(other, EvaluationForm):
+            self._check_domain(other)
+            evaluations = [a * b for a, b in zip(self.evaluations, other.evaluations)]
+        elif isinstance(other, Polynomial):
+            return self * EvaluationForm.from_polynomial(other, self.domain)
+        else:
+            evaluations = [a * other for a in self.evaluations]
+        return EvaluationForm(evaluations, self.domain)
+
+    def __rmul__(self, other) -> "EvaluationForm":
+        return self * other
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, EvaluationForm):
+            return NotImplemented
+        return self.domain.domain == other.domain.domain and tuple(
+            self.evaluations
+        ) == tuple(other.evaluations)
+
+    def evaluate(self, x: FieldElement) -> FieldElement:
+        """
+        Barycentric evaluation in O(n) with the domain's precomputed weights
+        """
+        return operations.barycentric_evaluate(
+            self.domain.domain, self.domain.barycentric_weights, self.evaluations, x
+        )
+
+    def to_polynomial(self) -> Polynomial:
+        """
+        Convert to the coefficient form lazily, the result is cached
+        """
+        if self._polynomial is None:
+            self._polynomial = self.domain.inverse_fft(self.evaluations)
+        return self._polynomial
+
+    @property
+    def coefficients(self) -> Sequence[FieldElement]:
+        return self.to_polynomial().coefficients
+
+
+def evaluate_many(
+    polynomials: Sequence[Polynomial], points: Sequence[FieldElement]
+) -> Sequence[Sequence[FieldElement]]:
+    """
+    result[i][j] == polynomials[i].evaluate(points[j]), sharing one power table
+    """
+    return operations.evaluate_many(
+        [p.coefficients or (0,) for p in polynomials], points
+    )
+
+
 def lagrange(x: Sequence[FieldElement], y: Sequence[FieldElement]) -> Polynomial:
     if len(x) != len(y):
         raise ValueError("length should not be different")
@@ -1,181 +1,242 @@
-# flake8: noqa
-
-from .field import Fr
-from .polynomial import Polynomial, EvaluationDomain
-from .commitment import commit, SRS
+"""
+The prover of the PLONK paper https://eprint.iacr.org/2019/953 (with r(zeta) in
+the proof), one round per yield. Use create_proof for the whole proof at once.
+"""
+import secrets
+from dataclasses import dataclass
+from typing import Sequence, Iterator, Tuple, Any, Optional
+from .field import Fr, FieldElement, G1, curve_order
+from .polynomial import Polynomial, EvaluationDomain, evaluate_many
+from .commitment import commit_many, SRS
 from .constraint import ProverInput
+from .constants import K1, K2, COSET_SHIFT
+from misc_crypto.polynomial import operations
 
 from .helpers import (
     custom_hash,
     compute_permutation_challenges,
+    preprocessed_digest,
     vanishing_polynomial,
     get_permutation_part,
-    compute_satisfiability_polynomial,
-    compute_t2_evalutaion,
-    compute_t3_evaluation,
+    circuit_polynomials,
+    quotient_domain_factor,
+    compute_quotient_evaluations,
 )
 
 
-def get_public_input(witnesses):
-    return witnesses
-
-
-def prove(prover_input: ProverInput, srs: SRS):
+@dataclass
+class Proof:
+    public_inputs: Sequence[FieldElement]
+    commit_a: G1
+    commit_b: G1
+    commit_c: G1
+    commit_z: G1
+    commit_t_lo: G1
+    commit_t_mid: G1
+    commit_t_hi: G1
+    a_eval: FieldElement
+    b_eval: FieldElement
+    c_eval: FieldElement
+    sigma1_eval: FieldElement
+    sigma2_eval: FieldElement
+    z_omega_eval: FieldElement
+    r_eval: FieldElement
+    commit_w_zeta: G1
+    commit_w_zeta_omega: G1
+
+    @classmethod
+    def from_rounds(cls, rounds: Sequence[Tuple[Any, ...]]) -> "Proof":
+        (public_inputs, *commit_abc), commit_z, commit_t, evaluations, openings = rounds
+        return cls(
+            public_inputs, *commit_abc, commit_z, *commit_t, *evaluations, *openings
+        )
+
+
+def random_scalars(count: int) -> Sequence[Fr]:
+    return [Fr(secrets.randbelow(curve_order)) for _ in range(count)]
+
+
+def opening_polynomial(
+    polynomials: Sequence[Polynomial],
+    scalars: Sequence[FieldElement],
+    evaluation: FieldElement,
+    point: FieldElement,
+) -> Polynomial:
+    """
+    (sum(scalar_i * p_i) - evaluation) / (X - point)
+    """
+    h = [Fr.zero()]
+    for p, scalar in zip(polynomials, scalars):
+        operations.axpy(h, scalar, p.coefficients)
+    h[0] -= evaluation
+    return Polynomial(*h) / Polynomial(-point, Fr.one())
+
+
+def prove(
+    prover_input: ProverInput,
+    srs: SRS,
+    circuit_commitments: Optional[Sequence["G1"]] = None,
+) -> Iterator[Tuple[Any, ...]]:
+    """
+    circuit_commitments are the commitments of the verification key, computed
+    here if not given
+    """
     n = prover_input.number_of_gates()
     witnesses = prover_input.witnesses
     domain_n = EvaluationDomain.from_roots_of_unity(n)
+    omega = domain_n.domain[1]
     vanishing = vanishing_polynomial(n)
+    circuit = circuit_polynomials(prover_input, domain_n)
+    qm, ql, qr, qo, qc, sigma1, sigma2, sigma3 = circuit
+    if circuit_commitments is None:
+        circuit_commitments = commit_many(circuit, srs)
+    preprocessed = preprocessed_digest(n, circuit_commitments)
 
-    # TODO: make it random
-    b1, b2, b3, b4, b5, b6, b7, b8, b9 = [Fr(i) for i in range(9)]
+    b1, b2, b3, b4, b5, b6, b7, b8, b9 = random_scalars(9)
 
-    a = Polynomial(b2, b1) * vanishing + domain_4n.inverse_fft(witnesses.a)
-    b = Polynomial(b4, b3) * vanishing + domain_4n.inverse_fft(witnesses.b)
-    c = Polynomial(b6, b5) * vanishing + domain_4n.inverse_fft(witnesses.c)
+    a = Polynomial(b2, b1) * vanishing + domain_n.inverse_fft(
+        [Fr(w) for w in witnesses.a]
+    )
+    b = Polynomial(b4, b3) * vanishing + domain_n.inverse_fft(
+        [Fr(w) for w in witnesses.b]
+    )
+    c = Polynomial(b6, b5) * vanishing + domain_n.inverse_fft(
+        [Fr(w) for w in witnesses.c]
+    )
 
-    commit_a = commit(a, srs)
-    commit_b = commit(b, srs)
-    commit_c = commit(c, srs)
+    commit_a, commit_b, commit_c = commit_many([a, b, c], srs)
 
     # First output
     yield prover_input.public_inputs, commit_a, commit_b, commit_c
 
     beta, gamma = compute_permutation_challenges(
-        commit_a, commit_b, commit_c, prover_input.public_inputs
+        preprocessed, commit_a, commit_b, commit_c, prover_input.public_inputs
     )
 
     # compute permutation polynomial
-    evalutations = get_permutation_part(prover_input, beta, gamma, domain_4n)
-    z = domain_4n.inverse_fft(evalutations)  # + noise
-    commit_z = commit(z, srs)
+    evalutations = get_permutation_part(prover_input, beta, gamma, domain_n)
+    z = Polynomial(b9, b8, b7) * vanishing + domain_n.inverse_fft(evalutations)
+    (commit_z,) = commit_many([z], srs)
 
     # Second output
     yield commit_z
 
     # Compute quotient challenge
-    alpha = custom_hash(commit_a, commit_b, commit_c, commit_z)
-
-    a_evals = a.fft(domain_4n)
-    b_evals = b.fft(domain_4n)
-    c_evals = c.fft(domain_4n)
-
-    l1 = vanishing / (Polynomial(-Fr(1), Fr(1)) * Fr(n))  # (x^n - 1)/ ((x - 1) * n)
-    satisfiability_evals = compute_satisfiability_polynomial(
-        a_evals, b_evals, c_evals, prover_input
-    )
-    t1 = domain_4n.inverse_fft(satisfiability_evals) * alpha / vanishing
-
-    z_evals = z.fft(domain_4n)
-
-    t2_evals = compute_t2_evalutaion(
-        a_evals, b_evals, c_evals, z_evals, alpha, beta, gamma, domain_4n
-    )
-    t2 = domain_4n.inverse_fft(t2_evals)
-
-    sigma1, sigma2, sigma3 = prover_input.split_permutations()
-
-    z_coset_evals = z.coset_fft(domain_4n)
-
-    t3_evals = compute_t3_evaluation(
-        a_evals,
-        b_evals,
-        c_evals,
-        z_coset_evals,
+    alpha = custom_hash(gamma, commit_z)
+
+    # Evaluate everything on a coset of the factor * n roots of unity, where the
+    # division by Z_H is point-wise, and interpolate t back with one inverse fft
+    factor = quotient_domain_factor(n)
+    domain_quotient = domain_n.extended(factor)
+    shift = Fr(COSET_SHIFT)
+    points = [shift * x for x in domain_quotient.domain]
+    pi = domain_n.inverse_fft(prover_input.get_public_input_evaluations())
+    a_coset, b_coset, c_coset, z_coset, pi_coset, *circuit_cosets = [
+        domain_quotient.coset_fft(p, shift)
+        for p in (a, b, c, z, pi, qm, ql, qr, qo, qc, sigma1, sigma2, sigma3)
+    ]
+    t_evals = compute_quotient_evaluations(
+        n,
+        points,
+        (a_coset, b_coset, c_coset),
+        z_coset,
+        circuit_cosets,
+        pi_coset,
         alpha,
         beta,
         gamma,
-        n,
-        sigma1,
-        sigma2,
-        sigma3,
     )
-
-    t3 = domain_4n.inverse_fft(t3_evals)
-    t_23 = (t2 - t3) / vanishing
-
-    t4 = (z - Fr(1)) * l1 * (alpha ** 3) / vanishing
+    t = domain_quotient.coset_inverse_fft(t_evals, shift)
+    if t.degree > 3 * n + 6:
+        raise ValueError("The quotient is not a polynomial, is the circuit satisfied?")
 
     # Compute quotient polynomial
-    t = t1 + t_23 + t4
     coeff = t.coefficients
     t_lo = Polynomial(*coeff[:n])
     t_mid = Polynomial(*coeff[n : 2 * n])
     t_hi = Polynomial(*coeff[2 * n :])
-    commit_t_lo = commit(t_lo, srs)
-    commit_t_mid = commit(t_mid, srs)
-    commit_t_hi = commit(t_hi, srs)
+    commit_t_lo, commit_t_mid, commit_t_hi = commit_many([t_lo, t_mid, t_hi], srs)
 
     # Third output
     yield commit_t_lo, commit_t_mid, commit_t_hi
 
     # Compute evaluation challenge
-    zz = custom_hash(
-        commit_a, commit_b, commit_c, commit_z, commit_t_lo, commit_t_mid, commit_t_hi
-    )
+    zeta = custom_hash(alpha, commit_t_lo, commit_t_mid, commit_t_hi)
 
-    a_eval = a.evaluate(zz)
-    b_eval = b.evaluate(zz)
-    c_eval = c.evaluate(zz)
-    sigma1_eval = sigma1.evaluate(zz)
-    sigma2_eval = sigma2.evaluate(zz)
-    t_eval = t.evaluate(zz)
-    z_eval = z.shift(1).evaluate(zz)
+    a_eval, b_eval, c_eval, sigma1_eval, sigma2_eval, t_eval = [
+        evaluations[0]
+        for evaluations in evaluate_many([a, b, c, sigma1, sigma2, t], [zeta])
+    ]
+    z_omega_eval = z.evaluate(zeta * omega)
+    l1_eval = (zeta ** n - 1) / ((zeta - 1) * n)
 
     # Compute linearisation polynomial
-
     r = (
-        (a_eval * b_eval * qm + a_eval * ql + b_eval * qr + c_eval * qo + qc) * alpha
-        + (a_eval + beta * zz + gamma)
-        * (b_eval + beta * k1 * zz + gamma)
-        * (c_eval + beta * k2 * zz + gamma)
-        * z
-        * alpha ** 2
-        - (a_eval + beta * sigma1_eval + gamma)
-        * (b_eval + beta * sigma2_eval + gamma)
-        * beta
-        * z_eval
-        * sigma3
-        * alpha ** 2
-        + z * l1.evaluate(zz) * alpha ** 3
+        qm * (a_eval * b_eval)
+        + ql * a_eval
+        + qr * b_eval
+        + qo * c_eval
+        + qc
+        + z
+        * (
+            (a_eval + beta * zeta + gamma)
+            * (b_eval + beta * K1 * zeta + gamma)
+            * (c_eval + beta * K2 * zeta + gamma)
+            * alpha
+            + l1_eval * alpha ** 2
+        )
+        - sigma3
+        * (
+            (a_eval + beta * sigma1_eval + gamma)
+            * (b_eval + beta * sigma2_eval + gamma)
+            * beta
+            * z_omega_eval
+            * alpha
+        )
     )
     # Compute linearisation evaluation
-    r_eval = r.evaluate(zz)
+    r_eval = r.evaluate(zeta)
 
     # Forth output
-    yield a_eval, b_eval, c_eval, sigma1_eval, sigma2_eval, z_eval, t_eval, r_eval
+    yield a_eval, b_eval, c_eval, sigma1_eval, sigma2_eval, z_omega_eval, r_eval
 
     # Compute opening challenge
     v = custom_hash(
-        commit_a,
-        commit_b,
-        commit_c,
-        commit_z,
-        commit(t, srs),
+        zeta,
         a_eval,
         b_eval,
         c_eval,
         sigma1_eval,
         sigma2_eval,
-        z_eval,
-        t_eval,
+        z_omega_eval,
         r_eval,
     )
 
     # Compute opening polynomial
-    wz = (
-        (t_lo + (zz ** n) * t_mid + z ** (2 * n) * t_hi - t_eval)
-        + v * (r - r_eval)
-        + v ** 2 * (a - a_eval)
-        + v ** 3 * (b - b_eval)
-        + v ** 4 * (c - c_eval)
-        + v ** 5 * (sigma1 - sigma1_eval)
-        + v ** 6 * (sigma2 - sigma2_eval)
-    ) / Polynomial(-zz)
+    wz = opening_polynomial(
+        [t_lo, t_mid, t_hi, r, a, b, c, sigma1, sigma2],
+        [Fr.one(), zeta ** n, zeta ** (2 * n)] + [v ** i for i in range(1, 7)],
+        t_eval
+        + v * r_eval
+        + v ** 2 * a_eval
+        + v ** 3 * b_eval
+        + v ** 4 * c_eval
+        + v ** 5 * sigma1_eval
+        + v ** 6 * sigma2_eval,
+        zeta,
+    )
 
     # Compute opening polynomial
-    wz_omega = v ** 7 * (z - zz) / Polynomial(-z * omega)
+    wz_omega = opening_polynomial([z], [Fr.one()], z_omega_eval, zeta * omega)
 
-    commit_wz = commit(wz, srs)
-    commit_wz_omega = commit(wz_omega, srs)
+    commit_wz, commit_wz_omega = commit_many([wz, wz_omega], srs)
     # Fifth output
     yield commit_wz, commit_wz_omega
+
+
+def create_proof(
+    prover_input: ProverInput,
+    srs: SRS,
+    circuit_commitments: Optional[Sequence["G1"]] = None,
+) -> Proof:
+    return Proof.from_rounds(tuple(prove(prover_input, srs, circuit_commitments)))
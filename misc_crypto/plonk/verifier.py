@@ -0,0 +1,228 @@
+"""
+The verifier of the PLONK paper https://eprint.iacr.org/2019/953 for the proofs of
+prover.py. Everything folds into one MSM and a two-pair pairing check
+
+    e([W_zeta] + u [W_zeta_omega], [x]_2) == e(zeta [W_zeta] + u zeta w [W_zeta_omega] + [F] - [E], [1]_2)
+
+verify_batch adds these equations of many proofs with random weights, so k proofs
+cost one pairing check, and the verification key commitments join the MSM once.
+"""
+import secrets
+from dataclasses import dataclass
+from typing import Sequence, List, Tuple
+from py_ecc.optimized_bn128 import is_on_curve, b as curve_b
+from .field import Fr, FieldElement, G1, G2, neg, pairing_check
+from .polynomial import EvaluationDomain
+from .commitment import commit_many, SRS
+from .constraint import ProverInput
+from .constants import K1, K2
+from .helpers import (
+    custom_hash,
+    compute_permutation_challenges,
+    circuit_polynomials,
+    preprocessed_digest,
+)
+from .prover import Proof
+from misc_crypto.ecc import multi_scalar_multiplication
+from misc_crypto.ecc.backends.bn254 import WrappedCurvePoint
+from misc_crypto.polynomial import operations
+
+# Bits of the random weights of verify_batch
+RANDOM_WEIGHT_BITS = 128
+
+
+@dataclass
+class VerificationKey:
+    n: int
+    omega: FieldElement
+    public_input_positions: Sequence[int]
+    # [qm], [ql], [qr], [qo], [qc], [S_sigma_1], [S_sigma_2], [S_sigma_3]
+    circuit_commitments: Sequence["G1"]
+    g2: "G2"
+    g2_to_secret: "G2"
+
+
+def verification_key(prover_input: ProverInput, srs: SRS) -> VerificationKey:
+    n = prover_input.number_of_gates()
+    domain = EvaluationDomain.from_roots_of_unity(n)
+    return VerificationKey(
+        n=n,
+        omega=domain.domain[1],
+        public_input_positions=prover_input.public_input_positions,
+        circuit_commitments=commit_many(circuit_polynomials(prover_input, domain), srs),
+        g2=srs.g2,
+        g2_to_secret=srs.g2_to_secret,
+    )
+
+
+def compute_challenges(proof: Proof, vk: VerificationKey) -> Tuple[FieldElement, ...]:
+    """
+    beta, gamma, alpha, zeta, v, u, the same transcript as the prover
+    """
+    beta, gamma = compute_permutation_challenges(
+        preprocessed_digest(vk.n, vk.circuit_commitments),
+        proof.commit_a,
+        proof.commit_b,
+        proof.commit_c,
+        proof.public_inputs,
+    )
+    alpha = custom_hash(gamma, proof.commit_z)
+    zeta = custom_hash(alpha, proof.commit_t_lo, proof.commit_t_mid, proof.commit_t_hi)
+    v = custom_hash(
+        zeta,
+        proof.a_eval,
+        proof.b_eval,
+        proof.c_eval,
+        proof.sigma1_eval,
+        proof.sigma2_eval,
+        proof.z_omega_eval,
+        proof.r_eval,
+    )
+    u = custom_hash(v, proof.commit_w_zeta, proof.commit_w_zeta_omega)
+    return beta, gamma, alpha, zeta, v, u
+
+
+def proof_points(proof: Proof) -> List["G1"]:
+    return [
+        proof.commit_t_lo,
+        proof.commit_t_mid,
+        proof.commit_t_hi,
+        proof.commit_a,
+        proof.commit_b,
+        proof.commit_c,
+        proof.commit_z,
+        proof.commit_w_zeta,
+        proof.commit_w_zeta_omega,
+    ]
+
+
+def is_well_formed(proof: Proof, vk: VerificationKey) -> bool:
+    if len(proof.public_inputs) != len(vk.public_input_positions):
+        return False
+    return all(is_on_curve(point, curve_b) for point in proof_points(proof))
+
+
+def lagrange_evaluations(
+    vk: VerificationKey, zeta: FieldElement
+) -> Tuple[FieldElement, FieldElement, List[FieldElement]]:
+    """
+    Z_H(zeta), 1 / Z_H(zeta), and L_i(zeta) = w^i Z_H(zeta) / (n (zeta - w^i)) for
+    i = 0 and the public input positions, with a single inversion
+    """
+    n = vk.n
+    vanishing = zeta ** n - 1
+    roots = [vk.omega ** i for i in [0] + list(vk.public_input_positions)]
+    inverses = operations.batch_inverse([vanishing] + [(zeta - w) * n for w in roots])
+    lagranges = [w * vanishing * inverse for w, inverse in zip(roots, inverses[1:])]
+    return vanishing, inverses[0], lagranges
+
+
+def linear_combination(
+    proof: Proof, vk: VerificationKey
+) -> Tuple[List[FieldElement], List[FieldElement], List[FieldElement]]:
+    """
+    The scalars of the pairing equation: on the right hand side for the circuit
+    commitments then G1, and for the points of proof_points, and on the left hand
+    side for [W_zeta] and [W_zeta_omega]
+    """
+    beta, gamma, alpha, zeta, v, u = compute_challenges(proof, vk)
+    a, b, c = proof.a_eval, proof.b_eval, proof.c_eval
+    s1, s2 = proof.sigma1_eval, proof.sigma2_eval
+    zeta_omega = zeta * vk.omega
+    _, inverse_vanishing, (l1, *public_lagranges) = lagrange_evaluations(vk, zeta)
+    pi = -sum(
+        (
+            Fr(w) * lagrange
+            for w, lagrange in zip(proof.public_inputs, public_lagranges)
+        ),
+        Fr.zero(),
+    )
+    sigma_part = (a + beta * s1 + gamma) * (b + beta * s2 + gamma) * alpha
+    t_eval = (
+        proof.r_eval
+        + pi
+        - sigma_part * (c + gamma) * proof.z_omega_eval
+        - l1 * alpha ** 2
+    ) * inverse_vanishing
+    z_scalar = (
+        (a + beta * zeta + gamma)
+        * (b + beta * K1 * zeta + gamma)
+        * (c + beta * K2 * zeta + gamma)
+        * alpha
+        + l1 * alpha ** 2
+    ) * v + u
+    e = (
+        t_eval
+        + v * proof.r_eval
+        + v ** 2 * a
+        + v ** 3 * b
+        + v ** 4 * c
+        + v ** 5 * s1
+        + v ** 6 * s2
+        + u * proof.z_omega_eval
+    )
+    circuit_scalars = [
+        v * a * b,
+        v * a,
+        v * b,
+        v * c,
+        v,
+        v ** 5,
+        v ** 6,
+        -sigma_part * beta * proof.z_omega_eval * v,
+        -e,
+    ]
+    zeta_n = zeta ** vk.n
+    scalars = [
+        Fr.one(),
+        zeta_n,
+        zeta_n * zeta_n,
+        v ** 2,
+        v ** 3,
+        v ** 4,
+        z_scalar,
+        zeta,
+        u * zeta_omega,
+    ]
+    return circuit_scalars, scalars, [Fr.one(), u]
+
+
+def _msm(points: Sequence["G1"], scalars: Sequence[FieldElement]) -> "G1":
+    wrapped = [WrappedCurvePoint(p) for p in points]
+    return multi_scalar_multiplication(wrapped, scalars).py_ecc_object
+
+
+def _check(
+    proofs: Sequence[Proof], vk: VerificationKey, weights: Sequence[FieldElement]
+) -> bool:
+    if len(proofs) == 0 or not all(is_well_formed(p, vk) for p in proofs):
+        return False
+    circuit_scalars = [Fr.zero()] * (len(vk.circuit_commitments) + 1)
+    right_points, right_scalars = [], []
+    left_points, left_scalars = [], []
+    for proof, weight in zip(proofs, weights):
+        proof_circuit_scalars, scalars, opening_scalars = linear_combination(proof, vk)
+        for i, scalar in enumerate(proof_circuit_scalars):
+            circuit_scalars[i] += weight * scalar
+        right_points += proof_points(proof)
+        right_scalars += [weight * scalar for scalar in scalars]
+        left_points += [proof.commit_w_zeta, proof.commit_w_zeta_omega]
+        left_scalars += [weight * scalar for scalar in opening_scalars]
+    right = _msm(
+        list(vk.circuit_commitments) + [G1] + right_points,
+        circuit_scalars + right_scalars,
+    )
+    left = _msm(left_points, left_scalars)
+    return pairing_check(left, vk.g2_to_secret, neg(right), vk.g2)
+
+
+def verify(proof: Proof, vk: VerificationKey) -> bool:
+    return _check([proof], vk, [Fr.one()])
+
+
+def verify_batch(proofs: Sequence[Proof], vk: VerificationKey) -> bool:
+    """
+    All the proofs are valid, with one pairing check. False for no proofs.
+    """
+    weights = [Fr(secrets.randbits(RANDOM_WEIGHT_BITS)) for _ in proofs]
+    return _check(proofs, vk, weights)
@@ -0,0 +1,292 @@
+"""
+Scaling benchmarks of the polynomial operations
+
+For each operation we sweep sizes n = 2^4, 2^5, ..., record the wall time, the peak
+memory traced by tracemalloc, and the count of memory blocks the operation allocated and
+still holds when it returns, from a tracemalloc snapshot taken with the result alive.
+Then we fit the exponent k of time ~ n^k and flag the operations that don't scale as
+expected.
+
+    python -m misc_crypto.polynomial.benchmark --max-exponent 12 --budget 2
+"""
+import argparse
+from dataclasses import dataclass
+import gc
+from math import log
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, List, Sequence, Dict, Tuple, Any, Optional, cast
+from misc_crypto.ecc import Backend, BLS12381Backend, roots_of_unity
+from misc_crypto.plonk.polynomial import Polynomial, EvaluationDomain
+from . import operations
+from .fft import fft, inverse_fft
+from .point_cache import PointSet
+
+backend = cast(Backend, BLS12381Backend)
+
+# Near linear operations, like n log n ffts, fit an exponent slightly above 1
+DEFAULT_TOLERANCE = 0.35
+
+
+@dataclass
+class Benchmark:
+    name: str
+    # Build the arguments for size n, not timed
+    setup: Callable[[int], Tuple[Any, ...]]
+    run: Callable[..., Any]
+    expected_exponent: float
+
+
+@dataclass
+class Measurement:
+    size: int
+    seconds: float
+    peak_bytes: int
+    allocated_blocks: int
+
+
+@dataclass
+class Result:
+    benchmark: Benchmark
+    measurements: List[Measurement]
+    exponent: Optional[float]
+
+    @property
+    def matches(self) -> bool:
+        if self.exponent is None:
+            return True
+        return (
+            abs(self.exponent - self.benchmark.expected_exponent) <= DEFAULT_TOLERANCE
+        )
+
+
+def _random_coefficients(n: int) -> List:
+    return [backend.Fr(random.randrange(backend.curve_order)) for _ in range(n)]
+
+
+def _domain(n: int):
+    return roots_of_unity(backend, n)
+
+
+def _plonk_domain(n: int) -> EvaluationDomain:
+    return EvaluationDomain.from_roots_of_unity(n, parallel=False)
+
+
+def _product_and_factor(n: int) -> Tuple[Polynomial, Polynomial]:
+    factor = Polynomial(*_random_coefficients(n))
+    return factor * Polynomial(*_random_coefficients(n)), factor
+
+
+BENCHMARKS = [
+    Benchmark(
+        "naive_multiply",
+        lambda n: (_random_coefficients(n), _random_coefficients(n)),
+        operations.naive_multiply,
+        2,
+    ),
+    Benchmark(
+        "fft_multiply",
+        lambda n: (backend, _random_coefficients(n), _random_coefficients(n)),
+        operations.fft_multiply,
+        1,
+    ),
+    Benchmark(
+        "euclidean_division",
+        lambda n: (_random_coefficients(2 * n), _random_coefficients(n)),
+        operations.euclidean_division,
+        2,
+    ),
+    Benchmark(
+        "lagrange",
+        lambda n: (_random_coefficients(n), _random_coefficients(n)),
+        operations.lagrange,
+        2,
+    ),
+    Benchmark(
+        "subproduct_tree_interpolate",
+        lambda n: (PointSet.from_points(_random_coefficients(n)),),
+        lambda point_set: point_set.interpolate(point_set.zs),
+        2,
+    ),
+    Benchmark(
+        "evaluate",
+        lambda n: (_random_coefficients(n), backend.Fr(random.randrange(2 ** 64))),
+        operations.evaluate,
+        1,
+    ),
+    Benchmark(
+        "fft",
+        lambda n: (_random_coefficients(n), _domain(n), False),
+        fft,
+        1,
+    ),
+    Benchmark(
+        "inverse_fft",
+        lambda n: (_random_coefficients(n), _domain(n), False),
+        inverse_fft,
+        1,
+    ),
+    Benchmark(
+        "plonk_multiply",
+        lambda n: (
+            Polynomial(*_random_coefficients(n)),
+            Polynomial(*_random_coefficients(n)),
+        ),
+        Polynomial.__mul__,
+        2,
+    ),
+    Benchmark(
+        "plonk_division",
+        _product_and_factor,
+        Polynomial.__truediv__,
+        2,
+    ),
+    Benchmark(
+        "plonk_fft",
+        lambda n: (Polynomial(*_random_coefficients(n)), _plonk_domain(n)),
+        Polynomial.fft,
+        1,
+    ),
+    Benchmark(
+        "plonk_coset_fft",
+        lambda n: (Polynomial(*_random_coefficients(n)), _plonk_domain(n)),
+        Polynomial.coset_fft,
+        1,
+    ),
+]
+
+
+def _time(run: Callable[..., Any], args: Sequence[Any], min_seconds: float) -> float:
+    """
+    Seconds per call, looping over fast calls until the total is measurable.
+    The first call is not timed, it fills the caches like the roots of unity.
+    """
+    run(*args)
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run(*args)
+        total = time.perf_counter() - start
+        if total >= min_seconds:
+            return total / loops
+        loops *= 10
+
+
+def measure(benchmark: Benchmark, size: int, min_seconds: float = 0.05) -> Measurement:
+    args = benchmark.setup(size)
+    seconds = _time(benchmark.run, args, min_seconds)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = benchmark.run(*args)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del result
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    allocated_blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    return Measurement(size, seconds, peak_bytes, allocated_blocks)
+
+
+def fit_exponent(sizes: Sequence[int], values: Sequence[float]) -> Optional[float]:
+    """
+    Least squares slope of log(value) against log(size)
+    """
+    if len(sizes) < 2:
+        return None
+    xs = [log(s) for s in sizes]
+    ys = [log(v) for v in values]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return covariance / variance
+
+
+def run_benchmark(
+    benchmark: Benchmark,
+    min_exponent: int = 4,
+    max_exponent: int = 16,
+    budget: float = 5.0,
+) -> Result:
+    """
+    Sweep the sizes 2^min_exponent to 2^max_exponent, stop after a size whose
+    measurement takes longer than `budget` seconds
+    """
+    measurements = []
+    for exponent in range(min_exponent, max_exponent + 1):
+        start = time.perf_counter()
+        measurements.append(measure(benchmark, 2 ** exponent))
+        if time.perf_counter() - start > budget:
+            break
+    exponent_fit = fit_exponent(
+        [m.size for m in measurements], [m.seconds for m in measurements]
+    )
+    return Result(benchmark, measurements, exponent_fit)
+
+
+def format_result(result: Result) -> str:
+    benchmark = result.benchmark
+    exponent = "-" if result.exponent is None else f"{result.exponent:.2f}"
+    if result.exponent is None or result.matches:
+        flag = "ok"
+    elif result.exponent > benchmark.expected_exponent:
+        flag = "MISMATCH, slower than expected"
+    else:
+        flag = "MISMATCH, faster than expected"
+    lines = [
+        f"{benchmark.name}: n^{exponent}, expected n^{benchmark.expected_exponent} {flag}"
+    ]
+    for m in result.measurements:
+        lines.append(
+            f"  n={m.size:>6} {m.seconds * 1000:>12.3f} ms"
+            f" {m.peak_bytes / 1024:>12.1f} KiB peak {m.allocated_blocks:>8} blocks"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--min-exponent", type=int, default=4)
+    parser.add_argument("--max-exponent", type=int, default=16)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=5.0,
+        help="Stop sweeping an operation after a size taking longer than this",
+    )
+    parser.add_argument(
+        "--operations",
+        nargs="*",
+        choices=[b.name for b in BENCHMARKS],
+        help="Defaults to all",
+    )
+    parser.add_argument(
+        "--strict", action="store_true", help="Exit with 1 on any mismatch"
+    )
+    args = parser.parse_args(argv)
+
+    selected = [
+        b for b in BENCHMARKS if args.operations is None or b.name in args.operations
+    ]
+    results: Dict[str, Result] = {}
+    for benchmark in selected:
+        result = run_benchmark(
+            benchmark, args.min_exponent, args.max_exponent, args.budget
+        )
+        results[benchmark.name] = result
+        print(format_result(result), flush=True)
+
+    mismatches = [name for name, result in results.items() if not result.matches]
+    if mismatches:
+        print("Scaling mismatches:", ", ".join(mismatches))
+    return 1 if args.strict and mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
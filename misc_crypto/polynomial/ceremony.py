@@ -0,0 +1,312 @@
+"""
+Powers of tau ceremony over mapped SRS files (see mapped_srs.py)
+
+A contributor with a secret tau turns the transcript [s^i] into [(s * tau)^i],
+multiplying the i-th point by tau^i. Nobody knows s * tau unless every contributor
+colludes. The points are streamed a chunk at a time, optionally over a process pool,
+and written to a new file, so a 2^20 transcript is never fully in memory.
+
+The contributor publishes [tau]G2 with the new transcript. Verification checks
+- the new first power is the old one times tau: e([s tau]_1, G2) == e([s]_1, [tau]_2)
+- every power is the previous times the same secret. With random r_i this is one
+  pairing equation per group instead of one per point:
+      e(sum(r_i * [x^(i+1)]_1), G2) == e(sum(r_i * [x^i]_1), [x]_2)
+      e(G1, sum(r_i * [x^(i+1)]_2)) == e([x]_1, sum(r_i * [x^i]_2))
+- every point is in the prime order subgroup, or the pairing checks prove nothing.
+  The points are only checked to be on the curve when decoded, and the twist, or
+  G1 of BLS12-381, has other points. This is a scalar multiplication per point, so
+  it runs over the process pool too. Pass check_subgroups=False for trusted files.
+
+    python -m misc_crypto.polynomial.ceremony contribute old.srs new.srs
+    python -m misc_crypto.polynomial.ceremony verify old.srs new.srs <public key hex>
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import os
+import secrets
+import sys
+from typing import (
+    Sequence,
+    Dict,
+    Tuple,
+    Iterator,
+    Callable,
+    Any,
+    Optional,
+)
+from misc_crypto.ecc import (
+    Backend,
+    BN254Backend,
+    CurvePoint,
+    G2,
+    pairing_check,
+    batch_multi_scalar_multiplication,
+)
+from misc_crypto.ecc.protocol import P
+from .mapped_srs import MappedSRS, Path, header, DEFAULT_CHUNK_POINTS
+from .srs import PARALLEL_SETUP_THRESHOLD
+
+# Bits of the random coefficients of the batched pairing checks
+RANDOM_COEFFICIENT_BITS = 128
+
+# Files opened by this worker process, keyed by path
+_opened: Dict[str, MappedSRS] = {}
+
+
+def _open(path: str) -> MappedSRS:
+    mapped = _opened.get(path)
+    if mapped is None:
+        mapped = MappedSRS(path)
+        _opened[path] = mapped
+    return mapped
+
+
+def initial_transcript(
+    path: Path, backend: Backend, g1_count: int, g2_count: int = 2
+) -> None:
+    """
+    The transcript with secret 1, every power is the generator
+    """
+    with open(path, "wb") as f:
+        f.write(header(backend, g1_count, g2_count))
+        f.write(backend.get_G1().to_bytes() * g1_count)
+        f.write(backend.get_G2().to_bytes() * g2_count)
+
+
+def _contribute_chunk(path: str, group: str, start: int, stop: int, tau: int) -> bytes:
+    mapped = _open(path)
+    records = mapped.G1_powers if group == "G1" else mapped.G2_powers
+    modulus = mapped.backend.curve_order
+    power = pow(tau, start, modulus)
+    encoded = []
+    for point in records[start:stop]:
+        encoded.append(point.multiply(power).to_bytes())
+        power = power * tau % modulus
+    return b"".join(encoded)
+
+
+def _ordered_results(
+    pool: Optional[ProcessPoolExecutor],
+    function: Callable[..., Any],
+    tasks: Sequence[Tuple[Any, ...]],
+    in_flight: int,
+) -> Iterator[Any]:
+    """
+    The results in order, with at most in_flight tasks submitted and not consumed
+    """
+    if pool is None:
+        for task in tasks:
+            yield function(*task)
+        return
+    futures: deque = deque()
+    for task in tasks:
+        futures.append(pool.submit(function, *task))
+        if len(futures) >= in_flight:
+            yield futures.popleft().result()
+    while futures:
+        yield futures.popleft().result()
+
+
+def contribute(
+    input_path: Path,
+    output_path: Path,
+    tau: Optional[int] = None,
+    chunk_points: int = DEFAULT_CHUNK_POINTS,
+    processes: Optional[int] = None,
+) -> G2:
+    """
+    Write the transcript updated with tau, random by default, and return [tau]G2,
+    the public key to publish with it. Lagrange bases are not carried over.
+    """
+    input_path = os.fspath(input_path)
+    with MappedSRS(input_path) as previous:
+        backend = previous.backend
+        g1_count, g2_count = _counts(previous)
+    if tau is None:
+        tau = secrets.randbelow(backend.curve_order - 1) + 1
+    elif tau % backend.curve_order == 0:
+        raise ValueError("tau should be nonzero")
+    processes = _processes(g1_count, processes)
+    tasks = [
+        (input_path, group, start, min(start + chunk_points, count), tau)
+        for group, count in (("G1", g1_count), ("G2", g2_count))
+        for start in range(0, count, chunk_points)
+    ]
+    pool = ProcessPoolExecutor(max_workers=processes) if processes > 1 else None
+    try:
+        with open(output_path, "wb") as f:
+            f.write(header(backend, g1_count, g2_count))
+            for encoded in _ordered_results(
+                pool, _contribute_chunk, tasks, 2 * processes
+            ):
+                f.write(encoded)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        opened = _opened.pop(input_path, None)
+        if opened is not None:
+            opened.close()
+    return backend.get_G2().multiply(tau)
+
+
+def _random_linear_combinations(powers: Sequence[P], chunk_points: int) -> Tuple[P, P]:
+    """
+    sum(r_i * powers[i + 1]) and sum(r_i * powers[i]) for random r_i,
+    a chunk of the powers at a time
+    """
+    zero = powers[0].multiply(0)
+    shifted, unshifted = zero, zero
+    for start in range(0, len(powers) - 1, chunk_points):
+        stop = min(start + chunk_points, len(powers) - 1)
+        points = powers[start : stop + 1]
+        rs = [secrets.randbits(RANDOM_COEFFICIENT_BITS) for _ in range(start, stop)]
+        left, right = batch_multi_scalar_multiplication(points, [[0] + rs, rs])
+        shifted, unshifted = shifted.add(left), unshifted.add(right)
+    return shifted, unshifted
+
+
+def in_subgroup(backend: Backend, point: CurvePoint) -> bool:
+    return point.multiply(backend.curve_order).is_inf()
+
+
+def _subgroup_chunk(path: str, group: str, start: int, stop: int) -> bool:
+    mapped = _open(path)
+    records = mapped.G1_powers if group == "G1" else mapped.G2_powers
+    return all(in_subgroup(mapped.backend, point) for point in records[start:stop])
+
+
+def _processes(count: int, processes: Optional[int]) -> int:
+    if processes is None:
+        return (os.cpu_count() or 1) if count >= PARALLEL_SETUP_THRESHOLD else 1
+    return processes
+
+
+def points_in_subgroups(
+    mapped: MappedSRS,
+    chunk_points: int = DEFAULT_CHUNK_POINTS,
+    processes: Optional[int] = None,
+) -> bool:
+    """
+    Every power is in the prime order subgroup, a chunk at a time over a process
+    pool like contribute. G1 of BN254 has cofactor 1, so its points on the curve are
+    enough. A random linear combination per chunk would not do: the cofactors of
+    BLS12-381 have small factors like 3, which cancel with a large probability.
+    """
+    path = mapped.path
+    counts = {"G1": len(mapped.G1_powers), "G2": len(mapped.G2_powers)}
+    groups = ["G2"] if mapped.backend is BN254Backend else ["G1", "G2"]
+    tasks = [
+        (path, group, start, min(start + chunk_points, counts[group]))
+        for group in groups
+        for start in range(0, counts[group], chunk_points)
+    ]
+    processes = _processes(sum(counts[group] for group in groups), processes)
+    pool = ProcessPoolExecutor(max_workers=processes) if processes > 1 else None
+    try:
+        return all(_ordered_results(pool, _subgroup_chunk, tasks, 2 * processes))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        opened = _opened.pop(path, None)
+        if opened is not None:
+            opened.close()
+
+
+def verify_powers(
+    mapped: MappedSRS,
+    chunk_points: int = DEFAULT_CHUNK_POINTS,
+    check_subgroups: bool = True,
+    processes: Optional[int] = None,
+) -> bool:
+    """
+    Every power is the previous times the same nonzero secret. processes is for the
+    subgroup checks, as in contribute.
+    """
+    backend = mapped.backend
+    G1, G2 = backend.get_G1(), backend.get_G2()
+    if len(mapped.G1_powers) < 2 or len(mapped.G2_powers) < 2:
+        return False
+    if check_subgroups and not points_in_subgroups(mapped, chunk_points, processes):
+        return False
+    if not (mapped.G1.eq(G1) and mapped.G2.eq(G2)) or mapped.G1s[0].is_inf():
+        return False
+    G1_secret, G2_secret = mapped.G1s[0], mapped.G2s[0]
+    shifted, unshifted = _random_linear_combinations(mapped.G1_powers, chunk_points)
+    if not pairing_check(backend, shifted, G2, unshifted.neg(), G2_secret):
+        return False
+    shifted, unshifted = _random_linear_combinations(mapped.G2_powers, chunk_points)
+    return pairing_check(backend, G1, shifted, G1_secret.neg(), unshifted)
+
+
+def _counts(mapped: MappedSRS) -> Tuple[int, int]:
+    return len(mapped.G1_powers), len(mapped.G2_powers)
+
+
+def verify_contribution(
+    previous_path: Path,
+    path: Path,
+    public_key: G2,
+    chunk_points: int = DEFAULT_CHUNK_POINTS,
+    check_subgroups: bool = True,
+    processes: Optional[int] = None,
+) -> bool:
+    """
+    The transcript at path is the one at previous_path updated with the tau of
+    public_key = [tau]G2. The public key is always checked to be in the subgroup,
+    check_subgroups=False skips the points of the files.
+    """
+    with MappedSRS(previous_path) as previous, MappedSRS(path) as mapped:
+        backend = mapped.backend
+        if previous.backend is not backend or _counts(previous) != _counts(mapped):
+            return False
+        if public_key.is_inf() or not in_subgroup(backend, public_key):
+            return False
+        if check_subgroups and not in_subgroup(backend, previous.G1s[0]):
+            return False
+        if not pairing_check(
+            backend, mapped.G1s[0], backend.get_G2(), previous.G1s[0].neg(), public_key
+        ):
+            return False
+        return verify_powers(mapped, chunk_points, check_subgroups, processes)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    contribute_parser = commands.add_parser("contribute")
+    contribute_parser.add_argument("input")
+    contribute_parser.add_argument("output")
+    contribute_parser.add_argument("--processes", type=int)
+    verify_parser = commands.add_parser("verify")
+    verify_parser.add_argument("previous")
+    verify_parser.add_argument("transcript")
+    verify_parser.add_argument("public_key", help="[tau]G2 in hex")
+    verify_parser.add_argument(
+        "--trusted",
+        action="store_true",
+        help="skip the subgroup checks of the transcript points",
+    )
+    verify_parser.add_argument("--processes", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "contribute":
+        public_key = contribute(args.input, args.output, processes=args.processes)
+        print(public_key.to_bytes().hex())
+        return 0
+    with MappedSRS(args.transcript) as mapped:
+        point_type = type(mapped.G2)
+    public_key = point_type.from_bytes(bytes.fromhex(args.public_key))
+    valid = verify_contribution(
+        args.previous,
+        args.transcript,
+        public_key,
+        check_subgroups=not args.trusted,
+        processes=args.processes,
+    )
+    print("valid" if valid else "invalid")
+    return 0 if valid else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
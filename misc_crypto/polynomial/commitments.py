@@ -1,24 +1,46 @@
-from typing import Sequence, Tuple, List
-from misc_crypto.ecc import Backend, G1, G2, FieldElement, pairing_check
+from collections import OrderedDict
+from typing import Sequence, Tuple, List, Optional, Dict, Mapping
+from misc_crypto.ecc import (
+    Backend,
+    G1,
+    G2,
+    FieldElement,
+    pairing_check,
+    multi_scalar_multiplication,
+    roots_of_unity,
+    FixedBaseTable,
+    fixed_base_window,
+)
+
+# The SRS fields G1 and G2 shadow the point types in its class body
+from misc_crypto.ecc import G1 as G1Point, G2 as G2Point
+import hashlib
 import secrets
-from dataclasses import dataclass
+import struct
+from dataclasses import dataclass, field
+from .fft import fft, group_fft, inverse_group_fft
 from .operations import (
     evaluate,
-    add_polynomial,
     true_division,
-    lagrange,
-    negate,
-    compute_zero_polynomial,
+    sub_assign,
+    axpy,
+    schoolbook_multiply,
+    barycentric_evaluate,
 )
+from .point_cache import point_set_cache, PointSet
 
 
 @dataclass
 class SRS:
-    toxic: FieldElement  # useful for debugging
-    G1: G1
-    G2: G2
-    G1s: Sequence[G1]
-    G2s: Sequence[G2]
+    toxic: Optional[FieldElement]  # useful for debugging, None once serialized
+    G1: G1Point
+    G2: G2Point
+    G1s: Sequence[G1Point]
+    G2s: Sequence[G2Point]
+    # n -> [L_i(s)] over the n-th roots of unity, filled by lagrange_srs
+    lagrange_bases: Dict[int, List[G1Point]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
 
 
 def untrusted_setup(backend: Backend, length: int):
@@ -26,22 +48,24 @@ def untrusted_setup(backend: Backend, length: int):
     s = backend.Fr(_s)
     G1 = backend.get_G1()
     G2 = backend.get_G2()
+    bits = backend.curve_order.bit_length()
+    window = fixed_base_window(length, bits)
+    G1_table = FixedBaseTable(G1, bits, window)
+    G2_table = FixedBaseTable(G2, bits, window)
     G1s = []
     G2s = []
-    for i in range(1, length):
-        s_i = s ** i
-        G1s.append(G1.multiply(s_i))
-        G2s.append(G2.multiply(s_i))
+    s_i = s
+    for _ in range(1, length):
+        G1s.append(G1_table.multiply(s_i))
+        G2s.append(G2_table.multiply(s_i))
+        s_i *= s
     srs = SRS(toxic=s, G1=G1, G2=G2, G1s=G1s, G2s=G2s)
     return srs
 
 
 def evaluate_on_G1(srs: SRS, p: Sequence[FieldElement]) -> "G1":
-    p0, p_rest = p[0], p[1:]
-    _sum = srs.G1.multiply(p0)
-    for G1s_i, p_i in zip(srs.G1s, p_rest):
-        _sum = _sum.add(G1s_i.multiply(p_i))
-    return _sum
+    points = [srs.G1] + list(srs.G1s[: len(p) - 1])
+    return multi_scalar_multiplication(points, p[: len(points)])
 
 
 def evaluate_on_G2(srs: SRS, p: Sequence[FieldElement]) -> "G2":
@@ -56,12 +80,145 @@ def commit(srs: SRS, p: Sequence[FieldElement]) -> "G1":
     return evaluate_on_G1(srs, p)
 
 
+def lagrange_srs(backend: Backend, srs: SRS, n: int) -> List[G1]:
+    """
+    The commitments [L_i(s)] of the Lagrange basis over the n-th roots of unity.
+    L_i(x) = 1/n * sum_j (x / w^i)^j, so they are the inverse fft of [s^j] over G1.
+    Computed once per n and kept on the srs.
+    """
+    basis = srs.lagrange_bases.get(n)
+    if basis is None:
+        powers = ([srs.G1] + list(srs.G1s))[:n]
+        if len(powers) < n:
+            raise ValueError(f"The srs has {len(powers)} powers, expect at least {n}")
+        basis = inverse_group_fft(powers, roots_of_unity(backend, n))
+        srs.lagrange_bases[n] = basis
+    return basis
+
+
+def commit_evaluations(
+    evaluations: Sequence[FieldElement], lagrange_srs: Sequence[G1]
+) -> "G1":
+    """
+    Same as commit(srs, inverse_fft(evaluations)), without the inverse fft
+    """
+    if len(evaluations) != len(lagrange_srs):
+        raise ValueError(
+            f"Expect {len(lagrange_srs)} evaluations, got {len(evaluations)}"
+        )
+    return multi_scalar_multiplication(lagrange_srs, evaluations)
+
+
+def update_commitment(
+    commitment: G1,
+    srs: SRS,
+    changes: Mapping[int, FieldElement],
+    lagrange_basis: Optional[Sequence[G1]] = None,
+) -> G1:
+    """
+    The commitment after adding changes[i] to the i-th coefficient,
+    C + sum(changes[i] * s^i * G1), in one MSM over the changed indices only.
+    With the lagrange_basis from lagrange_srs, changes[i] is added to the i-th
+    evaluation instead, C + sum(changes[i] * L_i(s) * G1).
+    A change is the new value minus the old one.
+    """
+    if len(changes) == 0:
+        return commitment
+    bases = []
+    for index in changes:
+        if index < 0:
+            raise IndexError(f"Negative index {index}")
+        if lagrange_basis is not None:
+            bases.append(lagrange_basis[index])
+        else:
+            bases.append(srs.G1 if index == 0 else srs.G1s[index - 1])
+    delta = multi_scalar_multiplication(bases, list(changes.values()))
+    return commitment.add(delta)
+
+
+SRS_MAGIC = b"KZGSRS"
+SRS_VERSION = 1
+
+
+def _write_points(points: Sequence) -> bytes:
+    return struct.pack(">I", len(points)) + b"".join(p.to_bytes() for p in points)
+
+
+def _read_count(data: bytes, offset: int) -> Tuple[int, int]:
+    if offset + 4 > len(data):
+        raise ValueError("Truncated srs")
+    (count,) = struct.unpack_from(">I", data, offset)
+    return count, offset + 4
+
+
+def _read_points(
+    point_type, point_size: int, data: bytes, offset: int
+) -> Tuple[List, int]:
+    count, offset = _read_count(data, offset)
+    end = offset + count * point_size
+    if end > len(data):
+        raise ValueError("Truncated srs")
+    points = [
+        point_type.from_bytes(data[i : i + point_size])
+        for i in range(offset, end, point_size)
+    ]
+    return points, end
+
+
+def serialize_srs(srs: SRS) -> bytes:
+    """
+    The powers on G1 and G2 and the Lagrange bases computed so far.
+    The toxic waste is never written.
+    """
+    sections = [
+        SRS_MAGIC,
+        bytes([SRS_VERSION]),
+        _write_points([srs.G1] + list(srs.G1s)),
+        _write_points([srs.G2] + list(srs.G2s)),
+        struct.pack(">I", len(srs.lagrange_bases)),
+    ]
+    for n in sorted(srs.lagrange_bases):
+        sections.append(_write_points(srs.lagrange_bases[n]))
+    return b"".join(sections)
+
+
+def deserialize_srs(backend: Backend, data: bytes) -> SRS:
+    header = len(SRS_MAGIC) + 1
+    if len(data) < header:
+        raise ValueError("Truncated srs")
+    if data[: len(SRS_MAGIC)] != SRS_MAGIC or data[header - 1] != SRS_VERSION:
+        raise ValueError("Not a serialized srs of a known version")
+    G1_point, G2_point = backend.get_G1(), backend.get_G2()
+    G1_type, G1_size = type(G1_point), len(G1_point.to_bytes())
+    G2_type, G2_size = type(G2_point), len(G2_point.to_bytes())
+    G1s, offset = _read_points(G1_type, G1_size, data, header)
+    G2s, offset = _read_points(G2_type, G2_size, data, offset)
+    if len(G1s) == 0 or len(G2s) == 0:
+        raise ValueError("Expect the generators of G1 and G2")
+    number_of_bases, offset = _read_count(data, offset)
+    lagrange_bases = {}
+    for _ in range(number_of_bases):
+        basis, offset = _read_points(G1_type, G1_size, data, offset)
+        lagrange_bases[len(basis)] = basis
+    if offset != len(data):
+        raise ValueError("Trailing bytes after the srs")
+    return SRS(
+        toxic=None,
+        G1=G1s[0],
+        G2=G2s[0],
+        G1s=G1s[1:],
+        G2s=G2s[1:],
+        lagrange_bases=lagrange_bases,
+    )
+
+
 def prove_single(
     srs: SRS, p: Sequence[FieldElement], z: FieldElement
 ) -> Tuple[FieldElement, G1]:
     one = z.one()
     y = evaluate(p, z)
-    numerator = add_polynomial(p, [-y])
+    numerator = list(p)
+    numerator[0] -= y
     q = true_division(numerator, [-z, one])
     return y, evaluate_on_G1(srs, q)
 
@@ -87,14 +244,24 @@ def verify_single(
 def prove_multiple(
     srs: SRS, p: Sequence[FieldElement], zs: Sequence[FieldElement]
 ) -> Tuple[FieldElement, G1]:
+    point_set = point_set_cache.get(zs)
     ys = [evaluate(p, z) for z in zs]
-    interpolation = lagrange(zs, ys)
-    zero_polynomial = compute_zero_polynomial(zs)
-    numerator = add_polynomial(p, negate(interpolation))
-    q = true_division(numerator, zero_polynomial)
+    interpolation = point_set.interpolate(ys)
+    numerator = sub_assign(list(p), interpolation)
+    q = true_division(numerator, point_set.zero_polynomial)
     return ys, evaluate_on_G1(srs, q)
 
 
+def zero_polynomial_on_G2(srs: SRS, point_set: PointSet) -> G2:
+    entries = len(point_set.zs_on_G2)
+    zs_on_G2 = point_set.zero_polynomial_on_G2(
+        srs, lambda: evaluate_on_G2(srs, point_set.zero_polynomial)
+    )
+    if len(point_set.zs_on_G2) > entries:
+        point_set_cache.evict()
+    return zs_on_G2
+
+
 def verify_multiple(
     backend: Backend,
     srs: SRS,
@@ -106,17 +273,219 @@ def verify_multiple(
     """
     e(proof, [Z(s)]_2) ==  e(C - [I(s)]_1, G2)
     """
-    zero_polynomial = compute_zero_polynomial(zs)
-    zs_on_G2 = evaluate_on_G2(srs, zero_polynomial)
-    interpolation = lagrange(zs, ys)
+    point_set = point_set_cache.get(zs)
+    zs_on_G2 = zero_polynomial_on_G2(srs, point_set)
+    interpolation = point_set.interpolate(ys)
     interpolation_on_G1 = evaluate_on_G1(srs, interpolation)
     c_minus_i = commitment.add(interpolation_on_G1.neg())
     return pairing_check(backend, proof, zs_on_G2, c_minus_i, srs.G2.neg())
 
 
+@dataclass
+class AggregatedProof:
+    # [h(s)], h = sum(gamma^i * Z_{T-S_i} * (p_i - r_i)) / Z_T
+    quotient: G1
+    # [L(s) / (s - z)], L opens the combination above at z
+    opening: G1
+
+
+def _challenge(backend: Backend, *messages: bytes) -> FieldElement:
+    m = hashlib.sha256()
+    for message in messages:
+        m.update(message)
+    return backend.Fr(int.from_bytes(m.digest(), "big"))
+
+
+def _field_bytes(values: Sequence[FieldElement]) -> bytes:
+    return b"".join(int(v).to_bytes(32, "big") for v in values)
+
+
+def _query_bytes(
+    commitments: Sequence[G1],
+    point_sets: Sequence[Sequence[FieldElement]],
+    ys: Sequence[Sequence[FieldElement]],
+) -> List[bytes]:
+    messages = [c.to_bytes() for c in commitments]
+    for zs, ys_i in zip(point_sets, ys):
+        messages.append(len(zs).to_bytes(8, "big"))
+        messages.append(_field_bytes(zs) + _field_bytes(ys_i))
+    return messages
+
+
+def _union(point_sets: Sequence[Sequence[FieldElement]]) -> List[FieldElement]:
+    seen = set()
+    union = []
+    for zs in point_sets:
+        for z in zs:
+            if int(z) not in seen:
+                seen.add(int(z))
+                union.append(z)
+    return union
+
+
+def _vanishing_at(zs: Sequence[FieldElement], x: FieldElement) -> FieldElement:
+    result = x.one()
+    for z in zs:
+        result *= x - z
+    return result
+
+
+def prove_aggregated(
+    backend: Backend,
+    srs: SRS,
+    ps: Sequence[Sequence[FieldElement]],
+    point_sets: Sequence[Sequence[FieldElement]],
+    commitments: Optional[Sequence[G1]] = None,
+) -> Tuple[List[List[FieldElement]], AggregatedProof]:
+    """
+    Open each p_i at its own points S_i with two G1 elements, see SHPLONK
+    https://eprint.iacr.org/2020/081 section 4.
+    Pass the commitments if they are already computed, they are hashed in the transcript.
+    """
+    if len(ps) != len(point_sets):
+        raise ValueError("Expect a point set for each polynomial")
+    if commitments is None:
+        commitments = [commit(srs, p) for p in ps]
+    ys = [[evaluate(p, z) for z in zs] for p, zs in zip(ps, point_sets)]
+    messages = _query_bytes(commitments, point_sets, ys)
+    gamma = _challenge(backend, *messages)
+
+    union = _union(point_sets)
+    zero_polynomial = point_set_cache.get(union).zero_polynomial
+    point_set_list = [point_set_cache.get(zs) for zs in point_sets]
+    # Z_{T-S_i}, the zero polynomial of the points not in S_i
+    complements = [
+        true_division(zero_polynomial, ps_i.zero_polynomial) for ps_i in point_set_list
+    ]
+
+    numerator: List[FieldElement] = []
+    power_of_gamma = gamma.one()
+    for p, ys_i, point_set, complement in zip(ps, ys, point_set_list, complements):
+        difference = sub_assign(list(p), point_set.interpolate(ys_i))
+        axpy(numerator, power_of_gamma, schoolbook_multiply(complement, difference))
+        power_of_gamma *= gamma
+    h = true_division(numerator, zero_polynomial)
+    quotient = evaluate_on_G1(srs, h)
+
+    z = _challenge(backend, *messages, quotient.to_bytes())
+    # L(x) = sum(gamma^i * Z_{T-S_i}(z) * (p_i(x) - r_i(z))) - Z_T(z) * h(x)
+    linearised = [z.zero()]
+    power_of_gamma = gamma.one()
+    for p, ys_i, point_set, complement in zip(ps, ys, point_set_list, complements):
+        scalar = power_of_gamma * evaluate(complement, z)
+        axpy(linearised, scalar, p)
+        linearised[0] -= scalar * evaluate(point_set.interpolate(ys_i), z)
+        power_of_gamma *= gamma
+    axpy(linearised, -evaluate(zero_polynomial, z), h)
+    opening = evaluate_on_G1(srs, true_division(linearised, [-z, z.one()]))
+    return ys, AggregatedProof(quotient, opening)
+
+
+def verify_aggregated(
+    backend: Backend,
+    srs: SRS,
+    commitments: Sequence[G1],
+    point_sets: Sequence[Sequence[FieldElement]],
+    ys: Sequence[Sequence[FieldElement]],
+    proof: AggregatedProof,
+) -> bool:
+    """
+    [L] + z * [W'] == s * [W'], with [L] from the commitments:
+    e([L] + z * [W'], G2) == e([W'], [s]_2)
+    The left side is a single MSM
+    """
+    if not (len(commitments) == len(point_sets) == len(ys)):
+        return False
+    messages = _query_bytes(commitments, point_sets, ys)
+    gamma = _challenge(backend, *messages)
+    z = _challenge(backend, *messages, proof.quotient.to_bytes())
+
+    union = _union(point_sets)
+    zero_at_z = _vanishing_at(union, z)
+    points: List[G1] = []
+    scalars: List[FieldElement] = []
+    constant = z.zero()
+    power_of_gamma = gamma.one()
+    for commitment, zs, ys_i in zip(commitments, point_sets, ys):
+        if len(zs) != len(ys_i):
+            return False
+        point_set = point_set_cache.get(zs)
+        scalar = power_of_gamma * zero_at_z / _vanishing_at(zs, z)
+        points.append(commitment)
+        scalars.append(scalar)
+        interpolation_at_z = barycentric_evaluate(zs, point_set.weights, ys_i, z)
+        constant += scalar * interpolation_at_z
+        power_of_gamma *= gamma
+    points += [srs.G1, proof.quotient, proof.opening]
+    scalars += [-constant, -zero_at_z, z]
+    left = multi_scalar_multiplication(points, scalars)
+    return pairing_check(backend, left, srs.G2, proof.opening.neg(), srs.G2s[0])
+
+
+# (id(srs), n) -> (srs, fft of the reversed SRS powers), for a few recent SRS and sizes
+FK20_CACHE_SIZE = 8
+_fk20_cache: "OrderedDict[Tuple[int, int], Tuple[SRS, List[G1]]]" = OrderedDict()
+
+
+def _fk20_precomputation(
+    backend: Backend, srs: SRS, n: int
+) -> Tuple[List[G1], Sequence[FieldElement]]:
+    """
+    The G1 fft of [s^(n-2)], ..., [s], [1], 0, ..., 0 on the 2n-th roots of unity
+    """
+    circulant_domain = roots_of_unity(backend, 2 * n)
+    key = (id(srs), n)
+    cached = _fk20_cache.get(key)
+    if cached is None or cached[0] is not srs:
+        powers = ([srs.G1] + list(srs.G1s))[: n - 1]
+        if len(powers) < n - 1:
+            raise ValueError(f"Expect at least {n - 1} SRS powers, got {len(powers)}")
+        cached = (srs, group_fft(powers[::-1], circulant_domain))
+        _fk20_cache[key] = cached
+        while len(_fk20_cache) > FK20_CACHE_SIZE:
+            _fk20_cache.popitem(last=False)
+    _fk20_cache.move_to_end(key)
+    return cached[1], circulant_domain
+
+
+def prove_all(
+    backend: Backend,
+    srs: SRS,
+    p: Sequence[FieldElement],
+    domain: Sequence[FieldElement],
+) -> Tuple[List[FieldElement], List[G1]]:
+    """
+    The evaluations and the prove_single proofs at every point of a roots of unity
+    domain, with FK20 https://eprint.iacr.org/2023/033
+
+    The proof at x is [q(s)] = sum(h_j * x^(j-1)), for j in 1..n-1, with
+    h_j = sum(c_(j+t) * [s^t]), so all proofs are the G1 fft of h. h is a Toeplitz
+    matrix times the SRS powers, which is a convolution we compute with ffts of size 2n.
+    """
+    n = len(domain)
+    if len(p) > n:
+        raise ValueError(f"Expect at most {n} coefficients, got {len(p)}")
+    ys = fft(p, domain)
+    if n == 1:
+        return ys, [backend.Z1()]
+    powers_fft, circulant_domain = _fk20_precomputation(backend, srs, n)
+
+    # (c * reversed powers)[j + n - 2] == h_j
+    zero = p[0].zero()
+    coefficients = list(p) + [zero] * (2 * n - len(p))
+    coefficients_fft = fft(coefficients, circulant_domain)
+    products = [point.multiply(c) for point, c in zip(powers_fft, coefficients_fft)]
+    convolution = inverse_group_fft(products, circulant_domain)
+    h = convolution[n - 1 : 2 * n - 2]
+    return ys, group_fft(h, domain)
+
+
 def build_polynomial_from_vector(
     backend: Backend, vector: Sequence[FieldElement]
 ) -> List[FieldElement]:
+    """
+    Interpolate over 0, 1, ..., n-1. See vector_commitment.py for the entries on
+    roots of unity, with inverse fft interpolation and cheap updates.
+    """
     domain = [backend.Fr(i) for i in range(len(vector))]
-    polynomial = lagrange(domain, vector)
-    return polynomial
+    return point_set_cache.get(domain).interpolate(vector)
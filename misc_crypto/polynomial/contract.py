@@ -0,0 +1,341 @@
+"""
+EVM verifier of KZG openings on BN254, with the ecAdd (0x06), ecMul (0x07) and
+ecPairing (0x08) precompiles. The G2 points of the SRS are inlined as constants.
+
+The verifier can't multiply on G2, so it moves z to G1:
+
+    e(proof, [s - z]_2) == e(C - [y]_1, G2)
+    <=> e(C - [y]_1 + z * proof, -G2) * e(proof, [s]_2) == 1
+
+verifyBatch takes openings (C_i, z_i, y_i, proof_i) of any commitments at any points,
+and checks them with a random r from the hash of the calldata:
+
+    e(sum(r^i * (C_i + z_i * proof_i)) - [sum(r^i * y_i)]_1, -G2)
+        * e(sum(r^i * proof_i), [s]_2) == 1
+
+A single opening costs two ecMul and a pairing of two pairs, and each opening of a batch
+costs three ecMul instead, sharing the pairing.
+
+Memory layout
+    0x000 - 0x0a0  accumulator A, then the point and scalar of the next ecMul
+    0x100 - 0x1a0  accumulator B, then the point and scalar of the next ecMul
+    0x200 - 0x380  pairing input
+    0x380 - 0x440  variables of verifyBatch
+    0x440 -        calldata copied to hash
+"""
+from typing import Sequence, List, Tuple, Union
+from misc_crypto.ecc import G1, G2, FieldElement
+from misc_crypto.ecc.backends.bn254 import BN254Backend
+from misc_crypto.keccak.keccak import keccak_256
+from misc_crypto.utils.assembly import Contract
+from .commitments import SRS
+
+q = BN254Backend.curve_order
+
+EC_ADD = 0x06
+EC_MUL = 0x07
+EC_PAIRING = 0x08
+
+ACCUMULATOR_A = 0x000
+ACCUMULATOR_B = 0x100
+PAIRING_INPUT = 0x200
+R = 0x380
+R_I = 0x3A0
+Y_SUM = 0x3C0
+POINTER = 0x3E0
+END = 0x400
+SIZE = 0x420
+HASH_INPUT = 0x440
+
+# [commitment_x, commitment_y, z, y, proof_x, proof_y]
+OPENING_WORDS = 6
+
+VERIFY_SIGNATURE = "verify(uint256,uint256,uint256,uint256,uint256,uint256)"
+VERIFY_BATCH_SIGNATURE = "verifyBatch(uint256[])"
+
+
+def selector(signature: str) -> bytes:
+    return keccak_256(signature.encode())[:4]
+
+
+def to_32bytes(x: Union[int, FieldElement]) -> bytes:
+    return int(x).to_bytes(32, "big")
+
+
+def g2_words(point: G2) -> List[bytes]:
+    """
+    The precompile takes x = x0 + x1 * i as (x1, x0), and the same for y
+    """
+    data = point.to_bytes()
+    x0, x1, y0, y1 = [data[i : i + 32] for i in range(0, 128, 32)]
+    return [x1, x0, y1, y0]
+
+
+def encode_opening(
+    commitment: G1, z: FieldElement, y: FieldElement, proof: G1
+) -> List[int]:
+    """
+    The calldata words of an opening, for verify or as a slice of verifyBatch
+    """
+    c, p = commitment.to_bytes(), proof.to_bytes()
+    return [
+        int.from_bytes(c[:32], "big"),
+        int.from_bytes(c[32:], "big"),
+        int(z),
+        int(y),
+        int.from_bytes(p[:32], "big"),
+        int.from_bytes(p[32:], "big"),
+    ]
+
+
+def staticcall(
+    contract: Contract,
+    address: int,
+    in_offset: int,
+    in_size: int,
+    out_offset: int,
+    out_size: int,
+) -> None:
+    # ok
+    (
+        contract.push(out_size)
+        .push(out_offset)
+        .push(in_size)
+        .push(in_offset)
+        .push(address)
+        .gas()
+        .staticcall()
+        # success, ok
+        .and_()
+        # ok
+    )
+
+
+def accumulate(contract: Contract, accumulator: int) -> None:
+    """
+    accumulator += scalar * point, with the point and the scalar in the 3 words after
+    the accumulator. The ecMul output lands right after the accumulator, so the two
+    points are already the ecAdd input.
+    """
+    staticcall(contract, EC_MUL, accumulator + 0x40, 0x60, accumulator + 0x40, 0x40)
+    staticcall(contract, EC_ADD, accumulator, 0x80, accumulator, 0x40)
+
+
+def store(contract: Contract, offset: int) -> None:
+    # value, ok
+    contract.push(offset).mstore()
+    # ok
+
+
+def load_opening_word(contract: Contract, k: int) -> None:
+    """
+    Push the k-th word of the current opening of verifyBatch
+    """
+    contract.push(POINTER).mload()
+    if k > 0:
+        contract.push(32 * k).add()
+    contract.calldataload()
+
+
+def add_generator_multiple(contract: Contract, accumulator: int) -> None:
+    """
+    accumulator += (q - value) * G1, with the value on top of the stack
+    """
+    # value, ok
+    contract.push(to_32bytes(q)).sub()
+    # q - value, ok
+    store(contract, accumulator + 0x80)
+    contract.push(1)
+    store(contract, accumulator + 0x40)
+    contract.push(2)
+    store(contract, accumulator + 0x60)
+    accumulate(contract, accumulator)
+
+
+def verify_single(contract: Contract) -> None:
+    """
+    A = C + z * proof - y * G1 and B = proof, from the static arguments
+    """
+    contract.label("verify")
+    # selector
+    contract.pop().push(1)
+    # ok
+    for k, offset in (
+        (0, ACCUMULATOR_A),
+        (1, ACCUMULATOR_A + 0x20),
+        (4, ACCUMULATOR_A + 0x40),
+        (5, ACCUMULATOR_A + 0x60),
+        (2, ACCUMULATOR_A + 0x80),
+        (4, ACCUMULATOR_B),
+        (5, ACCUMULATOR_B + 0x20),
+    ):
+        contract.push(4 + 32 * k).calldataload()
+        store(contract, offset)
+    accumulate(contract, ACCUMULATOR_A)
+    # y mod q, ok
+    contract.push(to_32bytes(q)).push(4 + 32 * 3).calldataload().mod()
+    add_generator_multiple(contract, ACCUMULATOR_A)
+    contract.jmp("pairing")
+
+
+def verify_batch_setup(contract: Contract) -> None:
+    contract.label("verify_batch")
+    contract.push(1)
+    # ok
+    # The words must come in whole openings, at least one
+    contract.push(OPENING_WORDS).push(0x24).calldataload().mod().jmpi("fail")
+    contract.push(0x24).calldataload().iszero().jmpi("fail")
+    # size in bytes
+    contract.push(0x24).calldataload().push(5).shl()
+    store(contract, SIZE)
+    contract.push(0x44).dup(1)
+    store(contract, POINTER)
+    # 0x44, ok
+    contract.push(SIZE).mload().add()
+    store(contract, END)
+    # Copy the openings and hash them, r = keccak(openings) mod q
+    (
+        contract.push(SIZE)
+        .mload()
+        .push(0x44)
+        .push(HASH_INPUT)
+        .calldatacopy()
+        .push(to_32bytes(q))
+        .push(SIZE)
+        .mload()
+        .push(HASH_INPUT)
+        .sha()
+        # hash, q, ok
+        .mod()
+    )
+    store(contract, R)
+    contract.push(1)
+    store(contract, R_I)
+
+
+def verify_batch_loop(contract: Contract) -> None:
+    contract.label("batch_loop")
+    # A += r_i * C_i
+    load_opening_word(contract, 0)
+    store(contract, ACCUMULATOR_A + 0x40)
+    load_opening_word(contract, 1)
+    store(contract, ACCUMULATOR_A + 0x60)
+    contract.push(R_I).mload()
+    store(contract, ACCUMULATOR_A + 0x80)
+    accumulate(contract, ACCUMULATOR_A)
+    # A += (r_i * z_i) * proof_i, B += r_i * proof_i
+    for accumulator in (ACCUMULATOR_A, ACCUMULATOR_B):
+        load_opening_word(contract, 4)
+        store(contract, accumulator + 0x40)
+        load_opening_word(contract, 5)
+        store(contract, accumulator + 0x60)
+    contract.push(to_32bytes(q))
+    load_opening_word(contract, 2)
+    contract.push(R_I).mload().mulmod()
+    store(contract, ACCUMULATOR_A + 0x80)
+    accumulate(contract, ACCUMULATOR_A)
+    contract.push(R_I).mload()
+    store(contract, ACCUMULATOR_B + 0x80)
+    accumulate(contract, ACCUMULATOR_B)
+    # y_sum += r_i * y_i
+    contract.push(to_32bytes(q)).push(to_32bytes(q))
+    load_opening_word(contract, 3)
+    contract.push(R_I).mload().mulmod()
+    # r_i * y_i, q, ok
+    contract.push(Y_SUM).mload().addmod()
+    store(contract, Y_SUM)
+    # r_i *= r
+    contract.push(to_32bytes(q)).push(R).mload().push(R_I).mload().mulmod()
+    store(contract, R_I)
+    # Next opening
+    contract.push(POINTER).mload().push(0x20 * OPENING_WORDS).add().dup(1)
+    store(contract, POINTER)
+    # pointer, ok
+    contract.push(END).mload().gt().jmpi("batch_loop")
+    # A -= y_sum * G1
+    contract.push(Y_SUM).mload()
+    add_generator_multiple(contract, ACCUMULATOR_A)
+    contract.jmp("pairing")
+
+
+def pairing(contract: Contract, srs: SRS) -> None:
+    """
+    ok &= e(A, -G2) * e(B, [s]_2) == 1, and return ok
+    """
+    contract.label("pairing")
+    # (A, -G2, B, [s]_2), 12 words
+    for i, source in ((0, ACCUMULATOR_A), (6, ACCUMULATOR_B)):
+        for j in range(2):
+            contract.push(source + 0x20 * j).mload()
+            store(contract, PAIRING_INPUT + 0x20 * (i + j))
+    for i, point in ((2, srs.G2.neg()), (8, srs.G2s[0])):
+        for j, word in enumerate(g2_words(point)):
+            contract.push(word)
+            store(contract, PAIRING_INPUT + 0x20 * (i + j))
+    staticcall(contract, EC_PAIRING, PAIRING_INPUT, 0x180, PAIRING_INPUT, 0x20)
+    contract.push(PAIRING_INPUT).mload().and_()
+    # ok
+    store(contract, 0)
+    contract.push(0x20).push(0).return_()
+
+
+def create_code(srs: SRS) -> str:
+    """
+    The deployment transaction data of a verifier for commitments to this BN254 srs
+    """
+    contract = Contract()
+    (
+        contract.push(0)
+        .calldataload()
+        .push(224)
+        .shr()
+        # selector
+        .push(selector(VERIFY_SIGNATURE))
+        .dup(2)
+        .eq()
+        .jmpi("verify")
+        .push(selector(VERIFY_BATCH_SIGNATURE))
+        .eq()
+        .jmpi("verify_batch")
+        .invalid()
+    )
+    verify_single(contract)
+    verify_batch_setup(contract)
+    verify_batch_loop(contract)
+    pairing(contract, srs)
+    contract.label("fail")
+    contract.push(0).push(0).mstore().push(0x20).push(0).return_()
+    return contract.create_tx_data()
+
+
+def encode_batch(openings: Sequence[Tuple[G1, FieldElement, FieldElement, G1]]):
+    return [word for opening in openings for word in encode_opening(*opening)]
+
+
+ABI = [
+    {
+        "constant": True,
+        "inputs": [
+            {"name": "commitmentX", "type": "uint256"},
+            {"name": "commitmentY", "type": "uint256"},
+            {"name": "z", "type": "uint256"},
+            {"name": "y", "type": "uint256"},
+            {"name": "proofX", "type": "uint256"},
+            {"name": "proofY", "type": "uint256"},
+        ],
+        "name": "verify",
+        "outputs": [{"name": "", "type": "bool"}],
+        "payable": False,
+        "stateMutability": "view",
+        "type": "function",
+    },
+    {
+        "constant": True,
+        "inputs": [{"name": "openings", "type": "uint256[]"}],
+        "name": "verifyBatch",
+        "outputs": [{"name": "", "type": "bool"}],
+        "payable": False,
+        "stateMutability": "view",
+        "type": "function",
+    },
+]
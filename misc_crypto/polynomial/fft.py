@@ -2,14 +2,23 @@
 Fast Fourier Transform:
 See https://vitalik.ca/general/2019/05/12/fft.html for motivation
 """
-from typing import Sequence, List
+from typing import Sequence, List, Optional
 from misc_crypto.ecc import FieldElement
+from misc_crypto.ecc.protocol import P
 from .helpers import is_power_of_2
+from .ntt import can_use_ntt, ntt_fft, ntt_inverse_fft
+from .parallel_fft import should_use_parallel, four_step_fft
 
 
 def fft(
-    coefficients: Sequence[FieldElement], domain: Sequence[FieldElement]
+    coefficients: Sequence[FieldElement],
+    domain: Sequence[FieldElement],
+    parallel: Optional[bool] = None,
 ) -> List[FieldElement]:
+    """
+    parallel: use the four-step fft over worker processes.
+    None means automatic, for domains of at least PARALLEL_FFT_THRESHOLD points.
+    """
     len_coeff, len_domain = len(coefficients), len(domain)
 
     if not is_power_of_2(len_domain):
@@ -22,6 +31,11 @@ def fft(
                 f"the length of domain ({len_domain})"
             )
         )
+    if can_use_ntt(domain):
+        return ntt_fft(coefficients, domain)
+    if should_use_parallel(domain, parallel):
+        return four_step_fft(coefficients, domain)
+
     zero = coefficients[0].zero()
     padded_coefficients = tuple(coefficients) + (zero,) * (len_domain - len_coeff)
 
@@ -45,8 +59,159 @@ def _fft(
 
 
 def inverse_fft(
-    evaluations: Sequence[FieldElement], domain: Sequence[FieldElement]
+    evaluations: Sequence[FieldElement],
+    domain: Sequence[FieldElement],
+    parallel: Optional[bool] = None,
 ) -> List[FieldElement]:
-    values = fft(evaluations, domain)
+    if can_use_ntt(domain) and len(evaluations) == len(domain):
+        return ntt_inverse_fft(evaluations, domain)
+    values = fft(evaluations, domain, parallel)
     len_values = len(values)
     return [v / len_values for v in [values[0]] + values[1:][::-1]]
+
+
+def _reverse_bits(i: int, bits: int) -> int:
+    return int(format(i, f"0{bits}b")[::-1], 2) if bits > 0 else 0
+
+
+def truncated_domain(domain: Sequence[FieldElement], length: int) -> List[FieldElement]:
+    """
+    The first `length` points of the domain in bit-reversed order.
+    The prefix is a union of cosets: the first half is the subgroup of even powers, etc.
+    """
+    bits = len(domain).bit_length() - 1
+    return [domain[_reverse_bits(i, bits)] for i in range(length)]
+
+
+def truncated_fft(
+    coefficients: Sequence[FieldElement],
+    domain: Sequence[FieldElement],
+    length: Optional[int] = None,
+) -> List[FieldElement]:
+    """
+    Evaluate on truncated_domain(domain, length), length defaults to len(coefficients)
+    The cost is proportional to length instead of len(domain).
+    See van der Hoeven, The Truncated Fourier Transform and Applications
+    """
+    length = len(coefficients) if length is None else length
+    len_domain = len(domain)
+    if not is_power_of_2(len_domain):
+        raise ValueError("length of domain should be a power of 2, got", len_domain)
+    if len(coefficients) > len_domain or length > len_domain:
+        raise ValueError(
+            f"Coefficients ({len(coefficients)}) and length ({length}) should not be "
+            f"larger than the length of domain ({len_domain})"
+        )
+    return _tft(list(coefficients), domain, length, coefficients[0].zero())
+
+
+def _tft(
+    coefficients: List[FieldElement],
+    domain: Sequence[FieldElement],
+    length: int,
+    zero: FieldElement,
+) -> List[FieldElement]:
+    if length == 0:
+        return []
+    if len(domain) == 1:
+        return [coefficients[0] if coefficients else zero]
+    # At the even powers, p(x) = p0(x^2) with p0 = low + high.
+    # At the odd powers w * y, p(x) = p1(y^2) with p1 = (low - high) * w^i
+    half = len(domain) // 2
+    low, high = coefficients[:half], coefficients[half:]
+    p0 = [_l + _h for _l, _h in zip(low, high)] + low[len(high) :]
+    sub_domain = domain[::2]
+    if length <= half:
+        return _tft(p0, sub_domain, length, zero)
+    p1 = [
+        (_l - _h) * w
+        for _l, _h, w in zip(low, high + [zero] * (half - len(high)), domain)
+    ]
+    return _tft(p0, sub_domain, half, zero) + _tft(p1, sub_domain, length - half, zero)
+
+
+def inverse_truncated_fft(
+    evaluations: Sequence[FieldElement], domain: Sequence[FieldElement]
+) -> List[FieldElement]:
+    """
+    Interpolate the polynomial of len(evaluations) coefficients
+    from its evaluations on truncated_domain(domain, len(evaluations))
+    """
+    len_domain = len(domain)
+    if not is_power_of_2(len_domain):
+        raise ValueError("length of domain should be a power of 2, got", len_domain)
+    if len(evaluations) > len_domain:
+        raise ValueError("Too many evaluations for the domain")
+    inverse_two = evaluations[0].one() / 2
+    return _itft(list(evaluations), domain, inverse_two)
+
+
+def _itft(
+    values: List[FieldElement],
+    domain: Sequence[FieldElement],
+    inverse_two: FieldElement,
+) -> List[FieldElement]:
+    length = len(values)
+    if length == 0:
+        return []
+    if len(domain) == 1:
+        return values
+    half = len(domain) // 2
+    sub_domain = domain[::2]
+    if length <= half:
+        # Fewer than half coefficients, so p0 == p
+        return _itft(values, sub_domain, inverse_two)
+    # The first half of the values determines p0 = low + high completely
+    p0 = _itft(values[:half], sub_domain, inverse_two)
+    zero = inverse_two.zero()
+    # Only the first k coefficients of high are non-zero
+    k = length - half
+    if k < half:
+        # p1[i] = p0[i] * w^i is known for i >= k, remove its contribution
+        known = [zero] * k + [p0[i] * domain[i] for i in range(k, half)]
+        known_values = _tft(known, sub_domain, k, zero)
+        p1_values = [v - _k for v, _k in zip(values[half:], known_values)]
+    else:
+        p1_values = values[half:]
+    p1 = _itft(p1_values, sub_domain, inverse_two)
+    low = list(p0)
+    high = []
+    for i in range(k):
+        # low - high = p1[i] * w^-i
+        difference = p1[i] * domain[-i]
+        low[i] = (p0[i] + difference) * inverse_two
+        high.append((p0[i] - difference) * inverse_two)
+    return low + high
+
+
+def group_fft(points: Sequence[P], domain: Sequence[FieldElement]) -> List[P]:
+    """
+    fft with curve points as coefficients: [sum(P_j * x^j) for x in domain]
+    """
+    len_points, len_domain = len(points), len(domain)
+    if not is_power_of_2(len_domain):
+        raise ValueError("length of domain should be a power of 2, got", len_domain)
+    if len_points > len_domain:
+        raise ValueError("Too many points for the domain")
+    zero = points[0].multiply(0)
+    return _group_fft(list(points) + [zero] * (len_domain - len_points), domain)
+
+
+def _group_fft(points: Sequence[P], domain: Sequence[FieldElement]) -> List[P]:
+    if len(points) == 1:
+        return list(points)
+    evens = _group_fft(points[::2], domain[::2])
+    odds = _group_fft(points[1::2], domain[::2])
+    left_output = []
+    right_output = []
+    for even, odd, x in zip(evens, odds, domain):
+        x_odd = odd if x == 1 else odd.multiply(x)
+        left_output.append(even.add(x_odd))
+        right_output.append(even.add(x_odd.neg()))
+    return left_output + right_output
+
+
+def inverse_group_fft(points: Sequence[P], domain: Sequence[FieldElement]) -> List[P]:
+    values = group_fft(points, domain)
+    inverse_length = domain[0].one() / len(values)
+    return [v.multiply(inverse_length) for v in [values[0]] + values[1:][::-1]]
@@ -0,0 +1,286 @@
+"""
+FRI: a transparent polynomial commitment, see https://eccc.weizmann.ac.il/report/2017/134/
+and https://vitalik.ca/general/2017/11/22/starks_part_2.html
+
+The commitment is the Merkle root of the evaluations of p on a roots of unity domain
+`blowup` times bigger than the degree bound. To open p(z) = y, the prover shows
+q(x) = (p(x) - y) / (x - z) is of low degree by folding it in halves:
+
+    q'(x^2) = (q(x) + q(-x)) / 2 + beta * (q(x) - q(-x)) / (2x)
+
+Each fold halves the degree bound and the domain, until q is a constant.
+The verifier checks the folds at random positions against the Merkle roots,
+the values of q on the first layer are computed from the openings of p.
+
+No trusted setup and no pairings, only keccak_256.
+"""
+from dataclasses import dataclass
+from typing import Sequence, List, Tuple
+from misc_crypto.ecc import Backend, FieldElement, roots_of_unity
+from misc_crypto.keccak.keccak import keccak_256
+from .fft import fft
+from .helpers import is_power_of_2
+from .operations import evaluate, batch_inverse
+
+Commitment = bytes
+MerkleTree = List[List[bytes]]
+# The values at x and -x, and the Merkle path of their leaf
+Opening = Tuple[FieldElement, FieldElement, List[bytes]]
+
+DEFAULT_BLOWUP = 4
+DEFAULT_NUM_QUERIES = 32
+
+
+@dataclass
+class FRIParameters:
+    length: int  # the number of coefficients
+    blowup: int
+    num_queries: int
+    domain: Sequence[FieldElement]
+
+
+@dataclass
+class FRIProof:
+    layer_roots: List[bytes]
+    final_value: FieldElement
+    # queries[i][k] opens the k-th layer for the i-th query
+    queries: List[List[Opening]]
+
+
+def setup(
+    backend: Backend,
+    length: int,
+    blowup: int = DEFAULT_BLOWUP,
+    num_queries: int = DEFAULT_NUM_QUERIES,
+) -> FRIParameters:
+    if not is_power_of_2(length) or not is_power_of_2(blowup) or blowup < 2:
+        raise ValueError("length and blowup should be powers of 2, blowup at least 2")
+    domain = roots_of_unity(backend, length * blowup)
+    return FRIParameters(length, blowup, num_queries, domain)
+
+
+def _to_bytes(value: FieldElement) -> bytes:
+    return int(value).to_bytes(32, "big")
+
+
+def _leaf(a: FieldElement, b: FieldElement) -> bytes:
+    return keccak_256(_to_bytes(a) + _to_bytes(b))
+
+
+def merkle_tree(evaluations: Sequence[FieldElement]) -> MerkleTree:
+    """
+    The leaf i holds the evaluations at x and -x, which are i and i + n/2
+    """
+    half = len(evaluations) // 2
+    level = [_leaf(evaluations[i], evaluations[i + half]) for i in range(half)]
+    tree = [level]
+    while len(level) > 1:
+        level = [keccak_256(level[i] + level[i + 1]) for i in range(0, len(level), 2)]
+        tree.append(level)
+    return tree
+
+
+def merkle_path(tree: MerkleTree, index: int) -> List[bytes]:
+    path = []
+    for level in tree[:-1]:
+        path.append(level[index ^ 1])
+        index //= 2
+    return path
+
+
+def verify_merkle_path(
+    root: bytes, leaf: bytes, index: int, path: Sequence[bytes]
+) -> bool:
+    node = leaf
+    for sibling in path:
+        node = keccak_256(sibling + node) if index & 1 else keccak_256(node + sibling)
+        index //= 2
+    return node == root
+
+
+class _Transcript:
+    """
+    Fiat-Shamir: the challenges are hashes of everything the prover sent so far
+    """
+
+    def __init__(self, *messages: bytes) -> None:
+        self.state = keccak_256(b"".join(messages))
+
+    def absorb(self, message: bytes) -> None:
+        self.state = keccak_256(self.state + message)
+
+    def challenge(self) -> int:
+        self.state = keccak_256(self.state)
+        return int.from_bytes(self.state, "big")
+
+
+def _start_transcript(
+    commitment: Commitment, z: FieldElement, y: FieldElement
+) -> _Transcript:
+    return _Transcript(b"FRI", commitment, _to_bytes(z), _to_bytes(y))
+
+
+def _fold(
+    evaluations: Sequence[FieldElement],
+    domain: Sequence[FieldElement],
+    beta: FieldElement,
+) -> List[FieldElement]:
+    half = len(evaluations) // 2
+    inverse_two = beta.one() / 2
+    inverse_xs = batch_inverse(domain[:half])
+    return [
+        _fold_pair(
+            evaluations[i], evaluations[i + half], inverse_xs[i], beta, inverse_two
+        )
+        for i in range(half)
+    ]
+
+
+def _fold_pair(
+    a: FieldElement,
+    b: FieldElement,
+    inverse_x: FieldElement,
+    beta: FieldElement,
+    inverse_two: FieldElement,
+) -> FieldElement:
+    return ((a + b) + beta * (a - b) * inverse_x) * inverse_two
+
+
+def _evaluations(
+    params: FRIParameters, p: Sequence[FieldElement]
+) -> List[FieldElement]:
+    if len(p) > params.length:
+        raise ValueError(f"Expect at most {params.length} coefficients, got {len(p)}")
+    return fft(p, params.domain)
+
+
+def commit(params: FRIParameters, p: Sequence[FieldElement]) -> Commitment:
+    return merkle_tree(_evaluations(params, p))[-1][0]
+
+
+def prove_single(
+    params: FRIParameters, p: Sequence[FieldElement], z: FieldElement
+) -> Tuple[FieldElement, FRIProof]:
+    domain = params.domain
+    if z in domain:
+        raise ValueError("Can't open at a point of the evaluation domain")
+    p_evaluations = _evaluations(params, p)
+    p_tree = merkle_tree(p_evaluations)
+    y = evaluate(p, z)
+    transcript = _start_transcript(p_tree[-1][0], z, y)
+
+    # q = (p - y) / (x - z) on the domain
+    inverse_differences = batch_inverse([x - z for x in domain])
+    evaluations = [
+        (p_x - y) * inverse for p_x, inverse in zip(p_evaluations, inverse_differences)
+    ]
+    # The first layer opens p, the verifier derives q from it
+    layers = [(p_tree, p_evaluations)]
+    for _ in range(_number_of_folds(params)):
+        beta = type(z)(transcript.challenge())
+        evaluations = _fold(evaluations, domain, beta)
+        domain = domain[::2]
+        if len(evaluations) > params.blowup:
+            tree = merkle_tree(evaluations)
+            layers.append((tree, evaluations))
+            transcript.absorb(tree[-1][0])
+    # The degree bound is now 1, q is a constant
+    final_value = evaluations[0]
+    transcript.absorb(_to_bytes(final_value))
+
+    queries = []
+    for index in _query_indices(transcript, params):
+        openings = []
+        for tree, values in layers:
+            half = len(values) // 2
+            layer_index = index % half
+            openings.append(
+                (
+                    values[layer_index],
+                    values[layer_index + half],
+                    merkle_path(tree, layer_index),
+                )
+            )
+        queries.append(openings)
+    layer_roots = [tree[-1][0] for tree, _ in layers[1:]]
+    return y, FRIProof(layer_roots, final_value, queries)
+
+
+def verify_single(
+    backend: Backend,
+    params: FRIParameters,
+    commitment: Commitment,
+    z: FieldElement,
+    y: FieldElement,
+    proof: FRIProof,
+) -> bool:
+    number_of_folds = _number_of_folds(params)
+    roots = [commitment] + proof.layer_roots
+    if (
+        len(roots) != max(number_of_folds, 1)
+        or len(proof.queries) != params.num_queries
+    ):
+        return False
+
+    transcript = _start_transcript(commitment, z, y)
+    betas = []
+    for k in range(number_of_folds):
+        betas.append(backend.Fr(transcript.challenge()))
+        if k + 1 < len(roots):
+            transcript.absorb(roots[k + 1])
+    transcript.absorb(_to_bytes(proof.final_value))
+
+    return all(
+        _verify_query(params, roots, openings, index, z, y, betas, proof.final_value)
+        for index, openings in zip(_query_indices(transcript, params), proof.queries)
+    )
+
+
+def _verify_query(
+    params: FRIParameters,
+    roots: Sequence[bytes],
+    openings: Sequence[Opening],
+    index: int,
+    z: FieldElement,
+    y: FieldElement,
+    betas: Sequence[FieldElement],
+    final_value: FieldElement,
+) -> bool:
+    """
+    Check the folds of one query layer by layer, down to the final value
+    """
+    if len(openings) != len(roots):
+        return False
+    inverse_two = z.one() / 2
+    layer_domain = params.domain
+    # The previous fold lands at this position of the current layer
+    expected_position, expected_value = 0, final_value
+    for k, (root, (a, b, path)) in enumerate(zip(roots, openings)):
+        half = len(layer_domain) // 2
+        layer_index = index % half
+        if not verify_merkle_path(root, _leaf(a, b), layer_index, path):
+            return False
+        if k > 0 and (a if expected_position < half else b) != expected_value:
+            return False
+        x = layer_domain[layer_index]
+        if k == 0:
+            if z in (x, -x):
+                return False
+            a = (a - y) / (x - z)
+            b = (b - y) / (-x - z)
+        if k == len(betas):
+            # Nothing to fold, q itself should be the constant
+            return a == b == final_value
+        expected_position = layer_index
+        expected_value = _fold_pair(a, b, x.one() / x, betas[k], inverse_two)
+        layer_domain = layer_domain[::2]
+    return expected_value == final_value
+
+
+def _number_of_folds(params: FRIParameters) -> int:
+    return params.length.bit_length() - 1
+
+
+def _query_indices(transcript: _Transcript, params: FRIParameters) -> List[int]:
+    half = len(params.domain) // 2
+    return [transcript.challenge() % half for _ in range(params.num_queries)]
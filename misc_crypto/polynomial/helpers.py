@@ -7,3 +7,10 @@ def is_power_of_2(n: int) -> bool:
 
 def next_power_of_2(n: int) -> int:
     return 1 << ceil(log2(n))
+
+
+def is_just_over_power_of_2(n: int) -> bool:
+    """
+    The truncated fft pays off when n is at most 3/4 of the next power of 2
+    """
+    return n > 2 and 4 * n <= 3 * next_power_of_2(n)
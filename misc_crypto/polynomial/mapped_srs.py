@@ -0,0 +1,253 @@
+"""
+An SRS file read through mmap, with the points decoded on demand
+
+    header    magic, version, curve id, point sizes, counts, Lagrange basis sizes
+    G1        g1_count fixed-width records, the generator first
+    G2        g2_count fixed-width records, the generator first
+    Lagrange  one run of records per basis size
+
+A record is the affine coordinates of the point (see to_bytes), all zeros for infinity.
+Points are decoded a chunk at a time and the recently used chunks are kept, so a 2^20
+SRS costs the pages we touch instead of millions of python objects.
+
+A MappedSRS pickles as its path. A worker process opens the file again, and the
+mapping shares the page cache with every other process reading it.
+"""
+from collections import OrderedDict
+from collections.abc import Sequence as AbstractSequence
+import mmap
+import os
+import struct
+from typing import Sequence, List, Dict, Tuple, Union, Any, Callable, cast
+from misc_crypto.ecc import Backend, BLS12381Backend, BN254Backend
+from .commitments import SRS
+
+MAGIC = b"KZGMAP"
+VERSION = 1
+HEADER = struct.Struct(">6sB16sHHIII")
+LAGRANGE_SIZE = struct.Struct(">I")
+
+CURVES: Dict[str, Backend] = {
+    "BLS12-381": cast(Backend, BLS12381Backend),
+    "BN254": cast(Backend, BN254Backend),
+}
+
+DEFAULT_CHUNK_POINTS = 1024
+DEFAULT_CACHED_CHUNKS = 16
+
+Path = Union[str, os.PathLike]
+
+
+def _curve_id(backend: Backend) -> str:
+    for curve_id, curve_backend in CURVES.items():
+        if curve_backend is backend:
+            return curve_id
+    raise ValueError(f"Unknown curve of backend {backend}")
+
+
+def header(
+    backend: Backend, g1_count: int, g2_count: int, lagrange_sizes: Sequence[int] = ()
+) -> bytes:
+    """
+    Everything before the point records
+    """
+    sizes = [LAGRANGE_SIZE.pack(n) for n in lagrange_sizes]
+    return (
+        HEADER.pack(
+            MAGIC,
+            VERSION,
+            _curve_id(backend).encode(),
+            len(backend.get_G1().to_bytes()),
+            len(backend.get_G2().to_bytes()),
+            g1_count,
+            g2_count,
+            len(lagrange_sizes),
+        )
+        + b"".join(sizes)
+    )
+
+
+def write_mapped_srs(path: Path, backend: Backend, srs: SRS) -> None:
+    G1s = [srs.G1] + list(srs.G1s)
+    G2s = [srs.G2] + list(srs.G2s)
+    lagrange_sizes = sorted(srs.lagrange_bases)
+    with open(path, "wb") as f:
+        f.write(header(backend, len(G1s), len(G2s), lagrange_sizes))
+        for point in G1s + G2s:
+            f.write(point.to_bytes())
+        for n in lagrange_sizes:
+            for point in srs.lagrange_bases[n]:
+                f.write(point.to_bytes())
+
+
+class PointRecords(AbstractSequence):
+    """
+    A read-only sequence of the points in a run of fixed-width records.
+    Integer indices and slices decode only the chunks they touch.
+    """
+
+    def __init__(
+        self,
+        srs: "MappedSRS",
+        offset: int,
+        count: int,
+        group: str,
+        chunk_points: int = DEFAULT_CHUNK_POINTS,
+        cached_chunks: int = DEFAULT_CACHED_CHUNKS,
+    ) -> None:
+        self._srs = srs
+        self._offset = offset
+        self._count = count
+        self._group = group
+        self._chunk_points = chunk_points
+        self._cached_chunks = cached_chunks
+        self._chunks: "OrderedDict[int, List[Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _chunk(self, index: int) -> List[Any]:
+        chunk = self._chunks.get(index)
+        if chunk is not None:
+            self._chunks.move_to_end(index)
+            return chunk
+        start = index * self._chunk_points
+        stop = min(start + self._chunk_points, self._count)
+        decode, size = self._srs.decoder(self._group)
+        buffer, base = self._srs.buffer, self._offset
+        chunk = [
+            decode(bytes(buffer[base + i * size : base + (i + 1) * size]))
+            for i in range(start, stop)
+        ]
+        self._chunks[index] = chunk
+        if len(self._chunks) > self._cached_chunks:
+            self._chunks.popitem(last=False)
+        return chunk
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("point index out of range")
+        chunk = self._chunk(index // self._chunk_points)
+        return chunk[index % self._chunk_points]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_chunks"] = OrderedDict()
+        return state
+
+
+class MappedSRS:
+    """
+    Has the attributes of SRS, so commit, the provers, and
+    multi_scalar_multiplication take it as is. toxic is always None.
+    """
+
+    toxic = None
+
+    def __init__(self, path: Path, raw: bool = False) -> None:
+        """
+        raw=True decodes to py_ecc points instead of wrapped points, for plonk
+        """
+        self.path = os.fspath(path)
+        self.raw = raw
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._parse()
+
+    def _parse(self) -> None:
+        if len(self._mmap) < HEADER.size:
+            raise ValueError("Truncated srs file")
+        (
+            magic,
+            version,
+            curve_id,
+            g1_size,
+            g2_size,
+            g1_count,
+            g2_count,
+            bases,
+        ) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a mapped srs file of a known version")
+        curve = curve_id.rstrip(b"\x00").decode()
+        if curve not in CURVES:
+            raise ValueError(f"Unknown curve {curve}")
+        self.backend = CURVES[curve]
+        if (g1_size, g2_size) != (self.decoder("G1")[1], self.decoder("G2")[1]):
+            raise ValueError(f"Unexpected point sizes for {curve}")
+        offset = HEADER.size
+        lagrange_sizes = []
+        for _ in range(bases):
+            (n,) = LAGRANGE_SIZE.unpack_from(self._mmap, offset)
+            lagrange_sizes.append(n)
+            offset += LAGRANGE_SIZE.size
+        expected = offset + (g1_count + sum(lagrange_sizes)) * g1_size
+        if expected + g2_count * g2_size != len(self._mmap):
+            raise ValueError("The srs file size doesn't match its header")
+
+        self.G1_powers, offset = self._records(offset, g1_count, "G1")
+        self.G2_powers, offset = self._records(offset, g2_count, "G2")
+        self.G1, self.G1s = self.G1_powers[0], _Tail(self.G1_powers)
+        self.G2, self.G2s = self.G2_powers[0], _Tail(self.G2_powers)
+        self.lagrange_bases: Dict[int, Any] = {}
+        for n in lagrange_sizes:
+            self.lagrange_bases[n], offset = self._records(offset, n, "G1")
+
+    def _records(self, offset: int, count: int, group: str) -> Tuple[PointRecords, int]:
+        _, record_size = self.decoder(group)
+        return PointRecords(self, offset, count, group), offset + count * record_size
+
+    @property
+    def buffer(self) -> mmap.mmap:
+        return self._mmap
+
+    def decoder(self, group: str) -> Tuple[Callable[[bytes], Any], int]:
+        """
+        The function decoding a record of the group, and the record size
+        """
+        generator = self.backend.get_G1() if group == "G1" else self.backend.get_G2()
+        from_bytes: Callable[[bytes], Any] = type(generator).from_bytes
+        size = len(generator.to_bytes())
+        if self.raw:
+            return (lambda data: from_bytes(data).py_ecc_object), size
+        return from_bytes, size
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self) -> "MappedSRS":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __getstate__(self):
+        return {"path": self.path, "raw": self.raw}
+
+    def __setstate__(self, state) -> None:
+        MappedSRS.__init__(self, state["path"], state["raw"])
+
+
+class _Tail(AbstractSequence):
+    """
+    The records after the generator, as SRS.G1s and SRS.G2s start at s^1
+    """
+
+    def __init__(self, records: PointRecords) -> None:
+        self._records = records
+
+    def __len__(self) -> int:
+        return len(self._records) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("point index out of range")
+        return self._records[index + 1]
@@ -0,0 +1,179 @@
+"""
+Number Theoretic Transform for prime fields that fit in a machine word.
+
+The elements are stored in numpy uint64 arrays, so all the butterflies of an fft layer
+run as a few vectorized operations instead of one python object per element.
+
+numpy is an optional dependency, install it with `poetry install -E numpy`
+"""
+from typing import Sequence, List, Any
+from misc_crypto.ecc import FieldElement
+from .helpers import is_power_of_2
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+GOLDILOCKS_MODULUS = 2 ** 64 - 2 ** 32 + 1
+# 2^64 = 2^32 - 1 (mod GOLDILOCKS_MODULUS)
+GOLDILOCKS_EPSILON = 2 ** 32 - 1
+
+# Below this size the conversion to numpy costs more than it saves
+NTT_THRESHOLD = 64
+
+
+def is_supported_modulus(modulus: int) -> bool:
+    """
+    Products of two elements must fit in uint64, except for Goldilocks,
+    which has its own 128 bits reduction.
+    """
+    return modulus < 2 ** 32 or modulus == GOLDILOCKS_MODULUS
+
+
+class WordField:
+    """
+    Vectorized arithmetic of a word-sized prime field over numpy uint64 arrays
+    """
+
+    modulus: int
+
+    def __init__(self, modulus: int) -> None:
+        if np is None:
+            raise ImportError("WordField requires numpy")
+        if not is_supported_modulus(modulus):
+            raise ValueError(f"Unsupported modulus for WordField: {modulus}")
+        self.modulus = modulus
+        self._p = np.uint64(modulus)
+
+    def array(self, values: Sequence[Any]) -> "np.ndarray":
+        return np.array([int(v) % self.modulus for v in values], dtype=np.uint64)
+
+    def add(self, a: "np.ndarray", b: "np.ndarray") -> "np.ndarray":
+        if self.modulus == GOLDILOCKS_MODULUS:
+            # a + b might overflow 2^64
+            _sum = a + b
+            _sum = np.where(_sum < a, _sum + np.uint64(GOLDILOCKS_EPSILON), _sum)
+            return np.where(_sum >= self._p, _sum - self._p, _sum)
+        return (a + b) % self._p
+
+    def sub(self, a: "np.ndarray", b: "np.ndarray") -> "np.ndarray":
+        # uint64 wraps around, so a - b + p is right even when a - b underflows
+        difference = a - b
+        return np.where(a >= b, difference, difference + self._p)
+
+    def mul(self, a: "np.ndarray", b: "np.ndarray") -> "np.ndarray":
+        if self.modulus == GOLDILOCKS_MODULUS:
+            return self._goldilocks_reduce(*_mul_128(a, b))
+        return (a * b) % self._p
+
+    def _goldilocks_reduce(self, lo: "np.ndarray", hi: "np.ndarray") -> "np.ndarray":
+        """
+        x = lo + 2^64 * hi_lo + 2^96 * hi_hi = lo + (2^32 - 1) * hi_lo - hi_hi
+        """
+        epsilon = np.uint64(GOLDILOCKS_EPSILON)
+        hi_hi = hi >> np.uint64(32)
+        hi_lo = hi & epsilon
+        t0 = lo - hi_hi
+        t0 = np.where(lo < hi_hi, t0 - epsilon, t0)
+        t1 = hi_lo * epsilon
+        t2 = t0 + t1
+        t2 = np.where(t2 < t1, t2 + epsilon, t2)
+        return np.where(t2 >= self._p, t2 - self._p, t2)
+
+    def powers(self, base: int, length: int) -> "np.ndarray":
+        """
+        [1, base, base^2, ..., base^(length-1)]
+        """
+        result = self.array([1])
+        while len(result) < length:
+            step = self.array([pow(base, len(result), self.modulus)])
+            result = np.concatenate([result, self.mul(result, step)])
+        return result[:length]
+
+
+def _mul_128(a: "np.ndarray", b: "np.ndarray"):
+    """
+    Full 128 bits product of uint64 arrays, returned as (low, high) words
+    """
+    mask = np.uint64(0xFFFFFFFF)
+    shift = np.uint64(32)
+    a0, a1 = a & mask, a >> shift
+    b0, b1 = b & mask, b >> shift
+    lo_lo = a0 * b0
+    lo_hi = a0 * b1
+    hi_lo = a1 * b0
+    hi_hi = a1 * b1
+    mid = lo_hi + hi_lo
+    mid_carry = (mid < lo_hi).astype(np.uint64)
+    lo = lo_lo + (mid << shift)
+    lo_carry = (lo < lo_lo).astype(np.uint64)
+    hi = hi_hi + (mid >> shift) + (mid_carry << shift) + lo_carry
+    return lo, hi
+
+
+def _bit_reverse_permutation(n: int) -> "np.ndarray":
+    indices = np.arange(n)
+    result = np.zeros(n, dtype=np.int64)
+    bits = n.bit_length() - 1
+    for i in range(bits):
+        result |= ((indices >> i) & 1) << (bits - 1 - i)
+    return result
+
+
+def ntt(field: WordField, values: "np.ndarray", root: int) -> "np.ndarray":
+    """
+    Iterative radix-2 fft, where root is a primitive len(values)-th root of unity
+    """
+    n = len(values)
+    if not is_power_of_2(n):
+        raise ValueError("length of values should be a power of 2, got", n)
+    twiddles = field.powers(root, max(n // 2, 1))
+    result = values[_bit_reverse_permutation(n)]
+    half = 1
+    while half < n:
+        blocks = result.reshape(-1, 2 * half)
+        evens, odds = blocks[:, :half], blocks[:, half:]
+        odds_twiddled = field.mul(odds, twiddles[:: n // (2 * half)])
+        result = np.concatenate(
+            [field.add(evens, odds_twiddled), field.sub(evens, odds_twiddled)], axis=1
+        ).reshape(n)
+        half *= 2
+    return result
+
+
+def inverse_ntt(field: WordField, values: "np.ndarray", root: int) -> "np.ndarray":
+    n = len(values)
+    modulus = field.modulus
+    inverse_root = pow(root, modulus - 2, modulus)
+    inverse_n = pow(n, modulus - 2, modulus)
+    return field.mul(ntt(field, values, inverse_root), field.array([inverse_n]))
+
+
+def can_use_ntt(domain: Sequence[FieldElement]) -> bool:
+    if np is None or len(domain) < NTT_THRESHOLD:
+        return False
+    modulus = getattr(domain[0], "field_modulus", None)
+    return modulus is not None and is_supported_modulus(modulus)
+
+
+def ntt_fft(
+    coefficients: Sequence[FieldElement], domain: Sequence[FieldElement]
+) -> List[FieldElement]:
+    """
+    Drop-in for fft over field elements, the domain must be [1, w, w^2, ...]
+    """
+    field_type = type(domain[0])
+    field = WordField(domain[0].field_modulus)
+    values = field.array(list(coefficients) + [0] * (len(domain) - len(coefficients)))
+    evaluations = ntt(field, values, int(domain[1]))
+    return [field_type(int(v)) for v in evaluations]
+
+
+def ntt_inverse_fft(
+    evaluations: Sequence[FieldElement], domain: Sequence[FieldElement]
+) -> List[FieldElement]:
+    field_type = type(domain[0])
+    field = WordField(domain[0].field_modulus)
+    coefficients = inverse_ntt(field, field.array(evaluations), int(domain[1]))
+    return [field_type(int(v)) for v in coefficients]
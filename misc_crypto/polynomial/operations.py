@@ -1,18 +1,91 @@
 """
 Assumning inputs are all valid polynomial coefficients
 """
-from typing import Sequence, List, Tuple
+from functools import lru_cache
+from typing import Sequence, List, Tuple, Optional, Iterable
 from misc_crypto.ecc import FieldElement
-from misc_crypto.polynomial.helpers import next_power_of_2
+from misc_crypto.polynomial.helpers import (
+    next_power_of_2,
+    is_power_of_2,
+    is_just_over_power_of_2,
+)
 from misc_crypto.ecc import roots_of_unity, Backend
-from misc_crypto.polynomial.fft import fft, inverse_fft
+from misc_crypto.polynomial.fft import (
+    fft,
+    inverse_fft,
+    truncated_fft,
+    inverse_truncated_fft,
+)
 
 
 def remove_leading_zeros(a: Sequence[FieldElement]) -> List[FieldElement]:
-    result = a.copy()
-    while len(result) > 1 and result[-1] == 0:
-        result.pop()
-    return result
+    return trim(list(a))
+
+
+# In-place operations: the first argument is a mutable buffer, updated and returned.
+# They save the intermediate lists of the operations above on hot paths.
+
+
+def trim(a: List[FieldElement]) -> List[FieldElement]:
+    """
+    In-place remove_leading_zeros, in a single slice deletion
+    """
+    end = len(a)
+    while end > 1 and a[end - 1] == 0:
+        end -= 1
+    del a[end:]
+    return a
+
+
+def add_assign(a: List[FieldElement], b: Sequence[FieldElement]) -> List[FieldElement]:
+    """
+    a += b
+    """
+    len_a = len(a)
+    for i, b_i in zip(range(len_a), b):
+        a[i] += b_i
+    a.extend(b[len_a:])
+    return a
+
+
+def sub_assign(a: List[FieldElement], b: Sequence[FieldElement]) -> List[FieldElement]:
+    """
+    a -= b
+    """
+    len_a = len(a)
+    for i, b_i in zip(range(len_a), b):
+        a[i] -= b_i
+    a.extend(-b_i for b_i in b[len_a:])
+    return a
+
+
+def scale_assign(a: List[FieldElement], scalar: FieldElement) -> List[FieldElement]:
+    """
+    a *= scalar
+    """
+    for i in range(len(a)):
+        a[i] *= scalar
+    return a
+
+
+def axpy(
+    y: List[FieldElement],
+    scalar: FieldElement,
+    x: Sequence[FieldElement],
+    offset: int = 0,
+) -> List[FieldElement]:
+    """
+    y += scalar * x * X^offset
+    """
+    if len(x) == 0:
+        return y
+    if len(y) < offset:
+        y.extend([x[0] * 0] * (offset - len(y)))
+    overlap = min(len(x), len(y) - offset)
+    for i in range(overlap):
+        y[offset + i] += scalar * x[i]
+    y.extend(scalar * x_i for x_i in x[overlap:])
+    return y
 
 
 def is_zero(a: Sequence[FieldElement]) -> bool:
@@ -44,6 +117,18 @@ def naive_multiply(
     return product
 
 
+def schoolbook_multiply(
+    a: Sequence[FieldElement], b: Sequence[FieldElement]
+) -> List[FieldElement]:
+    """
+    O(len(a) * len(b)) product, accumulating the rows with axpy
+    """
+    product = [a[0].zero()] * (len(a) + len(b) - 1)
+    for i, a_i in enumerate(a):
+        axpy(product, a_i, b, i)
+    return product
+
+
 def lagrange(
     domain: Sequence[FieldElement], evaluation: Sequence[FieldElement]
 ) -> List[FieldElement]:
@@ -61,16 +146,29 @@ def lagrange(
         for xx in domain_rest:
             basis = naive_multiply(basis, [-xx, one])
             denominator *= x - xx
-        basis = [y * b / denominator for b in basis]
-        coefficients = add_polynomial(coefficients, basis)
+        add_assign(coefficients, scale_assign(basis, y / denominator))
     return coefficients
 
 
+# Repeated products reuse the roots of each domain size, they are immutable tuples
+cached_roots_of_unity = lru_cache(maxsize=None)(roots_of_unity)
+
+
 def fft_multiply(
     backend: Backend, a: Sequence[FieldElement], b: Sequence[FieldElement]
 ) -> List[FieldElement]:
-    domain_size = next_power_of_2(len(a) + len(b) - 1)
-    domain = roots_of_unity(backend, domain_size)
+    product_length = len(a) + len(b) - 1
+    domain_size = next_power_of_2(product_length)
+    domain = cached_roots_of_unity(backend, domain_size)
+
+    if is_just_over_power_of_2(product_length):
+        # Only evaluate on as many points as the product has coefficients
+        a_evaluations = truncated_fft(a, domain, product_length)
+        b_evaluations = truncated_fft(b, domain, product_length)
+        product_evaluations = [_a * _b for _a, _b in zip(a_evaluations, b_evaluations)]
+        product_coefficients = inverse_truncated_fft(product_evaluations, domain)
+        return remove_leading_zeros(product_coefficients)
+
     a_evaluations = fft(a, domain)
     b_evaluations = fft(b, domain)
 
@@ -81,11 +179,54 @@ def fft_multiply(
 
 
 def fft_multiply_many(
+    backend: Backend,
+    ps: Iterable[Sequence[FieldElement]],
+    balanced: bool = True,
+) -> List[FieldElement]:
+    """
+    With balanced=True, multiply pairs up a balanced product tree, so each fft is only
+    as large as the partial products it multiplies. ps can be a generator: partial
+    products of equal size are merged like a binary counter, holding at most
+    log2(len(ps)) of them. Otherwise every p is evaluated on the output-sized domain.
+    """
+    if not balanced:
+        return _fft_multiply_many_flat(backend, list(ps))
+    # (rank, partial product of 2^rank factors)
+    stack: List[Tuple[int, List[FieldElement]]] = []
+    for p in ps:
+        rank, product = 0, list(p)
+        while stack and stack[-1][0] == rank:
+            _, left = stack.pop()
+            product = _multiply_pair(backend, left, product)
+            rank += 1
+        stack.append((rank, product))
+    if len(stack) == 0:
+        raise ValueError("Expect at least one polynomial")
+    _, product = stack.pop()
+    while stack:
+        _, left = stack.pop()
+        product = _multiply_pair(backend, left, product)
+    return remove_leading_zeros(product)
+
+
+# Below this length the schoolbook product beats the ffts
+SCHOOLBOOK_THRESHOLD = 16
+
+
+def _multiply_pair(
+    backend: Backend, a: Sequence[FieldElement], b: Sequence[FieldElement]
+) -> List[FieldElement]:
+    if min(len(a), len(b)) <= SCHOOLBOOK_THRESHOLD:
+        return schoolbook_multiply(a, b)
+    return fft_multiply(backend, a, b)
+
+
+def _fft_multiply_many_flat(
     backend: Backend, ps: Sequence[Sequence[FieldElement]]
 ) -> List[FieldElement]:
     output_degree = sum([len(p) - 1 for p in ps])
     domain_size = next_power_of_2(output_degree + 1)
-    domain = roots_of_unity(backend, domain_size)
+    domain = cached_roots_of_unity(backend, domain_size)
     evaluations = [fft(p, domain) for p in ps]
     one = ps[0][0].one()
     product_evaluations = []
@@ -112,21 +253,19 @@ def euclidean_division(
     if remainder_degree < 0:
         raise ValueError("divisor has higher degree:", dividend, divisor)
 
-    # Work with reverse order
-    quotient = []
-    remainder = list(reversed(dividend))
-    _divisor = list(reversed(divisor))
+    # Long division on a single remainder buffer, the top coefficient
+    # cancels at each step so it is dropped instead of subtracted
+    remainder = list(dividend)
+    quotient = [dividend[0].zero()] * (remainder_degree + 1)
+    lower_divisor = divisor[:-1]
+    leading_inverse = divisor[-1].one() / divisor[-1]
 
-    for _ in range(remainder_degree + 1):
-        m = remainder[0] / _divisor[0]
-        affected = [r - m * d for r, d in zip(remainder[1:], _divisor[1:])]
-        remainder = affected + remainder[len_divisor:]
-        quotient.append(m)
+    for i in range(remainder_degree, -1, -1):
+        m = remainder.pop() * leading_inverse
+        quotient[i] = m
+        axpy(remainder, -m, lower_divisor, i)
 
-    return (
-        remove_leading_zeros(list(reversed(quotient))),
-        remove_leading_zeros(list(reversed(remainder))),
-    )
+    return trim(quotient), trim(remainder or [dividend[0].zero()])
 
 
 def true_division(
@@ -147,6 +286,77 @@ def evaluate(p: Sequence[FieldElement], x: FieldElement) -> FieldElement:
     return result
 
 
+def _inner_product(
+    p: Sequence[FieldElement], powers: Sequence[FieldElement]
+) -> FieldElement:
+    result = powers[0].zero()
+    for coefficient, power in zip(p, powers):
+        result += coefficient * power
+    return result
+
+
+def _as_coset(
+    xs: Sequence[FieldElement],
+) -> Optional[Tuple[FieldElement, List[FieldElement]]]:
+    """
+    If xs is [h, h*w, h*w^2, ..., h*w^(n-1)] with w a primitive n-th root of unity,
+    return the shift h and the subgroup [1, w, ..., w^(n-1)]
+    """
+    n = len(xs)
+    if n < 4 or not is_power_of_2(n) or xs[0] == 0:
+        return None
+    shift = xs[0]
+    generator = xs[1] / shift
+    for previous, current in zip(xs, xs[1:]):
+        if previous * generator != current:
+            return None
+    if xs[-1] * generator != shift or generator ** (n // 2) == 1:
+        return None
+    domain = [generator.one()]
+    for _ in range(n - 1):
+        domain.append(domain[-1] * generator)
+    return shift, domain
+
+
+def _coset_evaluate(
+    p: Sequence[FieldElement], shift: FieldElement, domain: Sequence[FieldElement]
+) -> List[FieldElement]:
+    # p(h * w^i) = sum(c_j * h^j * w^(ij)), and w^(ij) only depends on j mod n
+    n = len(domain)
+    folded = [shift.zero()] * n
+    power = shift.one()
+    for j, coefficient in enumerate(p):
+        folded[j % n] += coefficient * power
+        power *= shift
+    return fft(folded, domain)
+
+
+def evaluate_many(
+    ps: Sequence[Sequence[FieldElement]], xs: Sequence[FieldElement]
+) -> List[List[FieldElement]]:
+    """
+    Evaluate every polynomial at every point, result[i][j] == evaluate(ps[i], xs[j])
+
+    The powers of each point are computed once and shared by all the polynomials.
+    If the points are a coset of a multiplicative subgroup, we dispatch to fft.
+    """
+    if len(ps) == 0:
+        return []
+    coset = _as_coset(xs)
+    if coset is not None:
+        shift, domain = coset
+        return [_coset_evaluate(p, shift, domain) for p in ps]
+
+    max_len = max(len(p) for p in ps)
+    power_table = []
+    for x in xs:
+        powers = [x.one()]
+        for _ in range(max_len - 1):
+            powers.append(powers[-1] * x)
+        power_table.append(powers)
+    return [[_inner_product(p, powers) for powers in power_table] for p in ps]
+
+
 def compute_zero_polynomial(zs: Sequence[FieldElement]) -> List[FieldElement]:
     z0, z_rest = zs[0], zs[1:]
     one = z0.one()
@@ -158,3 +368,76 @@ def compute_zero_polynomial(zs: Sequence[FieldElement]) -> List[FieldElement]:
 
 def negate(p: Sequence[FieldElement]) -> List[FieldElement]:
     return [-p_i for p_i in p]
+
+
+def batch_inverse(values: Sequence[FieldElement]) -> List[FieldElement]:
+    """
+    Montgomery's trick: invert n elements with a single field inversion
+    """
+    if len(values) == 0:
+        return []
+    prefix_products = []
+    accumulator = values[0].one()
+    for value in values:
+        prefix_products.append(accumulator)
+        accumulator *= value
+    inverse = accumulator.one() / accumulator
+    inverses = [inverse] * len(values)
+    for i in reversed(range(len(values))):
+        inverses[i] = inverse * prefix_products[i]
+        inverse *= values[i]
+    return inverses
+
+
+def is_multiplicative_subgroup(domain: Sequence[FieldElement]) -> bool:
+    """
+    Check if the domain is [1, w, w^2, ..., w^(n-1)] with w^n == 1
+    """
+    if len(domain) < 2 or domain[0] != 1:
+        return False
+    generator = domain[1]
+    for previous, current in zip(domain, domain[1:]):
+        if previous * generator != current:
+            return False
+    return domain[-1] * generator == 1
+
+
+def barycentric_weights(domain: Sequence[FieldElement]) -> List[FieldElement]:
+    """
+    w_i = 1 / prod_{j != i} (x_i - x_j)
+    For the roots of unity the weights are simply w_i = x_i / n
+    """
+    n = len(domain)
+    if is_multiplicative_subgroup(domain):
+        inverse_n = domain[0].one() / n
+        return [x * inverse_n for x in domain]
+    denominators = []
+    for i, x in enumerate(domain):
+        denominator = x.one()
+        for j, xx in enumerate(domain):
+            if i != j:
+                denominator *= x - xx
+        denominators.append(denominator)
+    return batch_inverse(denominators)
+
+
+def barycentric_evaluate(
+    domain: Sequence[FieldElement],
+    weights: Sequence[FieldElement],
+    evaluations: Sequence[FieldElement],
+    x: FieldElement,
+) -> FieldElement:
+    """
+    p(x) = l(x) * sum(w_i * y_i / (x - x_i)), where l(x) = prod(x - x_i)
+    """
+    differences = [x - x_i for x_i in domain]
+    for difference, y in zip(differences, evaluations):
+        if difference == 0:
+            return y
+    l_x = differences[0]
+    for difference in differences[1:]:
+        l_x *= difference
+    result = x.zero()
+    for w, y, inverse in zip(weights, evaluations, batch_inverse(differences)):
+        result += w * y * inverse
+    return result * l_x
@@ -0,0 +1,207 @@
+"""
+Out-of-core fft for domains that don't fit in memory
+
+Field elements are fixed-width 32 bytes little endian records in a memory-mapped file.
+The transform is the blocked four-step fft (see parallel_fft.py):
+
+1. Load a block of columns, reading contiguous row segments. Run the column ffts,
+   apply the twiddles, and write them to a scratch file.
+2. Run the row ffts in place, rows are contiguous in the scratch file.
+3. Transpose the scratch file into the destination block by block.
+
+At most max(block_records, n2) field elements are held in memory at a time, where
+n2 ~ sqrt(n) is the length of a column: a column is loaded whole even if block_records
+is smaller.
+"""
+from contextlib import contextmanager
+import mmap
+import os
+import tempfile
+from typing import Sequence, List, Union, Iterator, Type, Optional
+from misc_crypto.ecc import FieldElement
+from .helpers import is_power_of_2
+from .parallel_fft import _fft_int, _powers, split_dimensions, RECORD_BYTES
+
+# Destinations are written in place, sources may also be read-only bytes
+Destination = Union[str, os.PathLike, bytearray, memoryview, mmap.mmap]
+Source = Union[Destination, bytes]
+
+DEFAULT_BLOCK_RECORDS = 2 ** 16
+
+
+def write_field_elements(target: Destination, values: Sequence[FieldElement]) -> None:
+    with _open_records(target, len(values)) as records:
+        for i, value in enumerate(values):
+            _store(records, i, int(value))
+
+
+def read_field_elements(
+    source: Source, field_type: Type[FieldElement]
+) -> List[FieldElement]:
+    with _open_records(source) as records:
+        return [
+            field_type(_load(records, i)) for i in range(len(records) // RECORD_BYTES)
+        ]
+
+
+@contextmanager
+def _open_records(target: Source, length: Optional[int] = None) -> Iterator[memoryview]:
+    """
+    Map a file path, or view a buffer, as records.
+    If length is given, the records are written: the file is created or resized to
+    hold `length` records, or the buffer must be writable and of that size.
+    """
+    if isinstance(target, (str, os.PathLike)):
+        if length is None:
+            mode = "rb"
+        else:
+            mode = "r+b" if os.path.exists(target) else "w+b"
+        with open(target, mode) as f:
+            if length is not None:
+                f.truncate(length * RECORD_BYTES)
+            access = mmap.ACCESS_READ if length is None else mmap.ACCESS_WRITE
+            with mmap.mmap(f.fileno(), 0, access=access) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+    else:
+        view = memoryview(target).cast("B")
+        if length is not None and view.readonly:
+            raise ValueError("Expect a writable destination, got a read-only buffer")
+        if length is not None and len(view) != length * RECORD_BYTES:
+            raise ValueError(
+                f"Expect a buffer of {length * RECORD_BYTES} bytes, got {len(view)}"
+            )
+        yield view
+
+
+def _load(records: memoryview, position: int) -> int:
+    offset = position * RECORD_BYTES
+    return int.from_bytes(records[offset : offset + RECORD_BYTES], "little")
+
+
+def _store(records: memoryview, position: int, value: int) -> None:
+    offset = position * RECORD_BYTES
+    records[offset : offset + RECORD_BYTES] = value.to_bytes(RECORD_BYTES, "little")
+
+
+def _load_segment(records: memoryview, start: int, length: int) -> List[int]:
+    segment = records[start * RECORD_BYTES : (start + length) * RECORD_BYTES]
+    return [
+        int.from_bytes(segment[i : i + RECORD_BYTES], "little")
+        for i in range(0, len(segment), RECORD_BYTES)
+    ]
+
+
+def _store_segment(records: memoryview, start: int, values: Sequence[int]) -> None:
+    records[start * RECORD_BYTES : (start + len(values)) * RECORD_BYTES] = b"".join(
+        value.to_bytes(RECORD_BYTES, "little") for value in values
+    )
+
+
+def _block_size(block: int, limit: int) -> int:
+    """
+    The largest power of 2 not above block, capped by limit
+    """
+    return min(limit, 1 << (max(block, 1).bit_length() - 1))
+
+
+def _column_pass(source, scratch, n: int, root: int, modulus: int, block: int):
+    n1, n2 = split_dimensions(n)
+    sub_roots = _powers(pow(root, n1, modulus), max(n2 // 2, 1), modulus)
+    width = _block_size(block // n2, n1)
+    for first in range(0, n1, width):
+        columns: List[List[int]] = [[] for _ in range(width)]
+        for j2 in range(n2):
+            row_segment = _load_segment(source, first + n1 * j2, width)
+            for column, value in zip(columns, row_segment):
+                column.append(value % modulus)
+        for offset, column in enumerate(columns):
+            _fft_int(column, sub_roots, modulus)
+            twiddle_step = pow(root, first + offset, modulus)
+            twiddle = 1
+            for k2 in range(n2):
+                column[k2] = column[k2] * twiddle % modulus
+                twiddle = twiddle * twiddle_step % modulus
+        for k2 in range(n2):
+            _store_segment(scratch, first + n1 * k2, [c[k2] for c in columns])
+
+
+def _row_pass(scratch, n: int, root: int, modulus: int):
+    # Rows are contiguous, one row at a time is already the best access pattern
+    n1, n2 = split_dimensions(n)
+    sub_roots = _powers(pow(root, n2, modulus), max(n1 // 2, 1), modulus)
+    for k2 in range(n2):
+        row = _load_segment(scratch, n1 * k2, n1)
+        _store_segment(scratch, n1 * k2, _fft_int(row, sub_roots, modulus))
+
+
+def _transpose_pass(scratch, destination, n: int, modulus: int, scale: int, block):
+    # The scratch position k1 + n1 * k2 holds X[k2 + n2 * k1]
+    n1, n2 = split_dimensions(n)
+    height = _block_size(block // n1, n2)
+    for first in range(0, n2, height):
+        rows = [
+            _load_segment(scratch, n1 * k2, n1) for k2 in range(first, first + height)
+        ]
+        for k1 in range(n1):
+            _store_segment(
+                destination,
+                first + n2 * k1,
+                [row[k1] * scale % modulus for row in rows],
+            )
+
+
+def _four_step_file(
+    source: Source, destination: Destination, root: int, modulus: int, scale: int, block
+) -> None:
+    with _open_records(source) as source_records:
+        n = len(source_records) // RECORD_BYTES
+        if not is_power_of_2(n):
+            raise ValueError("number of records should be a power of 2, got", n)
+        with tempfile.TemporaryFile() as scratch_file, _open_records(
+            destination, n
+        ) as destination_records:
+            scratch_file.truncate(n * RECORD_BYTES)
+            with mmap.mmap(scratch_file.fileno(), 0) as scratch_map:
+                scratch = memoryview(scratch_map)
+                try:
+                    _column_pass(source_records, scratch, n, root, modulus, block)
+                    _row_pass(scratch, n, root, modulus)
+                    _transpose_pass(
+                        scratch, destination_records, n, modulus, scale, block
+                    )
+                finally:
+                    scratch.release()
+
+
+def fft_file(
+    source: Source,
+    destination: Destination,
+    root: FieldElement,
+    block_records: int = DEFAULT_BLOCK_RECORDS,
+) -> None:
+    """
+    Same as fft(coefficients, [1, root, root^2, ...]), but the coefficients are read from,
+    and the evaluations written to, files or buffers of 32 bytes little endian records.
+    """
+    modulus = root.field_modulus
+    _four_step_file(source, destination, int(root), modulus, 1, block_records)
+
+
+def inverse_fft_file(
+    source: Source,
+    destination: Destination,
+    root: FieldElement,
+    block_records: int = DEFAULT_BLOCK_RECORDS,
+) -> None:
+    modulus = root.field_modulus
+    with _open_records(source) as source_records:
+        n = len(source_records) // RECORD_BYTES
+    inverse_root = pow(int(root), modulus - 2, modulus)
+    inverse_n = pow(n, modulus - 2, modulus)
+    _four_step_file(
+        source, destination, inverse_root, modulus, inverse_n, block_records
+    )
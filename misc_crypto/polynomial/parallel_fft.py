@@ -0,0 +1,234 @@
+"""
+Four-step (Bailey) fft over a process pool
+
+View the n = n1 * n2 inputs as a matrix with x[j1 + n1 * j2] at row j2 and column j1.
+Then with k = k2 + n2 * k1
+
+    X[k] = sum_j1 w_n1^(j1 * k1) * w^(j1 * k2) * sum_j2 w_n2^(j2 * k2) * x[j1 + n1 * j2]
+
+1. n1 column ffts of size n2
+2. multiply the entry (j1, k2) by the twiddle w^(j1 * k2)
+3. n2 row ffts of size n1, the output X[k2 + n2 * k1] lands at position k1 + n1 * k2
+
+Steps 1 and 3 are independent ffts, we run them in worker processes.
+The data is shared through a buffer of 32 bytes little endian integers,
+so no python field element is pickled across processes.
+The pool and the buffer are created on first use and kept until exit.
+"""
+import atexit
+from concurrent.futures import Executor, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+import os
+import threading
+from typing import Dict, Sequence, List, Optional
+from misc_crypto.ecc import FieldElement
+from .helpers import is_power_of_2
+
+# Below this size the process pool costs more than it saves. With the pool kept
+# alive, a call costs ~2ms over the int ffts, which beat the field element fft
+# from 2 ** 10 points on BLS12-381 Fr, even on a single worker.
+PARALLEL_FFT_THRESHOLD = 2 ** 11
+
+RECORD_BYTES = 32
+
+
+def should_use_parallel(
+    domain: Sequence[FieldElement], parallel: Optional[bool]
+) -> bool:
+    if parallel is None:
+        return len(domain) >= PARALLEL_FFT_THRESHOLD and (os.cpu_count() or 1) > 1
+    return parallel
+
+
+def _bit_reverse(values: List[int]) -> None:
+    n = len(values)
+    j = 0
+    for i in range(1, n):
+        bit = n >> 1
+        while j & bit:
+            j ^= bit
+            bit >>= 1
+        j |= bit
+        if i < j:
+            values[i], values[j] = values[j], values[i]
+
+
+def _fft_int(values: List[int], roots: Sequence[int], modulus: int) -> List[int]:
+    """
+    In-place iterative radix-2 fft over python ints
+    roots[i] = w^i for i < len(values) // 2, where w is a primitive len(values)-th root
+    """
+    n = len(values)
+    _bit_reverse(values)
+    half = 1
+    while half < n:
+        stride = n // (2 * half)
+        for start in range(0, n, 2 * half):
+            for k in range(half):
+                u = values[start + k]
+                v = values[start + k + half] * roots[k * stride] % modulus
+                values[start + k] = (u + v) % modulus
+                values[start + k + half] = (u - v) % modulus
+        half *= 2
+    return values
+
+
+def _powers(base: int, length: int, modulus: int) -> List[int]:
+    powers = [1]
+    for _ in range(length - 1):
+        powers.append(powers[-1] * base % modulus)
+    return powers
+
+
+def _read(buffer, position: int) -> int:
+    offset = position * RECORD_BYTES
+    return int.from_bytes(buffer[offset : offset + RECORD_BYTES], "little")
+
+
+def _write(buffer, position: int, value: int) -> None:
+    offset = position * RECORD_BYTES
+    buffer[offset : offset + RECORD_BYTES] = value.to_bytes(RECORD_BYTES, "little")
+
+
+def split_dimensions(n: int):
+    n1 = 1 << ((n.bit_length() - 1) // 2)
+    return n1, n // n1
+
+
+def column_ffts(buffer, n: int, root: int, modulus: int, start: int, stop: int) -> None:
+    """
+    Step 1 and 2 for the columns j1 in [start, stop)
+    """
+    n1, n2 = split_dimensions(n)
+    sub_roots = _powers(pow(root, n1, modulus), max(n2 // 2, 1), modulus)
+    for j1 in range(start, stop):
+        column = [_read(buffer, j1 + n1 * j2) for j2 in range(n2)]
+        _fft_int(column, sub_roots, modulus)
+        twiddle_step = pow(root, j1, modulus)
+        twiddle = 1
+        for k2, value in enumerate(column):
+            _write(buffer, j1 + n1 * k2, value * twiddle % modulus)
+            twiddle = twiddle * twiddle_step % modulus
+
+
+def row_ffts(buffer, n: int, root: int, modulus: int, start: int, stop: int) -> None:
+    """
+    Step 3 for the rows k2 in [start, stop)
+    """
+    n1, n2 = split_dimensions(n)
+    sub_roots = _powers(pow(root, n2, modulus), max(n1 // 2, 1), modulus)
+    for k2 in range(start, stop):
+        row = [_read(buffer, j1 + n1 * k2) for j1 in range(n1)]
+        _fft_int(row, sub_roots, modulus)
+        for k1, value in enumerate(row):
+            _write(buffer, k1 + n1 * k2, value)
+
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_shared: Optional[shared_memory.SharedMemory] = None
+_shared_lock = threading.Lock()
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    pool = _pools.get(workers)
+    if pool is None:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        _pools[workers] = pool
+    return pool
+
+
+def _shared_buffer(size: int) -> shared_memory.SharedMemory:
+    """
+    The shared buffer of the previous call, replaced if it is too small
+    """
+    global _shared
+    if _shared is None or _shared.size < size:
+        _release_shared()
+        _shared = shared_memory.SharedMemory(create=True, size=size)
+    return _shared
+
+
+def _release_shared() -> None:
+    global _shared
+    if _shared is not None:
+        _shared.close()
+        _shared.unlink()
+        _shared = None
+
+
+@atexit.register
+def _shutdown() -> None:
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
+    _release_shared()
+
+
+# The buffer attached in a worker process, kept across tasks
+_attached: Optional[shared_memory.SharedMemory] = None
+
+
+def _shared_task(step, shm_name: str, *args) -> None:
+    global _attached
+    if _attached is None or _attached.name != shm_name:
+        if _attached is not None:
+            _attached.close()
+        _attached = shared_memory.SharedMemory(name=shm_name)
+    step(_attached.buf, *args)
+
+
+def _chunks(length: int, number_of_chunks: int):
+    size = max(1, -(-length // number_of_chunks))
+    return [(start, min(start + size, length)) for start in range(0, length, size)]
+
+
+def four_step_fft(
+    coefficients: Sequence[FieldElement],
+    domain: Sequence[FieldElement],
+    workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> List[FieldElement]:
+    """
+    Same output as fft, with the column and row ffts spread over `workers` processes
+    executor: a process pool to run on, by default a pool of `workers` kept until exit
+    """
+    n = len(domain)
+    if not is_power_of_2(n):
+        raise ValueError("length of domain should be a power of 2, got", n)
+    field_type = type(domain[0])
+    modulus = field_type.field_modulus
+    if modulus.bit_length() > 8 * RECORD_BYTES:
+        raise ValueError(f"Field elements should fit in {RECORD_BYTES} bytes")
+    root = int(domain[1]) if n > 1 else 1
+    workers = workers or os.cpu_count() or 1
+    pool = executor or _pool(workers)
+    n1, n2 = split_dimensions(n)
+
+    with _shared_lock:
+        shm = _shared_buffer(n * RECORD_BYTES)
+        buffer = shm.buf
+        try:
+            for position, coefficient in enumerate(coefficients):
+                _write(buffer, position, int(coefficient) % modulus)
+            for position in range(len(coefficients), n):
+                _write(buffer, position, 0)
+
+            for step, length in ((column_ffts, n1), (row_ffts, n2)):
+                futures = [
+                    pool.submit(
+                        _shared_task, step, shm.name, n, root, modulus, start, stop
+                    )
+                    for start, stop in _chunks(length, workers * 4)
+                ]
+                wait(futures)
+                for future in futures:
+                    future.result()
+
+            # Position k1 + n1 * k2 holds X[k2 + n2 * k1]
+            evaluations: List[FieldElement] = [field_type(0)] * n
+            for k2 in range(n2):
+                for k1 in range(n1):
+                    evaluations[k2 + n2 * k1] = field_type(_read(buffer, k1 + n1 * k2))
+        finally:
+            del buffer
+    return evaluations
@@ -0,0 +1,168 @@
+"""
+Precomputation for point sets we open at over and over
+
+The subproduct tree, the barycentric weights, and the commitment of the zero polynomial
+only depend on the points, so they are kept in an LRU cache keyed on a digest of the
+point set, bounded by an estimate of the memory they hold.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import hashlib
+import sys
+import weakref
+from typing import Sequence, List, Dict, Tuple, Any, Callable
+from misc_crypto.ecc import FieldElement
+from .operations import add_assign, barycentric_weights, schoolbook_multiply
+
+DEFAULT_CACHE_BYTES = 64 * 2 ** 20
+
+# Rough size of a python field element with its overheads
+FIELD_ELEMENT_BYTES = 100
+
+
+def deep_size(obj: Any) -> int:
+    """
+    The bytes of a curve point, with its coordinates and their integers
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (tuple, list)):
+        return size + sum(deep_size(item) for item in obj)
+    for attribute in ("py_ecc_object", "coeffs", "n"):
+        if hasattr(obj, attribute):
+            return size + deep_size(getattr(obj, attribute))
+    return size
+
+
+def subproduct_tree(zs: Sequence[FieldElement]) -> List[List[List[FieldElement]]]:
+    """
+    tree[0] are the linear factors (x - z_i), each level multiplies adjacent pairs
+    of the level below, and tree[-1][0] is the zero polynomial of zs
+    """
+    one = zs[0].one()
+    level = [[-z, one] for z in zs]
+    tree = [level]
+    while len(level) > 1:
+        level = [
+            schoolbook_multiply(level[i], level[i + 1])
+            if i + 1 < len(level)
+            else level[i]
+            for i in range(0, len(level), 2)
+        ]
+        tree.append(level)
+    return tree
+
+
+def point_set_digest(zs: Sequence[FieldElement]) -> bytes:
+    m = hashlib.sha256()
+    m.update(type(zs[0]).__name__.encode())
+    m.update(zs[0].field_modulus.to_bytes(64, "big"))
+    for z in zs:
+        m.update(int(z).to_bytes(64, "big"))
+    return m.digest()
+
+
+@dataclass
+class PointSet:
+    zs: Sequence[FieldElement]
+    tree: List[List[List[FieldElement]]]
+    weights: List[FieldElement]
+    # id(srs) -> (weak reference to the srs, zero polynomial on G2, its bytes).
+    # The cache doesn't keep an srs alive, and an entry goes with its srs.
+    zs_on_G2: Dict[int, Tuple[weakref.ref, Any, int]] = field(default_factory=dict)
+
+    @classmethod
+    def from_points(cls, zs: Sequence[FieldElement]) -> "PointSet":
+        return cls(
+            zs=list(zs), tree=subproduct_tree(zs), weights=barycentric_weights(zs)
+        )
+
+    @property
+    def zero_polynomial(self) -> List[FieldElement]:
+        return self.tree[-1][0]
+
+    def interpolate(self, ys: Sequence[FieldElement]) -> List[FieldElement]:
+        """
+        Same as lagrange(zs, ys), going up the subproduct tree:
+        I(x) = sum(y_i * w_i * Z(x) / (x - z_i))
+        """
+        if len(ys) != len(self.zs):
+            raise ValueError("expect same length")
+        polynomials = [[y * w] for y, w in zip(ys, self.weights)]
+        for level in self.tree[:-1]:
+            combined = []
+            for i in range(0, len(polynomials), 2):
+                if i + 1 == len(polynomials):
+                    combined.append(polynomials[i])
+                    continue
+                left = schoolbook_multiply(polynomials[i], level[i + 1])
+                combined.append(
+                    add_assign(left, schoolbook_multiply(polynomials[i + 1], level[i]))
+                )
+            polynomials = combined
+        return polynomials[0]
+
+    def _prune(self) -> None:
+        for key in [k for k, entry in self.zs_on_G2.items() if entry[0]() is None]:
+            del self.zs_on_G2[key]
+
+    def zero_polynomial_on_G2(self, srs: Any, compute: Callable[[], Any]) -> Any:
+        """
+        The cached zero polynomial on G2 for this srs, from compute() on a miss
+        """
+        self._prune()
+        entry = self.zs_on_G2.get(id(srs))
+        if entry is not None and entry[0]() is srs:
+            return entry[1]
+        point = compute()
+        self.zs_on_G2[id(srs)] = (weakref.ref(srs), point, deep_size(point))
+        return point
+
+    def estimated_bytes(self) -> int:
+        self._prune()
+        elements = len(self.zs) + len(self.weights)
+        elements += sum(len(p) for level in self.tree for p in level)
+        points = sum(entry[2] for entry in self.zs_on_G2.values())
+        return elements * FIELD_ELEMENT_BYTES + points
+
+
+class PointSetCache:
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[bytes, PointSet]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, zs: Sequence[FieldElement]) -> PointSet:
+        key = point_set_digest(zs)
+        point_set = self._entries.get(key)
+        if point_set is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return point_set
+        self.misses += 1
+        point_set = PointSet.from_points(zs)
+        self._entries[key] = point_set
+        self.evict()
+        return point_set
+
+    def estimated_bytes(self) -> int:
+        return sum(p.estimated_bytes() for p in self._entries.values())
+
+    def evict(self) -> None:
+        """
+        Drop the least recently used point sets until we are within budget,
+        the most recent one always stays
+        """
+        total = self.estimated_bytes()
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            total -= evicted.estimated_bytes()
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+point_set_cache = PointSetCache()
@@ -0,0 +1,169 @@
+"""
+Sparse polynomials, stored as (exponent, coefficient) terms sorted by exponent
+
+Vanishing polynomials X^n - c, selectors and other mostly zero polynomials have a few
+terms, so the arithmetic with a dense polynomial costs O(terms * n) instead of O(n^2).
+"""
+from typing import Sequence, List, Tuple, Iterable, Dict
+from misc_crypto.ecc import FieldElement
+from .operations import axpy, add_assign, trim
+
+Term = Tuple[int, FieldElement]
+
+
+def _is_scalar(value) -> bool:
+    return isinstance(value, int) or hasattr(value, "field_modulus")
+
+
+class SparsePolynomial:
+    terms: Tuple[Term, ...]
+
+    def __init__(self, terms: Iterable[Term]) -> None:
+        combined: Dict[int, FieldElement] = {}
+        for exponent, coefficient in terms:
+            if exponent < 0:
+                raise ValueError("Exponents should be non-negative, got", exponent)
+            if exponent in combined:
+                combined[exponent] += coefficient
+            else:
+                combined[exponent] = coefficient
+        self.terms = tuple(
+            (exponent, combined[exponent])
+            for exponent in sorted(combined)
+            if combined[exponent] != 0
+        )
+
+    @classmethod
+    def from_dense(cls, coefficients: Sequence[FieldElement]) -> "SparsePolynomial":
+        return cls(enumerate(coefficients))
+
+    @classmethod
+    def vanishing(cls, n: int, offset: FieldElement) -> "SparsePolynomial":
+        """
+        X^n - offset^n, it vanishes on the coset offset * <w>, with w of order n.
+        The offset sets the field, offset.one() for the subgroup <w> itself
+        """
+        return cls([(0, -(offset ** n)), (n, offset.one())])
+
+    def __repr__(self):
+        terms = " + ".join(f"{c}x^{e}" for e, c in self.terms)
+        return f"SparsePolynomial<{terms}>"
+
+    @property
+    def degree(self) -> int:
+        """
+        The highest exponent, -1 for the zero polynomial
+        """
+        return self.terms[-1][0] if self.terms else -1
+
+    @property
+    def is_zero(self) -> bool:
+        return len(self.terms) == 0
+
+    def to_dense(self) -> List[FieldElement]:
+        if self.is_zero:
+            return []
+        zero = self.terms[0][1] * 0
+        coefficients = [zero] * (self.degree + 1)
+        for exponent, coefficient in self.terms:
+            coefficients[exponent] = coefficient
+        return coefficients
+
+    def evaluate(self, x: FieldElement) -> FieldElement:
+        result = x * 0
+        for exponent, coefficient in self.terms:
+            result += coefficient * x ** exponent
+        return result
+
+    def multiply_dense(self, dense: Sequence[FieldElement]) -> List[FieldElement]:
+        """
+        The coefficients of self * dense, in O(len(self.terms) * len(dense))
+        """
+        if self.is_zero or len(dense) == 0:
+            return []
+        result = [dense[0] * 0] * (len(dense) + self.degree)
+        for exponent, coefficient in self.terms:
+            axpy(result, coefficient, dense, exponent)
+        return result
+
+    def divide_dense(
+        self, dividend: Sequence[FieldElement]
+    ) -> Tuple[List[FieldElement], List[FieldElement]]:
+        """
+        Quotient and remainder of dividend / self, in O(len(self.terms) * len(dividend))
+        """
+        if self.is_zero:
+            raise ZeroDivisionError
+        if len(dividend) == 0:
+            return [], []
+        degree, leading = self.terms[-1]
+        if not hasattr(leading, "field_modulus"):
+            raise TypeError("Expect field element coefficients to divide, got", leading)
+        inverse_leading = leading.one() / leading
+        lower_terms = self.terms[:-1]
+        remainder = list(dividend)
+        zero = remainder[0] * 0
+        quotient = [zero] * max(len(remainder) - degree, 1)
+        if len(remainder) <= degree:
+            return quotient, trim(remainder)
+        for i in reversed(range(len(quotient))):
+            m = remainder.pop() * inverse_leading
+            quotient[i] = m
+            for exponent, coefficient in lower_terms:
+                remainder[i + exponent] -= m * coefficient
+        return trim(quotient), trim(remainder or [zero])
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SparsePolynomial):
+            return self.terms == other.terms
+        return NotImplemented
+
+    def __neg__(self) -> "SparsePolynomial":
+        return SparsePolynomial((e, -c) for e, c in self.terms)
+
+    def __add__(self, other):
+        if isinstance(other, SparsePolynomial):
+            return SparsePolynomial(self.terms + other.terms)
+        elif isinstance(other, list):
+            return add_assign(self.to_dense(), other)
+        elif _is_scalar(other):
+            return SparsePolynomial(self.terms + ((0, other),))
+        return NotImplemented
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        if isinstance(other, list):
+            return self.__add__([-o for o in other])
+        elif isinstance(other, SparsePolynomial) or _is_scalar(other):
+            return self.__add__(-other)
+        return NotImplemented
+
+    def __rsub__(self, other):
+        return (-self).__add__(other)
+
+    def __mul__(self, other):
+        if isinstance(other, SparsePolynomial):
+            return SparsePolynomial(
+                (e1 + e2, c1 * c2) for e1, c1 in self.terms for e2, c2 in other.terms
+            )
+        elif isinstance(other, list):
+            return self.multiply_dense(other)
+        elif _is_scalar(other):
+            return SparsePolynomial((e, c * other) for e, c in self.terms)
+        return NotImplemented
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __rtruediv__(self, other):
+        """
+        Exact division of a dense list by self
+        """
+        if not isinstance(other, list):
+            return NotImplemented
+        quotient, remainder = self.divide_dense(other)
+        if any(r != 0 for r in remainder):
+            raise ValueError("Remainder is not zero:", remainder)
+        return quotient
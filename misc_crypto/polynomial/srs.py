@@ -0,0 +1,201 @@
+"""
+Fast and reproducible KZG setups
+
+The powers s^i are computed incrementally as integers, then each power is multiplied
+with a fixed-base table of the generator, which needs additions only. Large setups
+spread the multiplications over a process pool, every worker builds its own table.
+The window fits the number of scalars of a chunk and a memory budget, and the tables
+are dropped with their chunk.
+
+With a seed, the secret is derived from it, so the same seed gives the same SRS.
+Seeded setups are cached on disk keyed by (backend, lengths, seed), tests and
+benchmarks then load them instead of running the setup again.
+Only a seeded setup is cached, a random one is thrown away with its secret.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import os
+from pathlib import Path
+import secrets
+import tempfile
+from typing import Sequence, List, Union, Optional, cast
+from misc_crypto.ecc import (
+    Backend,
+    CurvePoint,
+    FieldElement,
+    FixedBaseTable,
+    G1,
+    G2,
+    fixed_base_window,
+)
+from .commitments import SRS, serialize_srs, deserialize_srs
+
+Seed = Union[bytes, str, int]
+
+# Below this many G1 powers, the process pool costs more than it saves
+PARALLEL_SETUP_THRESHOLD = 2 ** 9
+
+CACHE_DIRECTORY_VARIABLE = "MISC_CRYPTO_SRS_CACHE"
+DEFAULT_CACHE_DIRECTORY = Path.home() / ".cache" / "misc_crypto" / "srs"
+
+
+def _seed_bytes(seed: Seed) -> bytes:
+    if isinstance(seed, str):
+        return seed.encode()
+    elif isinstance(seed, int):
+        return seed.to_bytes((seed.bit_length() + 8) // 8, "big", signed=True)
+    return bytes(seed)
+
+
+def seeded_secret(backend: Backend, seed: Seed) -> FieldElement:
+    """
+    A nonzero secret derived from the seed. Anyone knowing the seed knows the secret,
+    so this is for tests and benchmarks only.
+    """
+    m = hashlib.sha256()
+    m.update(b"misc_crypto srs")
+    m.update(backend.__name__.encode())
+    m.update(_seed_bytes(seed))
+    return backend.Fr(int.from_bytes(m.digest(), "big") % (backend.curve_order - 1) + 1)
+
+
+def powers_of_secret(s: FieldElement, length: int) -> List[int]:
+    """
+    [s^1, s^2, ..., s^length] as ints, one modular multiplication per power
+    """
+    modulus = s.field_modulus
+    s_int = int(s)
+    powers = []
+    power = 1
+    for _ in range(length):
+        power = power * s_int % modulus
+        powers.append(power)
+    return powers
+
+
+def _generator(backend: Backend, group: str) -> CurvePoint:
+    return backend.get_G1() if group == "G1" else backend.get_G2()
+
+
+def _multiply_chunk(
+    backend: Backend, group: str, window: int, scalars: Sequence[int]
+) -> List[CurvePoint]:
+    bits = backend.curve_order.bit_length()
+    table = FixedBaseTable(_generator(backend, group), bits, window)
+    return [table.multiply(scalar) for scalar in scalars]
+
+
+def _chunks(values: Sequence[int], number_of_chunks: int) -> List[Sequence[int]]:
+    size = -(-len(values) // number_of_chunks)
+    return [values[i : i + size] for i in range(0, len(values), size)]
+
+
+def multiply_generator(
+    backend: Backend,
+    group: str,
+    scalars: Sequence[int],
+    processes: Optional[int] = None,
+) -> List[CurvePoint]:
+    """
+    [scalar * generator] of G1 or G2. processes=None uses every cpu above
+    PARALLEL_SETUP_THRESHOLD scalars, processes=1 stays in this process.
+    """
+    if len(scalars) == 0:
+        return []
+    if processes is None:
+        processes = (
+            os.cpu_count() or 1 if len(scalars) >= PARALLEL_SETUP_THRESHOLD else 1
+        )
+    processes = min(processes, len(scalars))
+    window = fixed_base_window(
+        -(-len(scalars) // processes), backend.curve_order.bit_length()
+    )
+    if processes == 1:
+        return _multiply_chunk(backend, group, window, scalars)
+    results: List[CurvePoint] = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(_multiply_chunk, backend, group, window, chunk)
+            for chunk in _chunks(scalars, processes)
+        ]
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+
+def _cache_path(
+    cache_directory: Path, backend: Backend, g1_length: int, g2_length: int, seed: Seed
+) -> Path:
+    seed_digest = hashlib.sha256(_seed_bytes(seed)).hexdigest()[:16]
+    return (
+        cache_directory
+        / f"{backend.__name__}-{g1_length}-{g2_length}-{seed_digest}.srs"
+    )
+
+
+def _write_atomically(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def setup(
+    backend: Backend,
+    g1_length: int,
+    g2_length: int = 2,
+    seed: Optional[Seed] = None,
+    processes: Optional[int] = None,
+    cache_directory: Optional[Union[str, os.PathLike]] = None,
+) -> SRS:
+    """
+    An SRS with g1_length powers of G1 and g2_length powers of G2, both counting the
+    generator, like untrusted_setup(backend, length) with both lengths equal.
+    Verifiers only need [s]G2, or one more power per point opened at once.
+
+    A seeded SRS is read from and written to cache_directory, which defaults to
+    $MISC_CRYPTO_SRS_CACHE or ~/.cache/misc_crypto/srs.
+    """
+    if g1_length < 1 or g2_length < 1:
+        raise ValueError("Expect at least the generators")
+    if seed is None:
+        s = backend.Fr(secrets.randbelow(backend.curve_order - 1) + 1)
+        return _setup_from_secret(backend, s, g1_length, g2_length, processes)
+
+    s = seeded_secret(backend, seed)
+    directory = Path(
+        cache_directory
+        or os.environ.get(CACHE_DIRECTORY_VARIABLE)
+        or DEFAULT_CACHE_DIRECTORY
+    )
+    path = _cache_path(directory, backend, g1_length, g2_length, seed)
+    if path.exists():
+        srs = deserialize_srs(backend, path.read_bytes())
+        srs.toxic = s
+        return srs
+    srs = _setup_from_secret(backend, s, g1_length, g2_length, processes)
+    _write_atomically(path, serialize_srs(srs))
+    return srs
+
+
+def _setup_from_secret(
+    backend: Backend,
+    s: FieldElement,
+    g1_length: int,
+    g2_length: int,
+    processes: Optional[int],
+) -> SRS:
+    powers = powers_of_secret(s, max(g1_length, g2_length) - 1)
+    # multiply_generator returns points of the group it is asked for
+    G1s = cast(
+        List[G1], multiply_generator(backend, "G1", powers[: g1_length - 1], processes)
+    )
+    G2s = cast(
+        List[G2], multiply_generator(backend, "G2", powers[: g2_length - 1], processes)
+    )
+    return SRS(toxic=s, G1=backend.get_G1(), G2=backend.get_G2(), G1s=G1s, G2s=G2s)
@@ -0,0 +1,143 @@
+"""
+Vector commitments with the entries placed on the roots of unity
+
+The vector v is the evaluations of p with p(w^i) = v_i, so interpolation is an
+inverse fft, the commitment is sum(v_i * [L_i(s)]) with the Lagrange SRS, and an
+update of k entries costs an MSM of size k. The opening of index i is the KZG proof
+of p at w^i. The proofs are kept in a bounded LRU cache, and an update clears it,
+since every proof depends on every entry.
+"""
+from collections import OrderedDict
+from typing import Sequence, List, Tuple, Mapping, Optional
+from misc_crypto.ecc import Backend, G1, FieldElement, roots_of_unity
+from .commitments import (
+    SRS,
+    lagrange_srs,
+    commit_evaluations,
+    update_commitment,
+    prove_single,
+    verify_single,
+    prove_multiple,
+    verify_multiple,
+    prove_all,
+)
+from .fft import inverse_fft
+from .helpers import next_power_of_2
+
+DEFAULT_PROOF_CACHE_SIZE = 1024
+
+
+class VectorCommitment:
+    def __init__(
+        self,
+        backend: Backend,
+        srs: SRS,
+        vector: Sequence[FieldElement],
+        proof_cache_size: int = DEFAULT_PROOF_CACHE_SIZE,
+    ) -> None:
+        """
+        The vector is padded with zeros to a power of 2 length
+        """
+        if len(vector) == 0:
+            raise ValueError("Expect a non empty vector")
+        n = next_power_of_2(len(vector))
+        self.backend = backend
+        self.srs = srs
+        self.domain = roots_of_unity(backend, n)
+        self.values = [backend.Fr(int(v)) for v in vector]
+        self.values += [backend.Fr(0)] * (n - len(vector))
+        self.basis = lagrange_srs(backend, srs, n)
+        self.commitment = commit_evaluations(self.values, self.basis)
+        self.proof_cache_size = proof_cache_size
+        self._coefficients: Optional[List[FieldElement]] = None
+        self._proofs: "OrderedDict[int, G1]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def coefficients(self) -> List[FieldElement]:
+        if self._coefficients is None:
+            self._coefficients = inverse_fft(self.values, self.domain)
+        return self._coefficients
+
+    def update(self, changes: Mapping[int, FieldElement]) -> G1:
+        """
+        Set the entries at the indices to the new values, returns the new commitment
+        """
+        deltas = {}
+        for index, value in changes.items():
+            if not 0 <= index < len(self.values):
+                raise IndexError(f"Index {index} out of range")
+            value = self.backend.Fr(int(value))
+            deltas[index] = value - self.values[index]
+            self.values[index] = value
+        self.commitment = update_commitment(
+            self.commitment, self.srs, deltas, self.basis
+        )
+        self._coefficients = None
+        self._proofs.clear()
+        return self.commitment
+
+    def _cache_proof(self, index: int, proof: G1) -> None:
+        self._proofs[index] = proof
+        self._proofs.move_to_end(index)
+        while len(self._proofs) > self.proof_cache_size:
+            self._proofs.popitem(last=False)
+
+    def open(self, index: int) -> Tuple[FieldElement, G1]:
+        proof = self._proofs.get(index)
+        if proof is not None:
+            self.hits += 1
+            self._proofs.move_to_end(index)
+            return self.values[index], proof
+        self.misses += 1
+        y, proof = prove_single(self.srs, self.coefficients, self.domain[index])
+        self._cache_proof(index, proof)
+        return y, proof
+
+    def open_all(self) -> List[G1]:
+        """
+        The proofs of every index in O(n log n) with FK20, they fill the cache
+        """
+        _, proofs = prove_all(self.backend, self.srs, self.coefficients, self.domain)
+        for index in range(len(proofs))[-self.proof_cache_size :]:
+            self._cache_proof(index, proofs[index])
+        return proofs
+
+    def open_multiple(self, indices: Sequence[int]) -> Tuple[List[FieldElement], G1]:
+        """
+        One proof for the entries at all the indices
+        """
+        zs = [self.domain[i] for i in indices]
+        _, proof = prove_multiple(self.srs, self.coefficients, zs)
+        return [self.values[i] for i in indices], proof
+
+
+def verify_index(
+    backend: Backend,
+    srs: SRS,
+    commitment: G1,
+    length: int,
+    index: int,
+    y: FieldElement,
+    proof: G1,
+) -> bool:
+    z = roots_of_unity(backend, length)[index]
+    return verify_single(backend, srs, commitment, z, y, proof)
+
+
+def verify_indices(
+    backend: Backend,
+    srs: SRS,
+    commitment: G1,
+    length: int,
+    indices: Sequence[int],
+    ys: Sequence[FieldElement],
+    proof: G1,
+) -> bool:
+    domain = roots_of_unity(backend, length)
+    zs = [domain[i] for i in indices]
+    return verify_multiple(backend, srs, commitment, zs, ys, proof)
@@ -21,9 +21,12 @@ OPCODES = {
     "eq": 0x14,
     "iszero": 0x15,
     "and": 0x16,
+    "and_": 0x16,  # avoid python reserved word
     "or": 0x17,
+    "or_": 0x17,  # avoid python reserved word
     "shor": 0x18,
     "not": 0x19,
+    "not_": 0x19,  # avoid python reserved word
     "byte": 0x1A,
     "shl": 0x1B,
     "shr": 0x1C,
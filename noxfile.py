@@ -42,6 +42,12 @@ def tests(session):
     session.run("pytest", *args)
 
 
+@nox.session(python=python_version)
+def benchmark(session):
+    session.run("poetry", "install", external=True)
+    session.run("python", "-m", "misc_crypto.polynomial.benchmark", *session.posargs)
+
+
 def install_with_constraints(session, *args, **kwargs):
     with tempfile.NamedTemporaryFile() as requirements:
         session.run(
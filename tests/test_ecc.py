@@ -1,5 +1,13 @@
 import pytest
-from misc_crypto.ecc import BLS12381Backend, BN254Backend, pairing_check
+from misc_crypto.ecc import (
+    BLS12381Backend,
+    BN254Backend,
+    pairing_check,
+    multi_scalar_multiplication,
+    FixedBaseTable,
+    fixed_base_window,
+    fixed_base_table_points,
+)
 
 
 @pytest.mark.parametrize("backend", (BLS12381Backend, BN254Backend))
@@ -113,3 +121,49 @@ def test_pairing_composit_check(backend):
     assert pairing_check(
         backend, G1.multiply(37), G2.multiply(27), G1.multiply(999), G2.neg()
     )
+
+
+@pytest.mark.parametrize("backend", (BLS12381Backend, BN254Backend))
+@pytest.mark.parametrize("length", (1, 16))
+def test_multi_scalar_multiplication(backend, length):
+    G1 = backend.get_G1()
+    points = [G1.multiply(i + 1) for i in range(length)]
+    scalars = [backend.Fr(3 ** (i * 40) + i) for i in range(length)]
+    expected = backend.Z1()
+    for point, scalar in zip(points, scalars):
+        expected = expected.add(point.multiply(scalar))
+    assert multi_scalar_multiplication(points, scalars).eq(expected)
+    assert multi_scalar_multiplication(points, [0] * length).is_inf()
+
+
+@pytest.mark.parametrize("backend", (BLS12381Backend, BN254Backend))
+def test_point_to_bytes(backend):
+    G1 = backend.get_G1()
+    G2 = backend.get_G2()
+    assert G1.double().to_bytes() == G1.add(G1).to_bytes()
+    assert G1.to_bytes() != G1.neg().to_bytes()
+    assert len(G2.to_bytes()) == 2 * len(G1.to_bytes())
+    assert backend.Z1().to_bytes() == bytes(len(G1.to_bytes()))
+    for point in (G1.multiply(7), G2.multiply(9), backend.Z1()):
+        assert type(point).from_bytes(point.to_bytes()).eq(point)
+    with pytest.raises(ValueError):
+        type(G1).from_bytes(G1.to_bytes()[:-1] + b"\x00")
+
+
+@pytest.mark.parametrize("window", (1, 3, 5))
+def test_fixed_base_table(window):
+    backend = BN254Backend
+    G2 = backend.get_G2()
+    table = FixedBaseTable(G2, backend.curve_order.bit_length(), window)
+    for scalar in (0, 1, 2 ** 64 + 1, backend.curve_order - 1):
+        assert table.multiply(scalar).eq(G2.multiply(scalar))
+    with pytest.raises(ValueError):
+        table.multiply(2 ** 256)
+
+
+def test_fixed_base_window():
+    bits = BN254Backend.curve_order.bit_length()
+    assert fixed_base_window(1, bits) <= 2
+    window = fixed_base_window(2 ** 20, bits)
+    assert fixed_base_table_points(bits, window) <= 2 ** 14
+    assert fixed_base_window(2 ** 20, bits, max_points=2 ** 20) > window
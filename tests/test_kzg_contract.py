@@ -0,0 +1,78 @@
+import pytest
+from misc_crypto.ecc import BN254Backend
+from misc_crypto.polynomial.commitments import untrusted_setup, commit, prove_single
+from misc_crypto.polynomial.contract import (
+    create_code,
+    encode_opening,
+    encode_batch,
+    ABI,
+)
+from web3 import Web3, EthereumTesterProvider
+from eth_utils import decode_hex
+
+backend = BN254Backend
+
+
+def get_deployed(abi, bytecode):
+    w3 = Web3(EthereumTesterProvider())
+    contract = w3.eth.contract(abi=abi, bytecode=bytecode)
+    tx_hash = contract.constructor().transact()
+    tx_receipt = w3.eth.waitForTransactionReceipt(tx_hash)
+    instance = w3.eth.contract(address=tx_receipt.contractAddress, abi=abi)
+    return instance
+
+
+@pytest.fixture(scope="module")
+def srs():
+    return untrusted_setup(backend, 4)
+
+
+@pytest.fixture(scope="module")
+def verifier(srs):
+    return get_deployed(abi=ABI, bytecode=decode_hex(create_code(srs)))
+
+
+def make_openings(srs, number):
+    openings = []
+    for i in range(number):
+        p = [backend.Fr(c + i) for c in [1, 2, 3, 4]]
+        z = backend.Fr(10 + i)
+        y, proof = prove_single(srs, p, z)
+        openings.append((commit(srs, p), z, y, proof))
+    return openings
+
+
+def test_verify(srs, verifier):
+    for opening in make_openings(srs, 2):
+        words = encode_opening(*opening)
+        assert verifier.functions.verify(*words).call()
+        words[3] += 1
+        assert not verifier.functions.verify(*words).call()
+
+
+def test_verify_batch(srs, verifier):
+    words = encode_batch(make_openings(srs, 3))
+    assert verifier.functions.verifyBatch(words).call()
+    words[9] += 1
+    assert not verifier.functions.verifyBatch(words).call()
+    assert not verifier.functions.verifyBatch([]).call()
+    assert not verifier.functions.verifyBatch(words[:5]).call()
+
+
+def test_gas_benchmark(srs, verifier):
+    """
+    pytest -s tests/test_kzg_contract.py -k gas
+    """
+    single = verifier.functions.verify(
+        *encode_opening(*make_openings(srs, 1)[0])
+    ).estimateGas()
+    print(f"\nverify: {single} gas")
+    for number in (1, 2, 4, 8):
+        words = encode_batch(make_openings(srs, number))
+        batch = verifier.functions.verifyBatch(words).estimateGas()
+        print(
+            f"verifyBatch of {number}: {batch} gas, {batch // number} per opening,"
+            f" {number * single} with verify"
+        )
+        if number > 1:
+            assert batch < number * single
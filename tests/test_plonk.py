@@ -2,6 +2,8 @@ from misc_crypto.plonk.polynomial import (
     Polynomial,
     lagrange,
     EvaluationDomain,
+    EvaluationForm,
+    evaluate_many,
     permutation_polynomial_evalutations,
 )
 
@@ -12,12 +14,22 @@ from misc_crypto.plonk.commitment import (
     commit,
     create_witness_same_z,
     verify_evaluation_same_z,
+    lagrange_srs,
+    commit_evaluations,
+    serialize_srs,
+    deserialize_srs,
+    write_mapped_srs,
+    open_mapped_srs,
+    commit_many,
 )
 from misc_crypto.plonk.constraint import circuit
 
-from misc_crypto.plonk.prover import prove
-from misc_crypto.plonk.helpers import pre_proving_check
+from misc_crypto.plonk.prover import prove, create_proof
+from misc_crypto.plonk.verifier import verification_key, verify, verify_batch
+from misc_crypto.plonk.helpers import pre_proving_check, vanishing_polynomial
+from py_ecc.optimized_bn128 import eq, Z1
 import pytest
+from dataclasses import replace
 
 
 class F13(FQ):
@@ -51,6 +63,12 @@ def test_polynomial_multiplication():
     assert Polynomial(1, 1) * Polynomial(1, 1) == Polynomial(1, 2, 1)
 
 
+def test_evaluate_many():
+    ps = [Polynomial(1, 1, 1), Polynomial(-2, 7, -5, 1), Polynomial()]
+    points = [Fr(0), Fr(2), Fr(3)]
+    assert evaluate_many(ps, points) == [[p.evaluate(x) for x in points] for p in ps]
+
+
 def test_lagrange():
     assert lagrange([0, 1, 2], [0, 1, 8]) == Polynomial(0, -2, 3)
     assert lagrange([Fr(0), Fr(1), Fr(2)], [Fr(0), Fr(1), Fr(8)]) == Polynomial(
@@ -80,6 +98,22 @@ def test_division():
     ) == Polynomial(10, 10, 10, 10)
 
 
+def test_vanishing_polynomial():
+    n = 4
+    vanishing = vanishing_polynomial(n)
+    assert Polynomial(*vanishing.to_dense()) == Polynomial(*map(Fr, [-1, 0, 0, 0, 1]))
+    domain = EvaluationDomain.from_roots_of_unity(n)
+    assert all(vanishing.evaluate(x) == 0 for x in domain.domain)
+
+    p = Polynomial(Fr(3), Fr(1), Fr(4))
+    product = p * vanishing
+    assert product == vanishing * p == p * Polynomial(*vanishing.to_dense())
+    assert product / vanishing == p
+    assert (product + vanishing) - vanishing == product
+    with pytest.raises(ValueError):
+        p / vanishing
+
+
 def test_polynomial_commitment_same_z():
     d = 5
     secret = 5
@@ -109,6 +143,54 @@ def test_polynomial_commitment_same_z():
     )
 
 
+def test_commit_evaluations():
+    srs = srs_setup(4, 5)
+    domain = EvaluationDomain.from_roots_of_unity(4)
+    p = Polynomial(Fr(1), Fr(2), Fr(3), Fr(4))
+    basis = lagrange_srs(srs, domain)
+    assert eq(commit_evaluations(p.fft(domain), basis), commit(p, srs))
+
+    restored = deserialize_srs(serialize_srs(srs))
+    assert all(eq(a, b) for a, b in zip(restored.powers_of_g1, srs.powers_of_g1))
+    assert eq(restored.g2_to_secret, srs.g2_to_secret)
+    assert all(eq(a, b) for a, b in zip(restored.lagrange_bases[4], basis))
+
+
+def test_mapped_srs(tmp_path):
+    srs = srs_setup(4, 5)
+    domain = EvaluationDomain.from_roots_of_unity(4)
+    lagrange_srs(srs, domain)
+    write_mapped_srs(tmp_path / "srs.bin", srs)
+    mapped = open_mapped_srs(tmp_path / "srs.bin")
+    p = Polynomial(Fr(1), Fr(2), Fr(3))
+    assert eq(commit(p, mapped), commit(p, srs))
+    assert eq(mapped.g2_to_secret, srs.g2_to_secret)
+    assert eq(
+        commit_evaluations(p.fft(domain), lagrange_srs(mapped, domain)),
+        commit(p, srs),
+    )
+
+
+@pytest.mark.parametrize("processes", (1, 2))
+def test_commit_many(processes):
+    srs = srs_setup(12, 5)
+    polys = [
+        Polynomial(*[Fr(i * j + 1) for j in range(length)])
+        for i, length in enumerate((12, 3, 9))
+    ]
+    commitments = commit_many(polys, srs, processes)
+    assert all(eq(c, commit(p, srs)) for c, p in zip(commitments, polys))
+    assert commit_many([], srs) == []
+    zero = Polynomial(Fr(0))
+    for p in (polys[1], polys[0]):
+        commitments = commit_many([zero, p, zero], srs, processes)
+        assert eq(commitments[0], Z1) and eq(commitments[2], Z1)
+        assert eq(commitments[1], commit(p, srs))
+    assert all(eq(c, Z1) for c in commit_many([zero, zero], srs, processes))
+    with pytest.raises(ValueError):
+        commit_many([Polynomial(*[Fr(1)] * 13)], srs)
+
+
 def test_circuit():
     c = circuit()
     c.print()
@@ -164,6 +246,14 @@ def test_fft_2():
     assert ed.inverse_fft(evaluations).fft(ed) == evaluations
 
 
+def test_parallel_fft():
+    ed = EvaluationDomain.from_roots_of_unity(16, parallel=True)
+    p = Polynomial(*[Fr(c) for c in range(1, 15)])
+    evaluations = p.fft(ed)
+    assert evaluations == p.fft(EvaluationDomain.from_roots_of_unity(16))
+    assert ed.inverse_fft(evaluations) == p
+
+
 def test_coset_fft():
     ed = EvaluationDomain(domain=[F337(85) ** i for i in range(8)])
     p = Polynomial(3, 1, 4, 1, 5, 9, 2)
@@ -171,6 +261,69 @@ def test_coset_fft():
     assert p.coset_fft(ed) == [62, 323, 247, 3, 189, 18, 168, 25]
 
 
+def test_evaluation_form():
+    domain = EvaluationDomain.from_roots_of_unity(8)
+    p = Polynomial(Fr(3), Fr(1), Fr(4), Fr(1))
+    q = Polynomial(Fr(5), Fr(9), Fr(2))
+    p_evals = EvaluationForm.from_polynomial(p, domain)
+    q_evals = EvaluationForm(q.fft(domain), domain)
+    x = Fr(1234)
+
+    assert p_evals.evaluate(x) == p.evaluate(x)
+    assert p_evals.evaluate(domain.domain[3]) == p.evaluate(domain.domain[3])
+    assert (p_evals + q_evals).evaluate(x) == (p + q).evaluate(x)
+    assert (p_evals - q_evals).evaluate(x) == (p - q).evaluate(x)
+    assert (p_evals * q_evals).evaluate(x) == (p * q).evaluate(x)
+    assert (p_evals * Fr(7)).evaluate(x) == (p * Fr(7)).evaluate(x)
+
+    product = p_evals * q_evals
+    assert product.to_polynomial() is product.to_polynomial()
+    assert product.to_polynomial() == p * q
+    assert (p + q_evals).to_polynomial() == p + q
+    assert (p - q_evals).to_polynomial() == p - q
+    assert (p * q_evals).to_polynomial() == p * q
+    # Mixed operations keep the evaluation form, whatever the operand order
+    for result in (p + q_evals, q_evals + p, p - q_evals, q_evals - p):
+        assert isinstance(result, EvaluationForm)
+    for result in (p * q_evals, q_evals * p):
+        assert isinstance(result, EvaluationForm)
+    assert (q_evals - p).to_polynomial() == q - p
+    assert EvaluationForm.from_polynomial([Fr(3), Fr(1), Fr(4)], domain) == (
+        EvaluationForm.from_polynomial(Polynomial(Fr(3), Fr(1), Fr(4)), domain)
+    )
+
+
+def test_extend():
+    domain = EvaluationDomain.from_roots_of_unity(4)
+    p = Polynomial(Fr(3), Fr(1), Fr(4), Fr(1))
+    q = Polynomial(Fr(5), Fr(9))
+    evaluations = p.fft(domain)
+
+    domain_4n = EvaluationDomain.from_roots_of_unity(16)
+    assert domain.extended(4).domain == domain_4n.domain
+    assert domain.extend(evaluations, 4) == p.fft(domain_4n)
+
+    shift = Fr(5)
+    coset = domain.extended(4, shift)
+    assert domain.extend(evaluations, 4, shift) == [p.evaluate(x) for x in coset.domain]
+
+    extensions = domain.extend_columns([evaluations, q.fft(domain)], 2, [1, shift])
+    for polynomial, (on_subgroup, on_coset) in zip([p, q], extensions):
+        assert on_subgroup == polynomial.fft(EvaluationDomain.from_roots_of_unity(8))
+        assert on_coset == [
+            polynomial.evaluate(x) for x in domain.extended(2, shift).domain
+        ]
+
+
+def test_truncated_extend():
+    domain = EvaluationDomain.from_roots_of_unity(4)
+    p = Polynomial(Fr(3), Fr(1), Fr(4), Fr(1))
+    shift = Fr(5)
+    extended = domain.extended(3, shift).domain
+    assert len(extended) == 12
+    assert domain.extend(p.fft(domain), 3, shift) == [p.evaluate(x) for x in extended]
+
+
 def test_permutation_polynomial_evalutations():
     beta = F13(3)
     gamma = F13(5)
@@ -185,7 +338,15 @@ def test_permutation_polynomial_evalutations():
     assert evals == [1, 1, 4]
 
 
-@pytest.mark.xfail(reason="Work in progress")
+def test_domain_coset_fft():
+    domain = EvaluationDomain.from_roots_of_unity(8)
+    p = Polynomial(Fr(3), Fr(1), Fr(4), Fr(1), Fr(5))
+    shift = Fr(5)
+    evaluations = domain.coset_fft(p, shift)
+    assert evaluations == [p.evaluate(shift * x) for x in domain.domain]
+    assert domain.coset_inverse_fft(evaluations, shift) == p
+
+
 def test_prover():
 
     srs = srs_setup(32, 5)
@@ -196,5 +357,36 @@ def test_prover():
     prover_input = c.get_prover_input()
     assert pre_proving_check(prover_input) is None
 
-    proof = tuple(prove(prover_input, srs))
-    print(proof)
+    proof = create_proof(prover_input, srs)
+    assert proof.public_inputs == [5, 35]
+    assert len(tuple(prove(prover_input, srs))) == 5
+
+    prover_input.witnesses.c[2] += 1
+    with pytest.raises(ValueError, match="quotient"):
+        create_proof(prover_input, srs)
+
+
+def test_verifier():
+    srs = srs_setup(32, 5)
+    proofs = []
+    for x in (3, 4):
+        c = circuit()
+        c.calculate_witness({"x": x, "const": 5, "y": x ** 3 + x + 5})
+        prover_input = c.get_prover_input()
+        proofs.append(create_proof(prover_input, srs))
+    vk = verification_key(prover_input, srs)
+
+    assert all(verify(proof, vk) for proof in proofs)
+    assert verify_batch(proofs, vk)
+    assert not verify_batch([], vk)
+
+    bad = replace(proofs[0], public_inputs=[5, 36])
+    assert not verify(bad, vk)
+    assert not verify_batch([proofs[1], bad], vk)
+    assert not verify(replace(proofs[1], r_eval=proofs[1].r_eval + 1), vk)
+    assert not verify(replace(proofs[1], public_inputs=[5]), vk)
+
+    # The transcript absorbs the circuit, a key of another circuit doesn't verify
+    other = replace(vk, circuit_commitments=list(reversed(vk.circuit_commitments)))
+    assert not verify(proofs[0], other)
+    assert verify(create_proof(prover_input, srs, vk.circuit_commitments), vk)
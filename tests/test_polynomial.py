@@ -1,6 +1,37 @@
 import pytest
-from misc_crypto.ecc import F337, BLS12381Backend
-from misc_crypto.polynomial.fft import fft, inverse_fft
+import gc
+import pickle
+import weakref
+import random
+from concurrent.futures import ProcessPoolExecutor
+from misc_crypto.ecc import (
+    F337,
+    BLS12381Backend,
+    BN254Backend,
+    Goldilocks,
+    roots_of_unity,
+)
+from misc_crypto.ecc.backends.bn254 import G2 as G2Point
+from py_ecc.optimized_bn128 import FQ2, b2
+from misc_crypto.polynomial.fft import (
+    fft,
+    inverse_fft,
+    _fft,
+    truncated_fft,
+    inverse_truncated_fft,
+    truncated_domain,
+    group_fft,
+    inverse_group_fft,
+)
+from misc_crypto.polynomial import ntt, parallel_fft
+from misc_crypto.polynomial.helpers import next_power_of_2
+from misc_crypto.polynomial.parallel_fft import four_step_fft
+from misc_crypto.polynomial.out_of_core import (
+    fft_file,
+    inverse_fft_file,
+    read_field_elements,
+    write_field_elements,
+)
 from misc_crypto.polynomial.operations import (
     add_polynomial,
     fft_multiply,
@@ -10,6 +41,33 @@ from misc_crypto.polynomial.operations import (
     euclidean_division,
     true_division,
     evaluate,
+    batch_inverse,
+    barycentric_weights,
+    barycentric_evaluate,
+    evaluate_many,
+    compute_zero_polynomial,
+    trim,
+    add_assign,
+    sub_assign,
+    scale_assign,
+    axpy,
+)
+from misc_crypto.polynomial.sparse import SparsePolynomial
+from misc_crypto.polynomial.point_cache import PointSetCache, point_set_cache
+from misc_crypto.polynomial import fri
+from misc_crypto.polynomial import srs as srs_module
+from misc_crypto.polynomial.mapped_srs import MappedSRS, write_mapped_srs
+from misc_crypto.polynomial import ceremony
+from misc_crypto.polynomial.vector_commitment import (
+    VectorCommitment,
+    verify_index,
+    verify_indices,
+)
+from misc_crypto.polynomial.benchmark import (
+    Benchmark,
+    fit_exponent,
+    run_benchmark,
+    format_result,
 )
 from misc_crypto.polynomial.commitments import (
     commit,
@@ -19,6 +77,14 @@ from misc_crypto.polynomial.commitments import (
     prove_multiple,
     verify_multiple,
     build_polynomial_from_vector,
+    prove_aggregated,
+    verify_aggregated,
+    prove_all,
+    lagrange_srs,
+    commit_evaluations,
+    serialize_srs,
+    deserialize_srs,
+    update_commitment,
 )
 
 
@@ -29,6 +95,21 @@ def test_add_polynomial():
     assert add_polynomial(a, b) == add_polynomial(b, a) == _sum
 
 
+def test_in_place_operations():
+    a = [F337(x) for x in [1, 2, 3]]
+    b = [F337(x) for x in [1, 2, 3, 4, 5]]
+    buffer = list(a)
+    assert add_assign(buffer, b) is buffer
+    assert buffer == add_polynomial(a, b)
+    assert sub_assign(buffer, b) == a + [0, 0]
+    assert trim(buffer) == a
+    assert scale_assign(buffer, F337(2)) == [2, 4, 6]
+    # y += 3 * x * X^4
+    assert axpy(buffer, F337(3), [F337(1), F337(1)], 4) == [2, 4, 6, 0, 3, 3]
+    assert axpy(buffer, F337(-1), [F337(2), F337(4)]) == [0, 0, 6, 0, 3, 3]
+    assert trim([F337(0), F337(0)]) == [0]
+
+
 def test_naive_multiply():
     a = [F337(x) for x in [1, 2, 3]]
     b = [F337(x) for x in [4, 5, 6]]
@@ -78,6 +159,131 @@ def test_fft_2():
     assert fft(inverse_fft(evaluations, domain), domain) == evaluations
 
 
+requires_numpy = pytest.mark.skipif(ntt.np is None, reason="numpy is not installed")
+
+
+@requires_numpy
+@pytest.mark.parametrize("modulus", (337, ntt.GOLDILOCKS_MODULUS))
+def test_word_field_arithmetic(modulus):
+    field = ntt.WordField(modulus)
+    a = [random.randrange(modulus) for _ in range(100)] + [modulus - 1]
+    b = [random.randrange(modulus) for _ in range(100)] + [modulus - 1]
+    arr_a, arr_b = field.array(a), field.array(b)
+    assert [int(x) for x in field.add(arr_a, arr_b)] == [
+        (x + y) % modulus for x, y in zip(a, b)
+    ]
+    assert [int(x) for x in field.sub(arr_a, arr_b)] == [
+        (x - y) % modulus for x, y in zip(a, b)
+    ]
+    assert [int(x) for x in field.mul(arr_a, arr_b)] == [
+        (x * y) % modulus for x, y in zip(a, b)
+    ]
+
+
+@requires_numpy
+@pytest.mark.parametrize(
+    "field_type, generator, order",
+    (
+        (F337, 10, 16),
+        # 7 generates the multiplicative group of Goldilocks
+        (Goldilocks, 7, 128),
+    ),
+)
+def test_ntt(field_type, generator, order):
+    root = field_type(generator) ** ((field_type.field_modulus - 1) // order)
+    domain = [root ** i for i in range(order)]
+    coefficients = [
+        field_type(random.randrange(field_type.field_modulus)) for _ in range(order)
+    ]
+
+    expected = _fft(coefficients, domain)
+    assert ntt.ntt_fft(coefficients, domain) == expected
+    assert ntt.ntt_inverse_fft(expected, domain) == coefficients
+
+    field = ntt.WordField(field_type.field_modulus)
+    assert [int(x) for x in ntt.ntt(field, field.array(coefficients), int(root))] == [
+        int(e) for e in expected
+    ]
+    if ntt.can_use_ntt(domain):
+        assert fft(coefficients, domain) == expected
+        assert inverse_fft(expected, domain) == coefficients
+
+
+@pytest.mark.parametrize("order", (2, 32, 64))
+def test_four_step_fft(order):
+    backend = BLS12381Backend
+    domain = roots_of_unity(backend, order)
+    coefficients = [
+        backend.Fr(random.randrange(backend.curve_order)) for _ in range(order - 1)
+    ]
+    expected = fft(coefficients, domain, parallel=False)
+    assert four_step_fft(coefficients, domain, workers=2) == expected
+    assert fft(coefficients, domain, parallel=True) == expected
+    assert inverse_fft(expected, domain, parallel=True)[: order - 1] == coefficients
+
+
+def test_four_step_fft_executor():
+    backend = BLS12381Backend
+    domain = roots_of_unity(backend, 64)
+    coefficients = [
+        backend.Fr(random.randrange(backend.curve_order)) for _ in range(64)
+    ]
+    expected = fft(coefficients, domain, parallel=False)
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        assert four_step_fft(coefficients, domain, workers=2, executor=pool) == expected
+        assert four_step_fft(coefficients, domain, workers=2, executor=pool) == expected
+
+    # Without an executor, calls share one pool per number of workers
+    four_step_fft(coefficients, domain, workers=2)
+    pool = parallel_fft._pools[2]
+    assert four_step_fft(coefficients, domain, workers=2) == expected
+    assert parallel_fft._pools[2] is pool
+
+
+@pytest.mark.parametrize("block_records", (1, 8, 2 ** 16))
+def test_out_of_core_fft(tmp_path, block_records):
+    backend = BLS12381Backend
+    order = 32
+    domain = roots_of_unity(backend, order)
+    coefficients = [
+        backend.Fr(random.randrange(backend.curve_order)) for _ in range(order)
+    ]
+    source = tmp_path / "coefficients.bin"
+    destination = tmp_path / "evaluations.bin"
+    write_field_elements(source, coefficients)
+
+    fft_file(source, destination, domain[1], block_records)
+    evaluations = read_field_elements(destination, backend.Fr)
+    assert evaluations == fft(coefficients, domain)
+
+    # Buffers work as well
+    output = bytearray(order * 32)
+    inverse_fft_file(destination.read_bytes(), output, domain[1], block_records)
+    assert read_field_elements(output, backend.Fr) == coefficients
+
+
+def test_out_of_core_fft_read_only_destination():
+    backend = BLS12381Backend
+    domain = roots_of_unity(backend, 4)
+    source = bytearray(4 * 32)
+    with pytest.raises(ValueError):
+        fft_file(source, bytes(4 * 32), domain[1])
+
+
+@pytest.mark.parametrize("length", (1, 2, 5, 8, 9, 13, 16))
+def test_truncated_fft(length):
+    backend = BLS12381Backend
+    domain = roots_of_unity(backend, next_power_of_2(length))
+    coefficients = [
+        backend.Fr(random.randrange(backend.curve_order)) for _ in range(length)
+    ]
+    evaluations = truncated_fft(coefficients, domain)
+    points = truncated_domain(domain, length)
+    assert len(set(int(x) for x in points)) == length
+    assert evaluations == [evaluate(coefficients, x) for x in points]
+    assert inverse_truncated_fft(evaluations, domain) == coefficients
+
+
 def test_fft_multiply():
     backend = BLS12381Backend
     a = [backend.Fr(c) for c in [1, 2, 3, 4]]
@@ -89,6 +295,14 @@ def test_fft_multiply():
     )
 
 
+def test_fft_multiply_truncated():
+    backend = BLS12381Backend
+    # The product has 9 coefficients, just over 8
+    a = [backend.Fr(c) for c in [1, 2, 3, 4, 5]]
+    b = [backend.Fr(c) for c in [6, 7, 8, 9, 10]]
+    assert fft_multiply(backend, a, b) == naive_multiply(a, b)
+
+
 def test_fft_multiply_many():
     backend = BLS12381Backend
     a = [backend.Fr(x) for x in [1, 1]]
@@ -97,6 +311,12 @@ def test_fft_multiply_many():
     ab = fft_multiply(backend, a, b)
     abc = fft_multiply(backend, ab, c)
     assert fft_multiply_many(backend, [a, b, c]) == abc
+    assert fft_multiply_many(backend, [a, b, c], balanced=False) == abc
+
+    # A stream of linear factors, long enough to take the fft path in the tree
+    zs = [backend.Fr(z) for z in range(1, 41)]
+    linear_factors = ([-z, backend.Fr(1)] for z in zs)
+    assert fft_multiply_many(backend, linear_factors) == compute_zero_polynomial(zs)
 
 
 def test_euclidean_division():
@@ -113,12 +333,121 @@ def test_euclidean_division():
         true_division(a2, b1)
 
 
+def test_sparse_polynomial():
+    dense = [F337(c) for c in [1, 2, 0, 0, 5]]
+    sparse = SparsePolynomial.from_dense(dense)
+    assert sparse.terms == ((0, 1), (1, 2), (4, 5))
+    assert sparse.to_dense() == dense
+    assert sparse.evaluate(F337(3)) == evaluate(dense, F337(3))
+
+    vanishing = SparsePolynomial.vanishing(4, F337(2))
+    assert vanishing.to_dense() == [F337(-16), 0, 0, 0, 1]
+    assert vanishing * dense == naive_multiply(vanishing.to_dense(), dense)
+    assert (vanishing * dense) / vanishing == dense
+    assert vanishing.divide_dense(dense) == euclidean_division(
+        dense, vanishing.to_dense()
+    )
+    with pytest.raises(ValueError):
+        dense / vanishing
+    assert vanishing * sparse == SparsePolynomial.from_dense(
+        naive_multiply(vanishing.to_dense(), dense)
+    )
+    assert vanishing + dense == add_polynomial(vanishing.to_dense(), dense)
+    assert dense - vanishing == add_polynomial(dense, (-vanishing).to_dense())
+    assert (vanishing - vanishing).is_zero
+
+    # A list of ints divides as field elements, int coefficients don't divide
+    quotient, remainder = SparsePolynomial.vanishing(4, F337(1)).divide_dense(
+        [1, 0, 0, 0, 0, 0, 0, -1]
+    )
+    assert quotient == [F337(c) for c in [0, 0, 0, -1]]
+    assert remainder == [F337(c) for c in [1, 0, 0, -1]]
+    assert all(isinstance(c, F337) for c in quotient + remainder)
+    with pytest.raises(TypeError):
+        SparsePolynomial([(0, -1), (4, 1)]).divide_dense([1, 0, 0, 0, 0, 0, 0, -1])
+
+
+def test_point_set_cache():
+    zs = [F337(z) for z in [3, 5, 7, 11, 13]]
+    ys = [F337(y) for y in [2, 4, 6, 8, 10]]
+    cache = PointSetCache()
+    point_set = cache.get(zs)
+    assert cache.get(list(zs)) is point_set
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert point_set.zero_polynomial == compute_zero_polynomial(zs)
+    assert point_set.interpolate(ys) == lagrange(zs, ys)
+
+    # A budget for a single point set keeps only the most recent one
+    small_cache = PointSetCache(max_bytes=point_set.estimated_bytes())
+    small_cache.get(zs)
+    small_cache.get(zs[:3])
+    assert len(small_cache) == 1
+    small_cache.get(zs)
+    assert small_cache.misses == 3
+
+
+def test_point_set_cache_releases_srs():
+    backend = BLS12381Backend
+    srs = untrusted_setup(backend, 4)
+    p = [backend.Fr(x) for x in [1, 2, 3, 4]]
+    zs = [backend.Fr(z) for z in [17, 19]]
+    ys, proof = prove_multiple(srs, p, zs)
+    assert verify_multiple(backend, srs, commit(srs, p), zs, ys, proof)
+    point_set = point_set_cache.get(zs)
+    assert len(point_set.zs_on_G2) == 1
+    assert point_set.estimated_bytes() > 2 * len(srs.G2.to_bytes())
+    srs = weakref.ref(srs)
+    gc.collect()
+    assert srs() is None
+    point_set.estimated_bytes()
+    assert len(point_set.zs_on_G2) == 0
+
+
 def test_evaluate():
     p = [F337(c) for c in [1, 3, 3, 1]]
     x = F337(2)
     assert evaluate(p, x) == F337(27)
 
 
+def test_batch_inverse():
+    values = [F337(x) for x in [1, 5, 7, 336]]
+    assert batch_inverse(values) == [1 / v for v in values]
+    assert batch_inverse([]) == []
+
+
+@pytest.mark.parametrize(
+    "domain",
+    (
+        [F337(x) for x in [0, 1, 2, 3]],
+        [F337(85) ** i for i in range(8)],
+    ),
+)
+def test_barycentric_evaluate(domain):
+    p = [F337(c) for c in [1, 3, 3, 1]]
+    evaluations = [evaluate(p, x) for x in domain]
+    weights = barycentric_weights(domain)
+    for x in [F337(2), F337(100), domain[1]]:
+        assert barycentric_evaluate(domain, weights, evaluations, x) == evaluate(p, x)
+
+
+@pytest.mark.parametrize(
+    "points",
+    (
+        [F337(x) for x in [2, 5, 11]],
+        # A coset of the subgroup of order 8, dispatched to fft
+        [F337(3) * F337(85) ** i for i in range(8)],
+    ),
+)
+def test_evaluate_many(points):
+    ps = [
+        [F337(c) for c in [1, 3, 3, 1]],
+        [F337(c) for c in [7]],
+        [F337(c) for c in range(1, 12)],
+    ]
+    assert evaluate_many(ps, points) == [[evaluate(p, x) for x in points] for p in ps]
+    assert evaluate_many([], points) == []
+
+
 def test_commitments():
     backend = BLS12381Backend
     srs = untrusted_setup(backend, 10)
@@ -138,6 +467,158 @@ def test_commitments():
     assert verify_multiple(backend, srs, commitment, zs, ys, proof)
 
 
+def test_aggregated_opening():
+    backend = BLS12381Backend
+    srs = untrusted_setup(backend, 10)
+    ps = [
+        [backend.Fr(x) for x in [1, 2, 3, 4]],
+        [backend.Fr(x) for x in [5, 6, 7, 8, 9]],
+        [backend.Fr(x) for x in [10, 11]],
+    ]
+    # Like PLONK's z, opened at zeta and omega * zeta
+    point_sets = [
+        [backend.Fr(7)],
+        [backend.Fr(7), backend.Fr(13)],
+        [backend.Fr(2), backend.Fr(3), backend.Fr(7)],
+    ]
+    commitments = [commit(srs, p) for p in ps]
+    ys, proof = prove_aggregated(backend, srs, ps, point_sets, commitments)
+    assert ys[1] == [evaluate(ps[1], z) for z in point_sets[1]]
+    assert verify_aggregated(backend, srs, commitments, point_sets, ys, proof)
+
+    wrong_ys = [ys[0], [ys[1][0], ys[1][1] + 1], ys[2]]
+    assert not verify_aggregated(backend, srs, commitments, point_sets, wrong_ys, proof)
+    assert not verify_aggregated(backend, srs, commitments[::-1], point_sets, ys, proof)
+
+
+def test_group_fft():
+    backend = BLS12381Backend
+    G1 = backend.get_G1()
+    domain = roots_of_unity(backend, 4)
+    coefficients = [backend.Fr(c) for c in [3, 1, 4, 1]]
+    points = [G1.multiply(c) for c in coefficients]
+    evaluations = group_fft(points, domain)
+    for point, y in zip(evaluations, fft(coefficients, domain)):
+        assert point.eq(G1.multiply(y))
+    for point, expected in zip(inverse_group_fft(evaluations, domain), points):
+        assert point.eq(expected)
+
+
+@pytest.mark.parametrize("length", (3, 4))
+def test_prove_all(length):
+    backend = BLS12381Backend
+    srs = untrusted_setup(backend, 5)
+    p = [backend.Fr(x) for x in [1, 2, 3, 4][:length]]
+    domain = roots_of_unity(backend, 4)
+    ys, proofs = prove_all(backend, srs, p, domain)
+    for x, y, proof in zip(domain, ys, proofs):
+        expected_y, expected_proof = prove_single(srs, p, x)
+        assert y == expected_y
+        assert proof.eq(expected_proof)
+
+
+def test_commit_evaluations():
+    backend = BLS12381Backend
+    srs = untrusted_setup(backend, 4)
+    p = [backend.Fr(x) for x in [1, 2, 3, 4]]
+    domain = roots_of_unity(backend, 4)
+    basis = lagrange_srs(backend, srs, 4)
+    assert lagrange_srs(backend, srs, 4) is basis
+    assert commit_evaluations(fft(p, domain), basis).eq(commit(srs, p))
+
+    restored = deserialize_srs(backend, serialize_srs(srs))
+    assert restored.toxic is None
+    assert all(a.eq(b) for a, b in zip(restored.G1s, srs.G1s))
+    assert all(a.eq(b) for a, b in zip(restored.lagrange_bases[4], basis))
+    assert commit(restored, p).eq(commit(srs, p))
+    data = serialize_srs(srs)
+    # Cut in the middle of the number of Lagrange bases
+    bases_start = len(data) - 4 - (4 + 4 * len(srs.G1.to_bytes()))
+    for truncated in (data[:-1], data[:3], data[:9], data[: bases_start + 2]):
+        with pytest.raises(ValueError):
+            deserialize_srs(backend, truncated)
+
+
+def test_seeded_setup(tmp_path):
+    backend = BLS12381Backend
+    srs = srs_module.setup(backend, 6, 3, seed="test", cache_directory=tmp_path)
+    assert (len(srs.G1s), len(srs.G2s)) == (5, 2)
+    assert srs.G1s[2].eq(backend.get_G1().multiply(srs.toxic ** 3))
+    assert srs.G2s[1].eq(backend.get_G2().multiply(srs.toxic ** 2))
+    assert len(list(tmp_path.iterdir())) == 1
+
+    cached = srs_module.setup(backend, 6, 3, seed="test", cache_directory=tmp_path)
+    assert cached.toxic == srs.toxic
+    assert all(a.eq(b) for a, b in zip(cached.G1s, srs.G1s))
+    parallel = srs_module.setup(
+        backend, 6, seed="test", processes=2, cache_directory=tmp_path / "other"
+    )
+    assert all(a.eq(b) for a, b in zip(parallel.G1s, srs.G1s))
+    other = srs_module.setup(backend, 6, 3, seed="other", cache_directory=tmp_path)
+    assert other.toxic != srs.toxic
+
+    p = [backend.Fr(x) for x in [1, 2, 3, 4]]
+    z = backend.Fr(5)
+    y, proof = prove_single(cached, p, z)
+    assert verify_single(backend, cached, commit(cached, p), z, y, proof)
+
+
+def test_mapped_srs(tmp_path):
+    backend = BN254Backend
+    srs = untrusted_setup(backend, 8)
+    lagrange_srs(backend, srs, 4)
+    path = tmp_path / "srs.bin"
+    write_mapped_srs(path, backend, srs)
+    p = [backend.Fr(x) for x in [1, 2, 3, 4, 5]]
+    with MappedSRS(path) as mapped:
+        assert mapped.backend is backend
+        assert (len(mapped.G1s), len(mapped.G2s)) == (7, 7)
+        assert mapped.G1s[-1].eq(srs.G1s[-1])
+        assert all(a.eq(b) for a, b in zip(mapped.G2s[2:5], srs.G2s[2:5]))
+        assert commit(mapped, p).eq(commit(srs, p))
+        evaluations = fft(p[:4], roots_of_unity(backend, 4))
+        assert commit_evaluations(evaluations, mapped.lagrange_bases[4]).eq(
+            commit(srs, p[:4])
+        )
+        unpickled = pickle.loads(pickle.dumps(mapped.G1s))
+        assert unpickled[3].eq(srs.G1s[3])
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError):
+        MappedSRS(path)
+
+
+@pytest.mark.parametrize("length", (1, 8))
+def test_fri(length):
+    backend = BLS12381Backend
+    params = fri.setup(backend, length, num_queries=4)
+    p = [backend.Fr(random.randrange(backend.curve_order)) for _ in range(length)]
+    z = backend.Fr(random.randrange(backend.curve_order))
+    commitment = fri.commit(params, p)
+    y, proof = fri.prove_single(params, p, z)
+    assert y == evaluate(p, z)
+    assert fri.verify_single(backend, params, commitment, z, y, proof)
+    assert not fri.verify_single(backend, params, commitment, z, y + 1, proof)
+    other_commitment = fri.commit(params, [c + 1 for c in p])
+    assert not fri.verify_single(backend, params, other_commitment, z, y, proof)
+
+    with pytest.raises(ValueError):
+        fri.prove_single(params, p, params.domain[1])
+    with pytest.raises(ValueError):
+        fri.commit(params, p + p)
+
+
+def test_fri_rejects_high_degree(monkeypatch):
+    backend = BLS12381Backend
+    params = fri.setup(backend, 4, blowup=8, num_queries=8)
+    # A cheating prover committing to 16 coefficients on the same domain
+    monkeypatch.setattr(fri, "_evaluations", lambda params, p: fft(p, params.domain))
+    p = [backend.Fr(i + 1) for i in range(16)]
+    z = backend.Fr(99)
+    commitment = fri.commit(params, p)
+    y, proof = fri.prove_single(params, p, z)
+    assert not fri.verify_single(backend, params, commitment, z, y, proof)
+
+
 def test_vector_commitment():
     backend = BLS12381Backend
     srs = untrusted_setup(backend, 20)
@@ -150,3 +631,144 @@ def test_vector_commitment():
     ys, proof = prove_multiple(srs, p, zs)
     assert ys == [evaluate(p, z) for z in zs]
     assert verify_multiple(backend, srs, commitment, zs, ys, proof)
+
+
+def test_update_commitment():
+    backend = BLS12381Backend
+    srs = untrusted_setup(backend, 8)
+    p = [backend.Fr(x) for x in [1, 2, 3, 4, 5, 6, 7, 8]]
+    commitment = commit(srs, p)
+    changes = {0: backend.Fr(10), 5: backend.Fr(-3)}
+    updated = list(p)
+    for index, delta in changes.items():
+        updated[index] += delta
+    assert update_commitment(commitment, srs, changes).eq(commit(srs, updated))
+    assert update_commitment(commitment, srs, {}).eq(commitment)
+
+    domain = roots_of_unity(backend, 8)
+    evaluations = fft(p, domain)
+    basis = lagrange_srs(backend, srs, 8)
+    evaluations[3] += 42
+    updated = update_commitment(commitment, srs, {3: backend.Fr(42)}, basis)
+    assert updated.eq(commit_evaluations(evaluations, basis))
+    with pytest.raises(IndexError):
+        update_commitment(commitment, srs, {8: backend.Fr(1)})
+
+
+def test_ceremony(tmp_path):
+    backend = BN254Backend
+    paths = [tmp_path / f"{i}.srs" for i in range(3)]
+    ceremony.initial_transcript(paths[0], backend, 8, 3)
+    public_key = ceremony.contribute(paths[0], paths[1], tau=5, chunk_points=3)
+    assert ceremony.verify_contribution(paths[0], paths[1], public_key, 3)
+    public_key = ceremony.contribute(paths[1], paths[2], chunk_points=3, processes=2)
+    assert ceremony.verify_contribution(paths[1], paths[2], public_key, 3)
+    assert not ceremony.verify_contribution(
+        paths[1], paths[2], backend.get_G2().multiply(5), 3
+    )
+
+    with MappedSRS(paths[1]) as mapped:
+        assert mapped.G1s[6].eq(backend.get_G1().multiply(5 ** 7))
+        assert mapped.G2s[1].eq(backend.get_G2().multiply(25))
+        records = [p.to_bytes() for p in mapped.G1_powers]
+        records[3], records[4] = records[4], records[3]
+        records += [p.to_bytes() for p in mapped.G2_powers]
+    tampered = tmp_path / "tampered.srs"
+    with open(tampered, "wb") as f:
+        f.write(ceremony.header(backend, 8, 3))
+        f.write(b"".join(records))
+    with MappedSRS(tampered) as mapped:
+        assert not ceremony.verify_powers(mapped)
+
+
+def twist_point_outside_subgroup():
+    """
+    A point on the BN254 twist, with the square root of Fq2 for p = 3 mod 4
+    """
+    p = BN254Backend.field_modulus
+    for x0 in range(1, 100):
+        x = FQ2([x0, 1])
+        rhs = x ** 3 + b2
+        a1 = rhs ** ((p - 3) // 4)
+        alpha = a1 * a1 * rhs
+        if alpha == FQ2([-1, 0]):
+            y = FQ2([0, 1]) * a1 * rhs
+        else:
+            y = (FQ2.one() + alpha) ** ((p - 1) // 2) * a1 * rhs
+        if y * y == rhs:
+            return G2Point((x, y, FQ2.one()))
+
+
+def test_ceremony_subgroup_checks(tmp_path):
+    backend = BN254Backend
+    outside = twist_point_outside_subgroup()
+    assert type(outside).from_bytes(outside.to_bytes()).eq(outside)
+    assert not ceremony.in_subgroup(backend, outside)
+
+    paths = [tmp_path / f"{i}.srs" for i in range(2)]
+    ceremony.initial_transcript(paths[0], backend, 4)
+    public_key = ceremony.contribute(paths[0], paths[1], tau=3)
+    assert not ceremony.verify_contribution(paths[0], paths[1], outside)
+    assert ceremony.verify_contribution(
+        paths[0], paths[1], public_key, check_subgroups=False
+    )
+
+    tampered = tmp_path / "tampered.srs"
+    with open(tampered, "wb") as f:
+        f.write(ceremony.header(backend, 4, 2))
+        f.write(backend.get_G1().to_bytes() * 4)
+        f.write(backend.get_G2().to_bytes() + outside.to_bytes())
+    with MappedSRS(tampered) as mapped:
+        assert not ceremony.points_in_subgroups(mapped)
+        assert not ceremony.points_in_subgroups(mapped, chunk_points=1, processes=2)
+        assert not ceremony.verify_powers(mapped)
+    with MappedSRS(paths[1]) as mapped:
+        assert ceremony.points_in_subgroups(mapped, chunk_points=1, processes=2)
+
+
+def test_roots_of_unity_vector_commitment():
+    backend = BLS12381Backend
+    srs = untrusted_setup(backend, 8)
+    vector = [55, 66, 55, 100, 21, 1]
+    vc = VectorCommitment(backend, srs, vector, proof_cache_size=2)
+    assert len(vc) == 8
+    assert vc.commitment.eq(commit(srs, vc.coefficients))
+
+    y, proof = vc.open(3)
+    assert y == 100
+    assert verify_index(backend, srs, vc.commitment, 8, 3, y, proof)
+    assert vc.open(3)[1] is proof
+    assert (vc.hits, vc.misses) == (1, 1)
+
+    ys, proof = vc.open_multiple([0, 2, 5])
+    assert ys == [55, 55, 1]
+    assert verify_indices(backend, srs, vc.commitment, 8, [0, 2, 5], ys, proof)
+
+    vc.update({3: 7, 6: 9})
+    assert vc.commitment.eq(commit(srs, vc.coefficients))
+    y, proof = vc.open(3)
+    assert vc.misses == 2
+    assert y == 7
+    assert verify_index(backend, srs, vc.commitment, 8, 3, y, proof)
+
+    proofs = vc.open_all()
+    assert verify_index(backend, srs, vc.commitment, 8, 6, vc.values[6], proofs[6])
+    assert len(vc._proofs) == 2
+
+
+def test_benchmark():
+    sizes = [16, 32, 64, 128]
+    assert fit_exponent(sizes, [n ** 2 for n in sizes]) == pytest.approx(2)
+
+    benchmark = Benchmark(
+        "evaluate",
+        lambda n: ([F337(1)] * n, F337(3)),
+        evaluate,
+        expected_exponent=3,
+    )
+    result = run_benchmark(benchmark, min_exponent=4, max_exponent=6)
+    assert [m.size for m in result.measurements] == [16, 32, 64]
+    # The result, one field element, is allocated
+    assert all(m.allocated_blocks >= 1 for m in result.measurements)
+    assert not result.matches
+    assert "faster than expected" in format_result(result)